@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect } from 'react';
 
 const formatTime = (seconds) => {
   const mins = Math.floor(seconds / 60);
@@ -6,39 +6,20 @@ const formatTime = (seconds) => {
   return `${mins.toString().padStart(2, '0')}:${secs.toString().padStart(2, '0')}`;
 };
 
-const Timer = ({ initialTime, onTimeUpdate, onTimeEnd }) => {
+// Counts down locally; the server enforces the attempt deadline itself,
+// so there is nothing to sync back while the quiz runs.
+const Timer = ({ initialTime, onTimeEnd }) => {
   const [timeRemaining, setTimeRemaining] = useState(initialTime);
   // Using a constant instead of state since we don't need to toggle it
   const isRunning = true;
 
-  // Update server every 10 seconds
-  const SERVER_SYNC_INTERVAL = 10;
-
-  // Callback to update time on server
-  const updateServerTime = useCallback((time) => {
-    if (onTimeUpdate) {
-      onTimeUpdate(time);
-    }
-  }, [onTimeUpdate]);
-
-  // For debugging
-  
-
   useEffect(() => {
     let timerId;
-    let syncCounter = 0;
 
     if (isRunning && timeRemaining > 0) {
       timerId = setInterval(() => {
         setTimeRemaining(prevTime => {
           const newTime = prevTime - 1;
-          
-          // Sync with server periodically
-          syncCounter++;
-          if (syncCounter >= SERVER_SYNC_INTERVAL) {
-            syncCounter = 0;
-            updateServerTime(newTime);
-          }
 
           // Handle timer end
           if (newTime <= 0) {
@@ -63,7 +44,7 @@ const Timer = ({ initialTime, onTimeUpdate, onTimeEnd }) => {
         clearInterval(timerId);
       }
     };
-  }, [isRunning, timeRemaining, updateServerTime, onTimeEnd]);
+  }, [isRunning, timeRemaining, onTimeEnd]);
 
   // Synchronize with initial time if it changes
   useEffect(() => {
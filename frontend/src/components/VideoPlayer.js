@@ -66,13 +66,21 @@ const VideoPlayer = ({
       return;
     }
     
+    let cancelled = false;
+    
     // Process each URL to ensure they are properly formatted
-    const processedSources = videoSources.map(url => {
+    const processSource = async (url) => {
       // If it's a relative URL (starts with /media) or just a filename, construct the full URL
       if (url.startsWith('/media') || (!url.startsWith('http') && !url.startsWith('/'))) {
-        // For media files, use the streaming endpoint
+        // For media files, use a signed URL (no auth header or database work per range
+        // request), falling back to the authenticated streaming endpoint
         if (typeof videoUrl === 'object' && videoUrl.id) {
-          return videoService.streamVideo(videoUrl.id);
+          try {
+            const { url: signedUrl } = await videoService.getSignedVideoUrl(videoUrl.id);
+            return signedUrl;
+          } catch (err) {
+            return videoService.streamVideo(videoUrl.id);
+          }
         }
         
         // Fallback to direct URL if no video ID
@@ -84,12 +92,17 @@ const VideoPlayer = ({
         return `${processedUrl}?t=${timestamp}`;
       }
       return url;
-    });
-    
-    setSources(processedSources);
-    setCurrentSourceIndex(0); // Reset to first source
+    };
     
+    Promise.all(videoSources.map(processSource)).then(processedSources => {
+      if (cancelled) return;
+      setSources(processedSources);
+      setCurrentSourceIndex(0); // Reset to first source
+    });
     
+    return () => {
+      cancelled = true;
+    };
   }, [videoUrl]);
   
   // Function to get video blob
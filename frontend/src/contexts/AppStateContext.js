@@ -1,5 +1,5 @@
 import React, { createContext, useContext, useState, useCallback, useEffect } from 'react';
-import { videoService, authService } from '../services';
+import { videoService } from '../services';
 
 // Create the context
 const AppStateContext = createContext();
@@ -24,17 +24,14 @@ export const AppStateProvider = ({ children }) => {
     try {
       setLoading(true);
       
-      // Fetch all data in parallel
-      const [videosResponse, unlockedResponse, progressResponse] = await Promise.all([
-        videoService.getAllVideos(),
-        videoService.getUnlockedVideos(),
-        authService.getUserProgress(),
-      ]);
+      // Fetch everything the dashboard needs in a single request
+      const dashboard = await videoService.getDashboard();
+      const progressResponse = dashboard.progress;
 
       console.log('AppState: Data fetched successfully');
 
-      setVideos(videosResponse);
-      setUnlockedVideos(unlockedResponse);
+      setVideos(dashboard.videos || []);
+      setUnlockedVideos(dashboard.unlocked_videos || []);
       
       // Format progress data
       if (progressResponse && typeof progressResponse === 'object') {
@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect } from 'react';
 import { useNavigate, useParams } from 'react-router-dom';
 import { quizService, videoService } from '../services';
 import { useAppState } from '../contexts/AppStateContext';
@@ -188,35 +188,16 @@ const Quiz = () => {
     }
   };
 
-  // Update timer on server periodically
-  const updateTimerOnServer = useCallback(async (timeLeft) => {
-    if (attemptId && quizStatus === 'answering') {
-      try {
-        await quizService.updateTimer(attemptId, timeLeft);
-      } catch (err) {
-        
-      }
-    }
-  }, [attemptId, quizStatus]);
-
   // Handle timer end
   const handleTimerEnd = async () => {
     try {
       
       setQuizStatus('submitting');
       
-      // Ensure any pending answer submissions are completed
-      const pendingAnswers = Object.entries(selectedAnswers).map(([questionId, answerId]) => {
-        return quizService.submitAnswer(attemptId, questionId, answerId)
-          .catch(err => {
-            
-            // Continue with other submissions even if one fails
-            return null;
-          });
-      });
-      
-      // Wait for all answer submissions to complete
-      await Promise.all(pendingAnswers);
+      // Flush all selected answers in a single batch before finishing
+      if (Object.keys(selectedAnswers).length > 0) {
+        await quizService.submitAnswers(attemptId, selectedAnswers).catch(() => null);
+      }
       
       // Then finish the quiz attempt
       await quizService.finishQuizAttempt(attemptId);
@@ -302,7 +283,6 @@ const Quiz = () => {
               </div>
               <Timer 
                 initialTime={timeRemaining || 600} // Default to 10 minutes if undefined
-                onTimeUpdate={updateTimerOnServer}
                 onTimeEnd={handleTimerEnd} 
               />
             </div>
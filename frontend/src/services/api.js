@@ -17,14 +17,6 @@ api.interceptors.request.use(
       config.headers.Authorization = `Bearer ${token}`;
     }
     
-    // Add a timestamp to prevent caching
-    const timestamp = new Date().getTime();
-    if (config.url.includes('?')) {
-      config.url = `${config.url}&_t=${timestamp}`;
-    } else {
-      config.url = `${config.url}?_t=${timestamp}`;
-    }
-    
     return config;
   },
   (error) => {
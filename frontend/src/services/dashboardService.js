@@ -27,23 +27,16 @@ export const fetchDashboardData = async () => {
     
     const headers = {
       'Authorization': `Bearer ${token}`,
-      'Content-Type': 'application/json',
-      'Cache-Control': 'no-cache, no-store, must-revalidate',
-      'Pragma': 'no-cache',
-      'Expires': '0'
+      'Content-Type': 'application/json'
     };
     
-    // Add timestamp to prevent caching
-    const timestamp = Date.now();
-    
-    
-    
-    // Make parallel requests
-    const [videosRes, unlockedRes, progressRes] = await Promise.all([
-      axios.get(`http://localhost:8000/api/videos/videos/?t=${timestamp}`, { headers }),
-      axios.get(`http://localhost:8000/api/videos/videos/unlocked/?t=${timestamp}`, { headers }),
-      axios.get(`http://localhost:8000/api/auth/progress/my_progress/?t=${timestamp}`, { headers })
-    ]);
+    // The API sends ETags, so the browser revalidates instead of refetching
+    // Single combined request
+    const dashboardRes = await axios.get(
+      `http://localhost:8000/api/videos/videos/dashboard/`,
+      { headers }
+    );
+    const dashboard = dashboardRes.data || {};
     
     // Log the responses
     
@@ -51,15 +44,15 @@ export const fetchDashboardData = async () => {
     
     
     // Format the progress data
-    let formattedProgress = progressRes.data;
-    if (formattedProgress.overall_progress !== undefined && 
+    let formattedProgress = dashboard.progress;
+    if (formattedProgress && formattedProgress.overall_progress !== undefined && 
         typeof formattedProgress.overall_progress !== 'number') {
       formattedProgress.overall_progress = parseFloat(formattedProgress.overall_progress) || 0;
     }
     
     return {
-      videos: videosRes.data || [],
-      unlockedVideos: unlockedRes.data || [],
+      videos: dashboard.videos || [],
+      unlockedVideos: dashboard.unlocked_videos || [],
       progress: formattedProgress || {
         videos_passed: [],
         videos_failed: [],
@@ -39,11 +39,9 @@ export const authService = {
     return !!localStorage.getItem('access_token');
   },
 
-  // Get user's progress (force fresh data)
+  // Get user's progress (revalidated with ETags)
   getUserProgress: async () => {
-    // Add cache-busting parameter to force fresh data
-    const timestamp = new Date().getTime();
-    const response = await api.get(`auth/progress/my_progress/?t=${timestamp}`);
+    const response = await api.get(`auth/progress/my_progress/`);
     return response.data;
   },
 };
@@ -51,34 +49,41 @@ export const authService = {
 export const videoService = {
   // Get all videos
   getAllVideos: async () => {
-    const timestamp = new Date().getTime();
-    const response = await api.get(`videos/videos/?t=${timestamp}`);
+    const response = await api.get(`videos/videos/`);
     return response.data;
   },
 
   // Get unlocked videos for current user
   getUnlockedVideos: async () => {
-    const timestamp = new Date().getTime();
-    const response = await api.get(`videos/videos/unlocked/?t=${timestamp}`);
+    const response = await api.get(`videos/videos/unlocked/`);
+    return response.data;
+  },
+
+  // Get catalogue, unlock state, attempt summary and progress in one request
+  getDashboard: async () => {
+    const response = await api.get(`videos/videos/dashboard/`);
     return response.data;
   },
 
   // Check if user can attempt a video quiz
   canAttemptVideo: async (videoId) => {
-    const timestamp = new Date().getTime();
-    const response = await api.get(`videos/videos/${videoId}/can_attempt/?t=${timestamp}`);
+    const response = await api.get(`videos/videos/${videoId}/can_attempt/`);
     return response.data;
   },
 
   // Get video details
   getVideoDetails: async (videoId) => {
-    // Add cache-busting parameter to force fresh data
-    const timestamp = new Date().getTime();
-    const response = await api.get(`videos/videos/${videoId}/?t=${timestamp}`);
+    const response = await api.get(`videos/videos/${videoId}/`);
     
     return response.data;
   },
   
+  // Get a short-lived signed URL that streams the video without auth headers
+  getSignedVideoUrl: async (videoId) => {
+    const response = await api.get(`videos/videos/${videoId}/media_url/`);
+    return response.data;
+  },
+
   // Stream video (uses the improved streaming endpoint)
   streamVideo: (videoId) => {
     const baseUrl = process.env.REACT_APP_API_BASE_URL || 'http://localhost:8000';
@@ -117,10 +122,19 @@ export const quizService = {
     return response.data;
   },
 
+  // Submit several answers at once ({ questionId: answerId, ... })
+  submitAnswers: async (attemptId, selections) => {
+    const answers = Object.entries(selections).map(([questionId, answerId]) => ({
+      question_id: Number(questionId),
+      answer_id: Number(answerId),
+    }));
+    const response = await api.post(`quizzes/attempts/${attemptId}/submit_answers/`, { answers });
+    return response.data;
+  },
+
   // Get user answers for an attempt
   getUserAnswers: async (attemptId) => {
-    const timestamp = new Date().getTime();
-    const response = await api.get(`quizzes/attempts/${attemptId}/user_answers/?t=${timestamp}`);
+    const response = await api.get(`quizzes/attempts/${attemptId}/user_answers/`);
     return response.data;
   },
 
@@ -130,19 +144,9 @@ export const quizService = {
     return response.data;
   },
 
-  // Update timer
-  updateTimer: async (attemptId, timeRemaining) => {
-    const response = await api.put(`quizzes/attempts/${attemptId}/update_timer/`, {
-      time_remaining: timeRemaining,
-    });
-    return response.data;
-  },
-
   // Get quiz result
   getQuizResult: async (attemptId) => {
-    // Add cache-busting parameter to force fresh data
-    const timestamp = new Date().getTime();
-    const response = await api.get(`quizzes/attempts/${attemptId}/result/?t=${timestamp}`);
+    const response = await api.get(`quizzes/attempts/${attemptId}/result/`);
     
     // Process the data to ensure percentage is a number
     const data = response.data;
@@ -163,8 +167,7 @@ export const quizService = {
 
   // Get user's quiz attempts
   getUserAttempts: async () => {
-    const timestamp = new Date().getTime();
-    const response = await api.get(`quizzes/attempts/?t=${timestamp}`);
+    const response = await api.get(`quizzes/attempts/`);
     return response.data;
   },
 };
@@ -182,11 +185,35 @@ export const certificateService = {
     return response.data;
   },
 
-  // Download certificate
-  downloadCertificate: async (certificateId) => {
-    const response = await api.get(`auth/certificates/${certificateId}/download/`, {
-      responseType: 'blob',
-    });
+  // Render progress of a certificate PDF
+  getRenderStatus: async (certificateId) => {
+    const response = await api.get(`auth/certificates/${certificateId}/render_status/`);
     return response.data;
   },
+
+  // Download certificate, waiting while the PDF is rendered in the background (202)
+  downloadCertificate: async (certificateId, { interval = 2000, timeout = 120000 } = {}) => {
+    const giveUpAt = Date.now() + timeout;
+    for (;;) {
+      const response = await api.get(`auth/certificates/${certificateId}/download/`, {
+        responseType: 'blob',
+      });
+      if (response.status !== 202) {
+        return response.data;
+      }
+
+      let renderStatus;
+      do {
+        if (Date.now() > giveUpAt) {
+          throw new Error('The certificate is still being prepared. Please try again in a moment.');
+        }
+        await new Promise((resolve) => setTimeout(resolve, interval));
+        renderStatus = await certificateService.getRenderStatus(certificateId);
+      } while (!renderStatus.ready && renderStatus.status !== 'failed');
+
+      if (renderStatus.status === 'failed') {
+        throw new Error('The certificate could not be generated. Please try again later.');
+      }
+    }
+  },
 };
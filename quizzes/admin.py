@@ -1,7 +1,7 @@
 # In quizzes/admin.py
 
 from django.contrib import admin
-from .models import Question, Answer, QuizAttempt, UserAnswer
+from .models import Question, Answer, QuizAttempt, UserAnswer, UserVideoStatus
 
 class AnswerInline(admin.TabularInline):
     model = Answer
@@ -19,8 +19,23 @@ class QuizAttemptAdmin(admin.ModelAdmin):
     list_display = ('user', 'video', 'attempt_number', 'status', 'score', 'percentage', 'is_passed')
     list_filter = ('status', 'is_passed', 'video')
     search_fields = ('user__username', 'video__title')
+    readonly_fields = ('selected_answers',)
+    
+    @admin.display(description='Selected answers')
+    def selected_answers(self, obj):
+        """Answers of either storage layout"""
+        return ', '.join(
+            f"Q{row.question_id}: {row.selected_answer_id} ({'correct' if row.is_correct else 'wrong'})"
+            for row in obj.answer_rows() if row.selected_answer_id
+        ) or '-'
 
 @admin.register(UserAnswer)
 class UserAnswerAdmin(admin.ModelAdmin):
     list_display = ('quiz_attempt', 'question', 'is_correct')
-    list_filter = ('is_correct',)
\ No newline at end of file
+    list_filter = ('is_correct',)
+
+@admin.register(UserVideoStatus)
+class UserVideoStatusAdmin(admin.ModelAdmin):
+    list_display = ('user', 'video', 'attempts_used', 'completed_attempts', 'is_passed', 'best_percentage')
+    list_filter = ('is_passed', 'video')
+    search_fields = ('user__username', 'video__title')
@@ -0,0 +1,113 @@
+"""
+Write-behind buffer for quiz answers.
+
+With settings.QUIZ_ANSWER_BUFFER on, submitted answers are written to the
+'answers' cache instead of the database, one key per question:
+
+    answers:<attempt id>:<question id> -> [answer id, is correct]
+
+and persisted in one transaction when the attempt finishes or times out, or
+when the ``flush_answer_buffer`` command runs. The 'answers' cache must be
+persistent and must not evict entries (file-based or redis), so buffered
+answers survive a worker restart.
+
+An answer is only acknowledged once it is in the buffer and the attempt, read
+under a row lock, is still in progress. Closing an attempt takes the same lock
+before reading the buffer, so an acknowledged answer is always part of the
+flush that closes the attempt.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from . import answer_store
+from .answer_key import get_answer_key
+from .models import QuizAttempt, UserAnswer
+
+
+def enabled():
+    return getattr(settings, 'QUIZ_ANSWER_BUFFER', False)
+
+
+def answer_cache():
+    return caches['answers']
+
+
+def buffer_key(attempt_id, question_id):
+    return f'answers:{attempt_id}:{question_id}'
+
+
+def write(attempt, graded):
+    """
+    Store graded selections, ``{question_id: (answer_id, is_correct)}``.
+
+    Returns False when the attempt was closed concurrently and the answers
+    were not accepted.
+    """
+    if not enabled():
+        answer_store.record(attempt, graded)
+        return True
+    entries = {
+        buffer_key(attempt.pk, question_id): [answer_id, is_correct]
+        for question_id, (answer_id, is_correct) in graded.items()
+    }
+    answer_cache().set_many(entries)
+    with transaction.atomic():
+        accepted = QuizAttempt.objects.select_for_update().filter(pk=attempt.pk, status='in_progress').exists()
+    if not accepted:
+        # The attempt is closed, so no flush would ever clear these keys
+        answer_cache().delete_many(list(entries))
+    return accepted
+
+
+def buffered(attempt):
+    """Buffered selections of an attempt, ``{question_id: (answer_id, is_correct)}``"""
+    keys = {
+        buffer_key(attempt.pk, question_id): question_id
+        for question_id in get_answer_key(attempt.video_id).questions
+    }
+    values = answer_cache().get_many(list(keys))
+    return {keys[key]: tuple(value) for key, value in values.items()}
+
+
+def answer_rows(attempt):
+    """attempt.answer_rows() with the buffered answers of an in-progress attempt applied"""
+    rows = attempt.answer_rows()
+    if not enabled() or attempt.status != 'in_progress':
+        return rows
+    graded = buffered(attempt)
+    rows = [row for row in rows if row.question_id not in graded]
+    rows.extend(
+        UserAnswer(quiz_attempt=attempt, question_id=question_id, selected_answer_id=answer_id, is_correct=is_correct)
+        for question_id, (answer_id, is_correct) in graded.items()
+    )
+    return sorted(rows, key=lambda row: row.question_id)
+
+
+def flush(attempt, discard=False):
+    """
+    Persist an attempt's buffered answers; returns how many there were.
+
+    Must run inside the transaction that closes the attempt when ``discard``
+    is set: the buffer is only cleared once that transaction commits.
+    """
+    with transaction.atomic():
+        QuizAttempt.objects.select_for_update().filter(pk=attempt.pk).exists()
+        graded = buffered(attempt)
+        if graded:
+            answer_store.record(attempt, graded)
+    if graded and discard:
+        keys = [buffer_key(attempt.pk, question_id) for question_id in graded]
+        transaction.on_commit(lambda: answer_cache().delete_many(keys))
+    return len(graded)
+
+
+def flush_in_progress():
+    """Persist the buffers of every in-progress attempt; returns (attempts, answers) flushed"""
+    attempts = flushed = 0
+    for attempt in QuizAttempt.objects.filter(status='in_progress').only('id', 'video_id', 'selections').iterator():
+        count = flush(attempt)
+        if count:
+            attempts += 1
+            flushed += count
+    return attempts, flushed
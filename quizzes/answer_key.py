@@ -0,0 +1,100 @@
+"""
+Per-video answer keys for validating and grading submitted answers.
+
+An answer key maps each question of a video to its answer ids and the ids of
+its correct answers. Keys are kept in a small LRU inside every worker process
+and shared between processes through Django's cache. Each video has a version
+token in the shared cache; signals on Question and Answer replace the token,
+so every worker notices a changed key on its next lookup without a database
+read.
+"""
+import threading
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Answer
+
+CACHE_TIMEOUT = 60 * 60 * 24
+
+_local = OrderedDict()
+_lock = threading.Lock()
+
+
+class AnswerKey:
+    """question_id -> (answer ids, correct answer ids) for one video"""
+
+    def __init__(self, questions):
+        self.questions = questions
+
+    @classmethod
+    def load(cls, video_id):
+        questions = {}
+        rows = Answer.objects.filter(question__video_id=video_id).values_list('question_id', 'id', 'is_correct')
+        for question_id, answer_id, is_correct in rows:
+            answer_ids, correct_ids = questions.setdefault(question_id, (set(), set()))
+            answer_ids.add(answer_id)
+            if is_correct:
+                correct_ids.add(answer_id)
+        return cls({
+            question_id: (frozenset(answer_ids), frozenset(correct_ids))
+            for question_id, (answer_ids, correct_ids) in questions.items()
+        })
+
+    def __contains__(self, question_id):
+        return question_id in self.questions
+
+    def is_valid(self, question_id, answer_id):
+        """True if the answer belongs to the question"""
+        return question_id in self.questions and answer_id in self.questions[question_id][0]
+
+    def is_correct(self, question_id, answer_id):
+        return answer_id in self.questions[question_id][1]
+
+
+def token_key(video_id):
+    return f'answer-key-token:{video_id}'
+
+
+def data_key(video_id, token):
+    return f'answer-key:{video_id}:{token}'
+
+
+def _remember(video_id, token, key):
+    with _lock:
+        _local[video_id] = (token, key)
+        _local.move_to_end(video_id)
+        while len(_local) > getattr(settings, 'ANSWER_KEY_LOCAL_SIZE', 256):
+            _local.popitem(last=False)
+
+
+def get_answer_key(video_id):
+    """Return the video's AnswerKey from the worker LRU, the shared cache or the database"""
+    token = cache.get(token_key(video_id))
+    if token is None:
+        cache.add(token_key(video_id), uuid.uuid4().hex, None)
+        token = cache.get(token_key(video_id))
+
+    with _lock:
+        entry = _local.get(video_id)
+        if entry is not None and entry[0] == token:
+            _local.move_to_end(video_id)
+            return entry[1]
+
+    questions = cache.get(data_key(video_id, token))
+    if questions is None:
+        # Stored under the token read before loading: if the key changes in
+        # the meantime the token is replaced and this entry is never read
+        questions = AnswerKey.load(video_id).questions
+        cache.set(data_key(video_id, token), questions, CACHE_TIMEOUT)
+    key = AnswerKey(questions)
+    _remember(video_id, token, key)
+    return key
+
+
+def invalidate(video_id):
+    cache.set(token_key(video_id), uuid.uuid4().hex, None)
+    with _lock:
+        _local.pop(video_id, None)
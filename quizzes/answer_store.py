@@ -0,0 +1,127 @@
+"""
+Storage of the answers selected during a quiz attempt.
+
+Two layouts are supported and chosen per attempt when it starts, from
+settings.QUIZ_ANSWER_STORAGE:
+
+``rows``     one UserAnswer row per question, created empty at start
+``compact``  a single JSON map on QuizAttempt.selections,
+             ``{"<question id>": [<answer id>, <is correct>]}``
+
+An attempt is compact when its selections column is not NULL. Reads go
+through QuizAttempt.answer_rows(), which synthesizes UserAnswer instances
+for compact attempts, so serializers and the admin work with either layout.
+The ``pack_answers`` command moves existing attempts between layouts.
+"""
+from django.conf import settings
+from django.db import transaction
+
+from .models import QuizAttempt, UserAnswer
+
+
+def use_compact():
+    return getattr(settings, 'QUIZ_ANSWER_STORAGE', 'rows') == 'compact'
+
+
+def initial_selections():
+    """Value of QuizAttempt.selections for a new attempt"""
+    return {} if use_compact() else None
+
+
+def create_placeholders(attempt, question_ids):
+    """Empty answers for every question of a row-layout attempt, in a single INSERT"""
+    if attempt.selections is None:
+        UserAnswer.objects.bulk_create(
+            [UserAnswer(quiz_attempt=attempt, question_id=question_id) for question_id in question_ids]
+        )
+
+
+def record(attempt, graded):
+    """
+    Store graded selections, ``{question_id: (answer_id, is_correct)}``.
+
+    Later selections for a question replace earlier ones.
+    """
+    if attempt.selections is not None:
+        with transaction.atomic():
+            # Lock the row so concurrent submissions do not overwrite each other
+            selections = (
+                QuizAttempt.objects.select_for_update()
+                .values_list('selections', flat=True)
+                .get(pk=attempt.pk)
+            )
+            for question_id, (answer_id, is_correct) in graded.items():
+                selections[str(question_id)] = [answer_id, is_correct]
+            QuizAttempt.objects.filter(pk=attempt.pk).update(selections=selections)
+        attempt.selections = selections
+        return
+
+    # Upsert with one read, one bulk update and one bulk insert
+    existing = {
+        user_answer.question_id: user_answer
+        for user_answer in UserAnswer.objects.filter(quiz_attempt=attempt, question_id__in=graded)
+    }
+    to_update, to_create = [], []
+    for question_id, (answer_id, is_correct) in graded.items():
+        user_answer = existing.get(question_id)
+        if user_answer is None:
+            to_create.append(UserAnswer(
+                quiz_attempt=attempt, question_id=question_id,
+                selected_answer_id=answer_id, is_correct=is_correct
+            ))
+        else:
+            user_answer.selected_answer_id = answer_id
+            user_answer.is_correct = is_correct
+            to_update.append(user_answer)
+    if to_update:
+        UserAnswer.objects.bulk_update(to_update, ['selected_answer', 'is_correct'])
+    if to_create:
+        UserAnswer.objects.bulk_create(to_create)
+
+
+@transaction.atomic
+def pack(attempt_ids):
+    """
+    Move closed row-layout attempts to the compact layout; returns the number packed.
+
+    Running attempts are skipped: row-layout answers are recorded without
+    locking the attempt, so an answer arriving during the move could be lost.
+    """
+    attempts = list(
+        QuizAttempt.objects.select_for_update()
+        .filter(pk__in=attempt_ids, selections__isnull=True)
+        .exclude(status='in_progress')
+        .only('id', 'selections')
+    )
+    if not attempts:
+        return 0
+    selections = {attempt.pk: {} for attempt in attempts}
+    rows = UserAnswer.objects.filter(
+        quiz_attempt__in=attempts, selected_answer__isnull=False
+    ).values_list('quiz_attempt_id', 'question_id', 'selected_answer_id', 'is_correct')
+    for attempt_id, question_id, answer_id, is_correct in rows:
+        selections[attempt_id][str(question_id)] = [answer_id, bool(is_correct)]
+    for attempt in attempts:
+        attempt.selections = selections[attempt.pk]
+    QuizAttempt.objects.bulk_update(attempts, ['selections'])
+    UserAnswer.objects.filter(quiz_attempt__in=attempts).delete()
+    return len(attempts)
+
+
+@transaction.atomic
+def unpack(attempt_ids):
+    """Move compact attempts back to UserAnswer rows; returns the number unpacked"""
+    attempts = list(
+        QuizAttempt.objects.select_for_update()
+        .filter(pk__in=attempt_ids, selections__isnull=False)
+        .only('id', 'selections')
+    )
+    if not attempts:
+        return 0
+    UserAnswer.objects.bulk_create(
+        [row for attempt in attempts for row in attempt.answer_rows()], ignore_conflicts=True
+    )
+    for attempt in attempts:
+        attempt.selections = None
+    QuizAttempt.objects.bulk_update(attempts, ['selections'])
+    return len(attempts)
@@ -0,0 +1,88 @@
+"""
+Bulk expiry of abandoned quiz attempts.
+
+Attempts whose deadline has passed are found with one query on the
+(status, deadline) index, scored with one grouped aggregate and closed as
+``timed_out`` with a single bulk_update.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import answer_buffer, video_status
+from .models import QuizAttempt
+from .scoring import CLOSE_FIELDS, apply_score, score_attempts
+
+
+def overdue_attempts(now=None):
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=QuizAttempt.DEADLINE_GRACE_SECONDS)
+    return QuizAttempt.objects.filter(status='in_progress', deadline__lt=cutoff)
+
+
+def expire_batch(attempts, now=None):
+    """Score and close the given in-progress attempts; returns the closed attempts"""
+    if not attempts:
+        return []
+    now = now or timezone.now()
+    if answer_buffer.enabled():
+        for attempt in attempts:
+            answer_buffer.flush(attempt, discard=True)
+    scores = score_attempts([attempt.pk for attempt in attempts])
+    for attempt in attempts:
+        apply_score(attempt, scores[attempt.pk])
+        attempt.status = 'timed_out'
+        attempt.end_time = now
+        attempt.time_remaining = 0
+
+    QuizAttempt.objects.bulk_update(attempts, CLOSE_FIELDS)
+    # bulk_update sends no signals
+    video_status.refresh((attempt.user_id, attempt.video_id) for attempt in attempts)
+    return attempts
+
+
+def sweep(batch_size=500, dry_run=False, now=None):
+    """
+    Close every overdue attempt in batches.
+
+    Returns metrics: ``found`` overdue attempts, ``closed`` attempts and the
+    number of ``users`` whose progress was refreshed. With ``dry_run``
+    nothing is written and ``closed`` stays 0.
+    """
+    from users.models import UserProgress
+    from users.progress import recalculate_batch
+    from users.versioning import bump_users
+
+    now = now or timezone.now()
+    metrics = {'found': 0, 'closed': 0, 'users': 0}
+    if dry_run:
+        metrics['found'] = overdue_attempts(now).count()
+        return metrics
+
+    affected_users = set()
+    while True:
+        with transaction.atomic():
+            # Locked rows are being finished by a request right now; skip them
+            batch = list(
+                overdue_attempts(now)
+                .select_related('video')
+                .select_for_update(skip_locked=True, of=('self',))
+                .order_by('deadline')[:batch_size]
+            )
+            closed = expire_batch(batch, now)
+            affected_users.update(attempt.user_id for attempt in closed)
+            if closed:
+                bump_users(attempt.user_id for attempt in closed)
+        metrics['found'] += len(batch)
+        metrics['closed'] += len(closed)
+        if len(batch) < batch_size:
+            break
+
+    if affected_users:
+        recalculate_batch(list(
+            UserProgress.objects.filter(user_id__in=affected_users)
+            .only('id', 'user_id', 'total_retries', 'overall_progress')
+        ))
+    metrics['users'] = len(affected_users)
+    return metrics
@@ -0,0 +1,49 @@
+import time
+from django.core.management.base import BaseCommand
+from quizzes.expiry import sweep
+
+
+class Command(BaseCommand):
+    help = 'Close abandoned in-progress quiz attempts whose deadline has passed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many attempts would be closed',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of attempts closed per transaction (default: 500)',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep sweeping every --interval seconds',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=60,
+            help='Seconds between sweeps with --loop (default: 60)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            metrics = sweep(batch_size=max(1, options['batch_size']), dry_run=options['dry_run'])
+            elapsed_ms = (time.monotonic() - started) * 1000
+            if options['dry_run']:
+                self.stdout.write(f'{metrics["found"]} overdue attempts would be closed')
+            elif metrics['found'] or not options['loop']:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f'Closed {metrics["closed"]} of {metrics["found"]} overdue attempts '
+                        f'for {metrics["users"]} users in {elapsed_ms:.0f} ms'
+                    )
+                )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
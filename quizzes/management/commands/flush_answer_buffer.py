@@ -0,0 +1,29 @@
+import time
+from django.core.management.base import BaseCommand
+from quizzes import answer_buffer
+
+
+class Command(BaseCommand):
+    help = 'Write buffered quiz answers of in-progress attempts to the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep flushing every --interval seconds',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=30,
+            help='Seconds between flushes with --loop (default: 30)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            attempts, answers = answer_buffer.flush_in_progress()
+            if attempts or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f'Flushed {answers} answers of {attempts} attempts'))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
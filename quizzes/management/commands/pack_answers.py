@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from quizzes import answer_store
+from quizzes.models import QuizAttempt
+
+
+class Command(BaseCommand):
+    help = 'Move stored quiz answers between UserAnswer rows and the compact per-attempt layout (closed attempts only when packing)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--unpack',
+            action='store_true',
+            help='Convert compact attempts back to UserAnswer rows',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of attempts converted per transaction (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        convert = answer_store.unpack if options['unpack'] else answer_store.pack
+        attempts = QuizAttempt.objects.filter(selections__isnull=not options['unpack'])
+        if not options['unpack']:
+            # Running attempts keep their layout until they are closed
+            attempts = attempts.exclude(status='in_progress')
+        pks = list(attempts.order_by('pk').values_list('pk', flat=True))
+        batch_size = max(1, options['batch_size'])
+        converted = 0
+        for start in range(0, len(pks), batch_size):
+            converted += convert(pks[start:start + batch_size])
+            self.stdout.write(f'{converted}/{len(pks)} attempts converted')
+
+        layout = 'UserAnswer rows' if options['unpack'] else 'compact storage'
+        self.stdout.write(self.style.SUCCESS(f'Moved {converted} attempts to {layout}'))
@@ -0,0 +1,24 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from quizzes.video_status import rebuild_users
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-user, per-video attempt status table from quiz attempts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Number of users rebuilt per batch (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        user_ids = list(get_user_model().objects.order_by('pk').values_list('pk', flat=True))
+        chunk_size = max(1, options['chunk_size'])
+        pairs = 0
+        for start in range(0, len(user_ids), chunk_size):
+            pairs += rebuild_users(user_ids[start:start + chunk_size])
+            self.stdout.write(f'{min(start + chunk_size, len(user_ids))}/{len(user_ids)} users')
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {pairs} video statuses'))
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:11
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def set_deadlines(apps, schema_editor):
+    """In-progress attempts get start_time + the video's time limit"""
+    QuizAttempt = apps.get_model('quizzes', 'QuizAttempt')
+    attempts = QuizAttempt.objects.filter(status='in_progress', deadline__isnull=True).select_related('video')
+    for attempt in attempts:
+        attempt.deadline = attempt.start_time + timedelta(minutes=attempt.video.time_limit)
+        attempt.save(update_fields=['deadline'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizattempt',
+            name='deadline',
+            field=models.DateTimeField(blank=True, help_text='When the quiz time runs out', null=True),
+        ),
+        migrations.RunPython(set_deadlines, migrations.RunPython.noop),
+    ]
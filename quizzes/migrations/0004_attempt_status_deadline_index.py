@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0003_attempt_deadline'),
+        ('videos', '0002_hls'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['status', 'deadline'], name='quiz_attempt_status_deadline'),
+        ),
+    ]
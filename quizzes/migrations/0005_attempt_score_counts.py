@@ -0,0 +1,61 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:16
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def store_counts(apps, schema_editor):
+    """Closed attempts get the counts the result endpoint used to compute"""
+    QuizAttempt = apps.get_model('quizzes', 'QuizAttempt')
+    Question = apps.get_model('quizzes', 'Question')
+    question_count = (
+        Question.objects.filter(video_id=OuterRef('video_id'))
+        .order_by().values('video_id').annotate(count=Count('id')).values('count')
+    )
+    rows = (
+        QuizAttempt.objects.exclude(status='in_progress')
+        .values('id')
+        .annotate(
+            total=Coalesce(Subquery(question_count), 0),
+            answered=Count('user_answers', filter=Q(user_answers__selected_answer__isnull=False)),
+            correct=Count('user_answers', filter=Q(user_answers__is_correct=True)),
+        )
+        .order_by()
+    )
+    attempts = [
+        QuizAttempt(
+            id=row['id'], total_questions=row['total'],
+            questions_attempted=row['answered'], correct_answers=row['correct']
+        )
+        for row in rows
+    ]
+    QuizAttempt.objects.bulk_update(
+        attempts, ['total_questions', 'questions_attempted', 'correct_answers'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0004_attempt_status_deadline_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizattempt',
+            name='correct_answers',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='questions_attempted',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='total_questions',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(store_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0005_attempt_score_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizattempt',
+            name='selections',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_statuses(apps, schema_editor):
+    """One status row per (user, video) with attempts, as quizzes/video_status.py computes it"""
+    QuizAttempt = apps.get_model('quizzes', 'QuizAttempt')
+    UserVideoStatus = apps.get_model('quizzes', 'UserVideoStatus')
+    grouped = {}
+    for attempt in QuizAttempt.objects.order_by('attempt_number').iterator():
+        grouped.setdefault((attempt.user_id, attempt.video_id), []).append(attempt)
+
+    statuses = []
+    for (user_id, video_id), attempts in grouped.items():
+        status = UserVideoStatus(user_id=user_id, video_id=video_id, attempts_used=len(attempts))
+        for attempt in attempts:
+            if attempt.status == 'completed':
+                status.completed_attempts += 1
+                status.completed_passed += 1 if attempt.is_passed else 0
+            if attempt.status == 'in_progress':
+                status.in_progress_attempt_id = attempt.id
+                status.in_progress_deadline = attempt.deadline
+                status.in_progress_time_remaining = attempt.time_remaining
+            if attempt.percentage is not None and (
+                status.best_percentage is None or attempt.percentage > status.best_percentage
+            ):
+                status.best_percentage = attempt.percentage
+            if attempt.is_passed and not status.is_passed:
+                status.is_passed = True
+                status.passed_percentage = attempt.percentage
+        statuses.append(status)
+    UserVideoStatus.objects.bulk_create(statuses, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0006_attempt_selections'),
+        ('videos', '0002_hls'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserVideoStatus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts_used', models.PositiveIntegerField(default=0)),
+                ('completed_attempts', models.PositiveIntegerField(default=0)),
+                ('completed_passed', models.PositiveIntegerField(default=0)),
+                ('is_passed', models.BooleanField(default=False)),
+                ('passed_percentage', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('best_percentage', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('in_progress_deadline', models.DateTimeField(blank=True, null=True)),
+                ('in_progress_time_remaining', models.IntegerField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('in_progress_attempt', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='quizzes.quizattempt')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='video_statuses', to=settings.AUTH_USER_MODEL)),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_statuses', to='videos.video')),
+            ],
+            options={
+                'verbose_name_plural': 'user video statuses',
+                'db_table': 'user_video_status',
+                'unique_together': {('user', 'video')},
+            },
+        ),
+        migrations.RunPython(build_statuses, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:24
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.utils import timezone
+
+
+def time_out(attempt, Question, now):
+    """Close an attempt like QuizAttempt.time_out, scoring the answers it has"""
+    total = Question.objects.filter(video_id=attempt.video_id).count()
+    if attempt.selections is not None:
+        answered = len(attempt.selections)
+        correct = sum(1 for _, is_correct in attempt.selections.values() if is_correct)
+    else:
+        answered = attempt.user_answers.filter(selected_answer__isnull=False).count()
+        correct = attempt.user_answers.filter(is_correct=True).count()
+    attempt.total_questions = total
+    attempt.questions_attempted = answered
+    attempt.correct_answers = correct
+    attempt.score = correct
+    attempt.percentage = float(correct) / float(total) * 100.0 if total > 0 else 0.0
+    attempt.is_passed = attempt.percentage >= attempt.video.passing_percentage
+    attempt.status = 'timed_out'
+    attempt.end_time = now
+    attempt.time_remaining = 0
+    attempt.save()
+
+
+def close_duplicate_attempts(apps, schema_editor):
+    """Keep only the latest in-progress attempt per user and video, timing out the others"""
+    QuizAttempt = apps.get_model('quizzes', 'QuizAttempt')
+    Question = apps.get_model('quizzes', 'Question')
+    UserVideoStatus = apps.get_model('quizzes', 'UserVideoStatus')
+    now = timezone.now()
+    duplicates = (
+        QuizAttempt.objects.filter(status='in_progress')
+        .values('user_id', 'video_id').annotate(running=Count('id')).filter(running__gt=1)
+    )
+    for pair in duplicates:
+        attempts = list(
+            QuizAttempt.objects.filter(status='in_progress', user_id=pair['user_id'], video_id=pair['video_id'])
+            .select_related('video').order_by('-attempt_number')
+        )
+        kept = attempts[0]
+        for attempt in attempts[1:]:
+            time_out(attempt, Question, now)
+        UserVideoStatus.objects.filter(user_id=kept.user_id, video_id=kept.video_id).update(
+            in_progress_attempt_id=kept.pk, in_progress_deadline=kept.deadline,
+            in_progress_time_remaining=kept.time_remaining
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0007_user_video_status'),
+        ('videos', '0002_hls'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='useranswer',
+            index=models.Index(fields=['quiz_attempt', 'is_correct', 'selected_answer'], name='user_answer_attempt_correct'),
+        ),
+        migrations.RunPython(close_duplicate_attempts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='quizattempt',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'in_progress')), fields=('user', 'video'), name='one_in_progress_attempt'),
+        ),
+    ]
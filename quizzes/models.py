@@ -1,5 +1,7 @@
-from django.db import models
+from datetime import timedelta
+from django.db import models, transaction
 from django.conf import settings
+from django.utils import timezone
 from videos.models import Video
 
 class Question(models.Model):
@@ -36,6 +38,9 @@ class QuizAttempt(models.Model):
         ('completed', 'Completed'),
         ('timed_out', 'Timed Out'),
     )
+    MAX_ATTEMPTS = 2
+    # Answers arriving this late after the deadline are still accepted (network latency)
+    DEADLINE_GRACE_SECONDS = 5
     
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='quiz_attempts')
     video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='attempts')
@@ -43,17 +48,84 @@ class QuizAttempt(models.Model):
     start_time = models.DateTimeField(auto_now_add=True)
     end_time = models.DateTimeField(null=True, blank=True)
     time_remaining = models.IntegerField(help_text="Time remaining in seconds")
+    deadline = models.DateTimeField(null=True, blank=True, help_text="When the quiz time runs out")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='in_progress')
     score = models.IntegerField(null=True, blank=True)
     percentage = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     is_passed = models.BooleanField(null=True, blank=True)
+    # Stored when the attempt is closed so results need no counting
+    total_questions = models.IntegerField(null=True, blank=True)
+    questions_attempted = models.IntegerField(null=True, blank=True)
+    correct_answers = models.IntegerField(null=True, blank=True)
+    # Compact answer storage: {"<question id>": [<answer id>, <is correct>]}; NULL when
+    # the answers are kept as UserAnswer rows (see quizzes/answer_store.py)
+    selections = models.JSONField(null=True, blank=True)
     
     class Meta:
         db_table = 'quiz_attempts'
         unique_together = ['user', 'video', 'attempt_number']
+        indexes = [
+            # Sweeper lookup of expired in-progress attempts
+            models.Index(fields=['status', 'deadline'], name='quiz_attempt_status_deadline'),
+        ]
+        constraints = [
+            # At most one running attempt per user and video; also serves the
+            # (user, video, status='in_progress') lookup when resuming
+            models.UniqueConstraint(
+                fields=['user', 'video'],
+                condition=models.Q(status='in_progress'),
+                name='one_in_progress_attempt',
+            ),
+        ]
         
     def __str__(self):
         return f"{self.user.username} - {self.video.title} - Attempt {self.attempt_number}"
+    
+    def seconds_remaining(self, now=None):
+        """Remaining quiz time, computed from the deadline"""
+        if self.status != 'in_progress' or self.deadline is None:
+            return self.time_remaining
+        now = now or timezone.now()
+        return max(0, int((self.deadline - now).total_seconds()))
+    
+    def is_overdue(self, now=None):
+        """True for an in-progress attempt whose deadline (plus grace) has passed"""
+        if self.status != 'in_progress' or self.deadline is None:
+            return False
+        now = now or timezone.now()
+        return now > self.deadline + timedelta(seconds=self.DEADLINE_GRACE_SECONDS)
+    
+    def answer_rows(self):
+        """UserAnswer rows of the attempt; unsaved instances for compact attempts"""
+        if self.selections is None:
+            return list(self.user_answers.all())
+        return [
+            UserAnswer(
+                quiz_attempt=self, question_id=int(question_id),
+                selected_answer_id=answer_id, is_correct=is_correct
+            )
+            for question_id, (answer_id, is_correct) in sorted(self.selections.items(), key=lambda item: int(item[0]))
+        ]
+    
+    def time_out(self):
+        """Close an attempt whose time ran out, scoring the answers given so far"""
+        from . import answer_buffer
+        from .scoring import CLOSE_FIELDS, apply_score, score_attempt
+
+        with transaction.atomic():
+            # Work on the locked current row: answers (compact selections) may
+            # have been recorded since this instance was loaded
+            QuizAttempt.objects.select_for_update().filter(pk=self.pk).exists()
+            self.refresh_from_db()
+            if self.status != 'in_progress':
+                return
+            if answer_buffer.enabled():
+                answer_buffer.flush(self, discard=True)
+            apply_score(self, score_attempt(self))
+            self.status = 'timed_out'
+            self.end_time = timezone.now()
+            self.time_remaining = 0
+            self.save(update_fields=CLOSE_FIELDS)
 
 class UserAnswer(models.Model):
     quiz_attempt = models.ForeignKey(QuizAttempt, on_delete=models.CASCADE, related_name='user_answers')
@@ -64,6 +136,50 @@ class UserAnswer(models.Model):
     class Meta:
         db_table = 'user_answers'
         unique_together = ['quiz_attempt', 'question']
+        indexes = [
+            # Covers the per-attempt answered/correct counts of scoring
+            models.Index(fields=['quiz_attempt', 'is_correct', 'selected_answer'], name='user_answer_attempt_correct'),
+        ]
         
     def __str__(self):
-        return f"{self.quiz_attempt} - {self.question}"
\ No newline at end of file
+        return f"{self.quiz_attempt} - {self.question}"
+
+
+class UserVideoStatus(models.Model):
+    """
+    Attempt summary of one user on one video.
+
+    Derived from quiz_attempts and kept up to date in the transaction that
+    starts, finishes or times out an attempt (see quizzes/video_status.py), so
+    unlock checks and progress read one row per video instead of the attempts.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='video_statuses')
+    video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='user_statuses')
+    attempts_used = models.PositiveIntegerField(default=0)
+    completed_attempts = models.PositiveIntegerField(default=0)
+    completed_passed = models.PositiveIntegerField(default=0)
+    is_passed = models.BooleanField(default=False)
+    # Percentage of the first passing attempt and the best of all attempts
+    passed_percentage = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    best_percentage = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    in_progress_attempt = models.ForeignKey(
+        QuizAttempt, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    in_progress_deadline = models.DateTimeField(null=True, blank=True)
+    in_progress_time_remaining = models.IntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'user_video_status'
+        unique_together = ['user', 'video']
+        verbose_name_plural = 'user video statuses'
+        
+    def __str__(self):
+        return f"{self.user_id} - {self.video_id} ({'passed' if self.is_passed else self.attempts_used})"
+    
+    def seconds_remaining(self, now=None):
+        """Remaining time of the in-progress attempt, computed from its deadline"""
+        if self.in_progress_deadline is None:
+            return self.in_progress_time_remaining
+        now = now or timezone.now()
+        return max(0, int((self.in_progress_deadline - now).total_seconds()))
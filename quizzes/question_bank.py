@@ -0,0 +1,53 @@
+"""
+Per-video question bank cache for QuestionViewSet.by_video.
+
+The serialized questions of a video (with their answers, never the correct
+flags) are stored as ready-to-send JSON bytes in Django's cache. A miss fills
+the entry from one prefetched query. As with the answer keys, each video has a
+version token in the cache and entries are stored under it; signals on
+Question and Answer replace the token, so a bank built from rows read before
+an edit committed is never served.
+"""
+import uuid
+
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+
+from .models import Question
+from .serializers import QuestionSerializer
+
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def token_key(video_id):
+    return f'question-bank-token:{video_id}'
+
+
+def data_key(video_id, token):
+    return f'question-bank:{video_id}:{token}'
+
+
+def get_question_bank(video_id):
+    """Return the JSON bytes of the video's questions, building them on a miss"""
+    token = cache.get(token_key(video_id))
+    if token is None:
+        cache.add(token_key(video_id), uuid.uuid4().hex, None)
+        token = cache.get(token_key(video_id))
+
+    key = data_key(video_id, token)
+    payload = cache.get(key)
+    if payload is None:
+        questions = (
+            Question.objects.filter(video_id=video_id)
+            .order_by('sequence_number')
+            .prefetch_related('answers')
+        )
+        payload = JSONRenderer().render(QuestionSerializer(questions, many=True).data)
+        # Stored under the token read before loading: if the questions change
+        # in the meantime the token is replaced and this entry is never read
+        cache.set(key, payload, CACHE_TIMEOUT)
+    return payload
+
+
+def invalidate(video_id):
+    cache.set(token_key(video_id), uuid.uuid4().hex, None)
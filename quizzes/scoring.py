@@ -0,0 +1,65 @@
+"""
+Scoring of quiz attempts.
+
+Total, answered and correct counts of an attempt come from one grouped
+aggregate (or the compact selections) and are stored on the attempt when it
+is closed, so showing a result later does not count anything again.
+"""
+from collections import namedtuple
+
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Question, QuizAttempt
+
+Score = namedtuple('Score', ['total', 'answered', 'correct'])
+
+# Fields written by apply_score
+SCORE_FIELDS = ['total_questions', 'questions_attempted', 'correct_answers', 'score', 'percentage', 'is_passed']
+# Fields written when an attempt is closed
+CLOSE_FIELDS = SCORE_FIELDS + ['status', 'end_time', 'time_remaining']
+
+
+def score_attempts(attempt_ids):
+    """Return {attempt_id: Score} for the given attempts from a single query"""
+    question_count = (
+        Question.objects.filter(video_id=OuterRef('video_id'))
+        .order_by()
+        .values('video_id')
+        .annotate(count=Count('id'))
+        .values('count')
+    )
+    rows = (
+        QuizAttempt.objects.filter(pk__in=attempt_ids)
+        .values('id', 'selections')
+        .annotate(
+            total=Coalesce(Subquery(question_count), 0),
+            answered=Count('user_answers', filter=Q(user_answers__selected_answer__isnull=False)),
+            correct=Count('user_answers', filter=Q(user_answers__is_correct=True)),
+        )
+        .order_by()
+    )
+    scores = {}
+    for row in rows:
+        selections = row['selections']
+        if selections is not None:
+            # Compact attempt: the counts come from its own selections
+            row['answered'] = len(selections)
+            row['correct'] = sum(1 for _, is_correct in selections.values() if is_correct)
+        scores[row['id']] = Score(row['total'], row['answered'], row['correct'])
+    return scores
+
+
+def score_attempt(attempt):
+    return score_attempts([attempt.pk]).get(attempt.pk, Score(0, 0, 0))
+
+
+def apply_score(attempt, score):
+    """Store a Score on the attempt with the resulting percentage and pass flag (not saved)"""
+    attempt.total_questions = score.total
+    attempt.questions_attempted = score.answered
+    attempt.correct_answers = score.correct
+    attempt.score = score.correct
+    # Force float division to avoid integer division
+    attempt.percentage = float(score.correct) / float(score.total) * 100.0 if score.total > 0 else 0.0
+    attempt.is_passed = attempt.percentage >= attempt.video.passing_percentage
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Question, Answer, QuizAttempt, UserAnswer
+from . import answer_buffer
 
 class AnswerSerializer(serializers.ModelSerializer):
     class Meta:
@@ -20,22 +21,28 @@ class UserAnswerSerializer(serializers.ModelSerializer):
         fields = ['id', 'question', 'selected_answer']
 
 class QuizAttemptSerializer(serializers.ModelSerializer):
-    user_answers = UserAnswerSerializer(many=True, read_only=True)
+    user_answers = serializers.SerializerMethodField()
+    time_remaining = serializers.SerializerMethodField()
     
     class Meta:
         model = QuizAttempt
         fields = [
             'id', 'user', 'video', 'attempt_number', 'start_time', 
-            'end_time', 'time_remaining', 'status', 'score', 
+            'end_time', 'deadline', 'time_remaining', 'status', 'score', 
             'percentage', 'is_passed', 'user_answers'
         ]
-        read_only_fields = ['user', 'start_time', 'end_time', 'score', 'percentage', 'is_passed']
+        read_only_fields = ['user', 'start_time', 'end_time', 'deadline', 'score', 'percentage', 'is_passed']
+    
+    def get_time_remaining(self, obj):
+        """Computed from the deadline; clients cannot change it"""
+        return obj.seconds_remaining()
+    
+    def get_user_answers(self, obj):
+        """Includes answers still in the write-behind buffer"""
+        return UserAnswerSerializer(answer_buffer.answer_rows(obj), many=True).data
 
 class QuizResultSerializer(serializers.ModelSerializer):
     """Serializer for quiz results without revealing correct answers"""
-    total_questions = serializers.SerializerMethodField()
-    questions_attempted = serializers.SerializerMethodField()
-    correct_answers = serializers.SerializerMethodField()
     
     class Meta:
         model = QuizAttempt
@@ -44,16 +51,10 @@ class QuizResultSerializer(serializers.ModelSerializer):
             'questions_attempted', 'correct_answers', 'score', 
             'percentage', 'is_passed', 'status'
         ]
-    
-    def get_total_questions(self, obj):
-        return Question.objects.filter(video=obj.video).count()
-    
-    def get_questions_attempted(self, obj):
-        return obj.user_answers.count()
-    
-    def get_correct_answers(self, obj):
-        return obj.user_answers.filter(is_correct=True).count()
 
 class SubmitAnswerSerializer(serializers.Serializer):
     question_id = serializers.IntegerField()
-    answer_id = serializers.IntegerField()
\ No newline at end of file
+    answer_id = serializers.IntegerField()
+
+class SubmitAnswersSerializer(serializers.Serializer):
+    answers = SubmitAnswerSerializer(many=True, allow_empty=False)
\ No newline at end of file
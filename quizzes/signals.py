@@ -0,0 +1,56 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from .models import Question, Answer, QuizAttempt
+from . import answer_key, question_bank, video_status
+
+
+def invalidate_caches(*video_ids):
+    """
+    Drop the videos' question banks and answer keys once the edit is committed.
+
+    Invalidating earlier would let a concurrent request miss the cache, read
+    the rows from before the commit and store them under the new version.
+    """
+    video_ids = {video_id for video_id in video_ids if video_id is not None}
+
+    def invalidate():
+        for video_id in video_ids:
+            question_bank.invalidate(video_id)
+            answer_key.invalidate(video_id)
+    transaction.on_commit(invalidate)
+
+
+@receiver(pre_save, sender=Question)
+def remember_question_video(sender, instance, **kwargs):
+    """A question moved to another video leaves the old video's caches stale too"""
+    instance._previous_video_id = (
+        Question.objects.filter(pk=instance.pk).values_list('video_id', flat=True).first()
+        if instance.pk else None
+    )
+
+
+@receiver(pre_save, sender=Answer)
+def remember_answer_video(sender, instance, **kwargs):
+    """An answer moved to another question leaves the old question's video stale too"""
+    instance._previous_video_id = (
+        Answer.objects.filter(pk=instance.pk).values_list('question__video_id', flat=True).first()
+        if instance.pk else None
+    )
+
+
+@receiver([post_save, post_delete], sender=Question)
+def invalidate_question_bank(sender, instance, **kwargs):
+    invalidate_caches(instance.video_id, getattr(instance, '_previous_video_id', None))
+
+
+@receiver([post_save, post_delete], sender=Answer)
+def invalidate_answer_question_bank(sender, instance, **kwargs):
+    video_id = Question.objects.filter(pk=instance.question_id).values_list('video_id', flat=True).first()
+    invalidate_caches(video_id, getattr(instance, '_previous_video_id', None))
+
+
+@receiver([post_save, post_delete], sender=QuizAttempt)
+def refresh_video_status(sender, instance, **kwargs):
+    """Keep the user's status row for the video in step, in the same transaction"""
+    video_status.refresh([(instance.user_id, instance.video_id)])
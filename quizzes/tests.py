@@ -1,3 +1,538 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from users.models import User
+from videos.models import Video
+from .models import Question, Answer
 
-# Create your tests here.
+
+class QuizTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='learner',
+            email='learner@example.com',
+            password='password123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.video = Video.objects.create(
+            title='Video 1', description='', duration=60,
+            sequence_number=1, time_limit=10
+        )
+        self.questions = []
+        for q in range(1, 4):
+            question = Question.objects.create(
+                video=self.video, question_text=f'Question {q}', sequence_number=q
+            )
+            for a in range(1, 4):
+                Answer.objects.create(
+                    question=question, answer_text=f'Answer {a}',
+                    sequence_number=a, is_correct=(a == 1)
+                )
+            self.questions.append(question)
+
+
+class QuestionBankTestCase(QuizTestCase):
+    def test_by_video_is_cached_and_invalidated(self):
+        """by_video is served from the cache until questions or answers change"""
+        url = reverse('question-by-video') + f'?video_id={self.video.id}'
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual([q['question_text'] for q in data], ['Question 1', 'Question 2', 'Question 3'])
+        self.assertEqual(len(data[0]['answers']), 3)
+        self.assertNotIn('is_correct', data[0]['answers'][0])
+
+        # Only the state version lookup; the payload comes from the cache
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+        answer = self.questions[0].answers.first()
+        answer.answer_text = 'Changed'
+        # The cache is only dropped once the edit is committed
+        with self.captureOnCommitCallbacks(execute=True):
+            answer.save()
+        data = self.client.get(url).json()
+        self.assertEqual(data[0]['answers'][0]['answer_text'], 'Changed')
+
+    def test_bank_built_during_an_edit_is_not_served(self):
+        from unittest import mock
+        from . import question_bank
+        serializer = question_bank.QuestionSerializer
+
+        def edit_meanwhile(*args, **kwargs):
+            # The edit commits while this reader builds the bank from the old rows
+            question_bank.invalidate(self.video.id)
+            return serializer(*args, **kwargs)
+
+        with mock.patch('quizzes.question_bank.QuestionSerializer', side_effect=edit_meanwhile):
+            question_bank.get_question_bank(self.video.id)
+        # The next reader builds the bank again rather than reading the old one
+        with self.assertNumQueries(2):
+            question_bank.get_question_bank(self.video.id)
+
+    def test_moved_question_leaves_both_videos_fresh(self):
+        from videos.models import Video
+        from .answer_key import get_answer_key
+        from .question_bank import get_question_bank
+        other = Video.objects.create(title='Video 2', description='', duration=60, sequence_number=2, time_limit=10)
+        question = self.questions[0]
+        get_question_bank(self.video.id)
+        get_answer_key(self.video.id)
+
+        question.video = other
+        with self.captureOnCommitCallbacks(execute=True):
+            question.save()
+        self.assertNotIn(question.id, get_answer_key(self.video.id))
+        self.assertNotIn(b'Question 1', get_question_bank(self.video.id))
+        self.assertIn(question.id, get_answer_key(other.id))
+
+        # An answer moved to a question of the other video
+        answer = self.questions[1].answers.first()
+        get_question_bank(self.video.id)
+        answer.question = question
+        with self.captureOnCommitCallbacks(execute=True):
+            answer.save()
+        self.assertFalse(get_answer_key(self.video.id).is_valid(self.questions[1].id, answer.id))
+
+    def test_by_video_requires_video_id(self):
+        response = self.client.get(reverse('question-by-video'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class QuizAttemptStartTestCase(QuizTestCase):
+    def test_start_creates_placeholder_answers(self):
+        url = reverse('attempts-start')
+        response = self.client.post(url, {'video_id': self.video.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['attempt_number'], 1)
+        self.assertEqual(len(response.data['user_answers']), 3)
+
+        # Starting again resumes the in-progress attempt
+        again = self.client.post(url, {'video_id': self.video.id}, format='json')
+        self.assertEqual(again.data['id'], response.data['id'])
+
+    def test_start_query_count_does_not_grow_with_questions(self):
+        for q in range(4, 40):
+            Question.objects.create(video=self.video, question_text=f'Question {q}', sequence_number=q)
+        url = reverse('attempts-start')
+        # Includes the two queries refreshing the user's video status row
+        with self.assertNumQueries(14):
+            response = self.client.post(url, {'video_id': self.video.id}, format='json')
+        self.assertEqual(len(response.data['user_answers']), 39)
+
+    def test_start_respects_attempt_limit(self):
+        from .models import QuizAttempt
+        for number in (1, 2):
+            QuizAttempt.objects.create(
+                user=self.user, video=self.video, attempt_number=number,
+                time_remaining=0, status='completed', is_passed=False
+            )
+        response = self.client.post(reverse('attempts-start'), {'video_id': self.video.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SubmitAnswersTestCase(QuizTestCase):
+    def setUp(self):
+        super().setUp()
+        response = self.client.post(reverse('attempts-start'), {'video_id': self.video.id}, format='json')
+        self.attempt_id = response.data['id']
+        self.url = reverse('attempts-submit-answers', args=[self.attempt_id])
+
+    def test_submit_answers_in_bulk(self):
+        from .models import UserAnswer
+        first, second = self.questions[0], self.questions[1]
+        payload = {'answers': [
+            {'question_id': first.id, 'answer_id': first.answers.get(sequence_number=1).id},
+            {'question_id': second.id, 'answer_id': second.answers.get(sequence_number=2).id},
+        ]}
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r['is_correct'] for r in response.data['results']], [True, False]
+        )
+        answers = UserAnswer.objects.filter(quiz_attempt_id=self.attempt_id, selected_answer__isnull=False)
+        self.assertEqual(answers.count(), 2)
+        self.assertEqual(answers.filter(is_correct=True).count(), 1)
+
+    def test_submit_answers_rejects_foreign_answers(self):
+        first, second = self.questions[0], self.questions[1]
+        payload = {'answers': [
+            {'question_id': first.id, 'answer_id': second.answers.first().id},
+        ]}
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['invalid_question_ids'], [first.id])
+
+    def test_finish_stores_counts_for_result(self):
+        """finish persists the counts so viewing the result is a single query"""
+        first, second = self.questions[0], self.questions[1]
+        self.client.post(self.url, {'answers': [
+            {'question_id': first.id, 'answer_id': first.answers.get(sequence_number=1).id},
+            {'question_id': second.id, 'answer_id': second.answers.get(sequence_number=2).id},
+        ]}, format='json')
+        response = self.client.post(reverse('attempts-finish', args=[self.attempt_id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            (response.data['total_questions'], response.data['questions_attempted'], response.data['correct_answers']),
+            (3, 2, 1)
+        )
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('attempts-result', args=[self.attempt_id]))
+        self.assertEqual(response.data['correct_answers'], 1)
+        self.assertEqual(response.data['percentage'], '33.33')
+
+    def test_answer_key_avoids_question_queries(self):
+        """Answers are validated and graded from the answer key, which follows edits"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        question = self.questions[0]
+        wrong = question.answers.get(sequence_number=2)
+        url = reverse('attempts-submit-answer', args=[self.attempt_id])
+        self.client.post(url, {'question_id': question.id, 'answer_id': wrong.id}, format='json')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, {'question_id': question.id, 'answer_id': wrong.id}, format='json')
+        self.assertFalse(response.data['is_correct'])
+        sql = ' '.join(query['sql'] for query in queries.captured_queries)
+        self.assertNotIn('FROM "answers"', sql)
+        self.assertNotIn('FROM "questions"', sql)
+
+        wrong.is_correct = True
+        with self.captureOnCommitCallbacks(execute=True):
+            wrong.save()
+        response = self.client.post(url, {'question_id': question.id, 'answer_id': wrong.id}, format='json')
+        self.assertTrue(response.data['is_correct'])
+
+        response = self.client.post(
+            url, {'question_id': question.id, 'answer_id': self.questions[1].answers.first().id}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(QUIZ_ANSWER_STORAGE='compact')
+class CompactAnswerStorageTestCase(QuizTestCase):
+    def setUp(self):
+        super().setUp()
+        response = self.client.post(reverse('attempts-start'), {'video_id': self.video.id}, format='json')
+        self.attempt_id = response.data['id']
+
+    def submit(self, question, sequence_number):
+        return self.client.post(
+            reverse('attempts-submit-answer', args=[self.attempt_id]),
+            {'question_id': question.id, 'answer_id': question.answers.get(sequence_number=sequence_number).id},
+            format='json'
+        )
+
+    def test_answers_live_on_the_attempt(self):
+        from .models import QuizAttempt, UserAnswer
+        self.submit(self.questions[0], 1)
+        self.submit(self.questions[1], 2)
+        self.submit(self.questions[1], 1)
+        self.assertFalse(UserAnswer.objects.exists())
+        self.assertEqual(len(QuizAttempt.objects.get(pk=self.attempt_id).selections), 2)
+
+        response = self.client.get(reverse('attempts-user-answers', args=[self.attempt_id]))
+        self.assertEqual(
+            [(row['question'], row['selected_answer']) for row in response.data],
+            [(q.id, q.answers.get(sequence_number=1).id) for q in self.questions[:2]]
+        )
+
+        response = self.client.post(reverse('attempts-finish', args=[self.attempt_id]))
+        self.assertEqual(
+            (response.data['total_questions'], response.data['questions_attempted'], response.data['correct_answers']),
+            (3, 2, 2)
+        )
+
+    def test_unpack_and_pack_existing_attempts(self):
+        """pack_answers moves attempts between UserAnswer rows and the compact column"""
+        from io import StringIO
+        from django.core.management import call_command
+        from .models import QuizAttempt, UserAnswer
+        self.submit(self.questions[2], 2)
+        selections = QuizAttempt.objects.get(pk=self.attempt_id).selections
+        url = reverse('attempts-user-answers', args=[self.attempt_id])
+        before = self.client.get(url).data
+
+        call_command('pack_answers', '--unpack', stdout=StringIO())
+        self.assertIsNone(QuizAttempt.objects.get(pk=self.attempt_id).selections)
+        self.assertEqual(UserAnswer.objects.filter(quiz_attempt_id=self.attempt_id).count(), 1)
+        self.assertEqual(self.client.get(url).data[0]['selected_answer'], before[0]['selected_answer'])
+
+        # Running attempts are only packed once they are closed
+        call_command('pack_answers', stdout=StringIO())
+        self.assertIsNone(QuizAttempt.objects.get(pk=self.attempt_id).selections)
+        QuizAttempt.objects.filter(pk=self.attempt_id).update(status='timed_out')
+        call_command('pack_answers', stdout=StringIO())
+        self.assertFalse(UserAnswer.objects.exists())
+        self.assertEqual(QuizAttempt.objects.get(pk=self.attempt_id).selections, selections)
+
+    def test_time_out_keeps_answers_recorded_after_loading(self):
+        """Closing a stale instance neither drops nor miscounts newer selections"""
+        from .models import QuizAttempt
+        stale = QuizAttempt.objects.get(pk=self.attempt_id)
+        self.submit(self.questions[0], 1)
+        self.submit(self.questions[1], 1)
+        stale.time_out()
+        attempt = QuizAttempt.objects.get(pk=self.attempt_id)
+        self.assertEqual((attempt.status, attempt.correct_answers), ('timed_out', 2))
+        self.assertEqual(len(attempt.selections), 2)
+
+
+@override_settings(QUIZ_ANSWER_BUFFER=True)
+class AnswerBufferTestCase(QuizTestCase):
+    def setUp(self):
+        super().setUp()
+        from django.core.cache import caches
+        caches['answers'].clear()
+        response = self.client.post(reverse('attempts-start'), {'video_id': self.video.id}, format='json')
+        self.attempt_id = response.data['id']
+
+    def submit(self, question, sequence_number):
+        return self.client.post(
+            reverse('attempts-submit-answer', args=[self.attempt_id]),
+            {'question_id': question.id, 'answer_id': question.answers.get(sequence_number=sequence_number).id},
+            format='json'
+        )
+
+    def answered(self):
+        from .models import UserAnswer
+        return UserAnswer.objects.filter(quiz_attempt_id=self.attempt_id, selected_answer__isnull=False).count()
+
+    def test_answers_are_written_on_finish(self):
+        from django.core.cache import caches
+        self.assertTrue(self.submit(self.questions[0], 1).data['is_correct'])
+        self.submit(self.questions[1], 2)
+        self.assertEqual(self.answered(), 0)
+
+        response = self.client.get(reverse('attempts-user-answers', args=[self.attempt_id]))
+        self.assertEqual(len([row for row in response.data if row['selected_answer']]), 2)
+        response = self.client.get(reverse('attempts-detail', args=[self.attempt_id]))
+        self.assertEqual(len([row for row in response.data['user_answers'] if row['selected_answer']]), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('attempts-finish', args=[self.attempt_id]))
+        self.assertEqual((response.data['questions_attempted'], response.data['correct_answers']), (2, 1))
+        self.assertEqual(self.answered(), 2)
+        self.assertIsNone(caches['answers'].get(f'answers:{self.attempt_id}:{self.questions[0].id}'))
+
+        response = self.submit(self.questions[2], 1)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_answers_to_a_closed_attempt_leave_no_keys(self):
+        from django.core.cache import caches
+        from . import answer_buffer
+        from .models import QuizAttempt
+        attempt = QuizAttempt.objects.get(pk=self.attempt_id)
+        QuizAttempt.objects.filter(pk=self.attempt_id).update(status='completed')
+        answer = self.questions[0].answers.first()
+        self.assertFalse(answer_buffer.write(attempt, {self.questions[0].id: (answer.id, True)}))
+        self.assertIsNone(caches['answers'].get(f'answers:{self.attempt_id}:{self.questions[0].id}'))
+
+    def test_flush_command_and_timeout(self):
+        from datetime import timedelta
+        from io import StringIO
+        from django.core.management import call_command
+        from django.utils import timezone
+        from .models import QuizAttempt
+        self.submit(self.questions[0], 1)
+        out = StringIO()
+        call_command('flush_answer_buffer', stdout=out)
+        self.assertIn('Flushed 1 answers of 1 attempts', out.getvalue())
+        self.assertEqual(self.answered(), 1)
+
+        self.submit(self.questions[1], 1)
+        QuizAttempt.objects.filter(pk=self.attempt_id).update(deadline=timezone.now() - timedelta(minutes=1))
+        call_command('expire_attempts', stdout=out)
+        attempt = QuizAttempt.objects.get(pk=self.attempt_id)
+        self.assertEqual((attempt.status, attempt.correct_answers), ('timed_out', 2))
+
+
+class UserVideoStatusTestCase(QuizTestCase):
+    def test_status_follows_attempts(self):
+        """The status row is maintained on start, finish and timeout and can be rebuilt"""
+        from io import StringIO
+        from django.core.management import call_command
+        from .models import QuizAttempt, UserVideoStatus
+        attempt_id = self.client.post(reverse('attempts-start'), {'video_id': self.video.id}, format='json').data['id']
+        status_row = UserVideoStatus.objects.get(user=self.user, video=self.video)
+        self.assertEqual((status_row.attempts_used, status_row.in_progress_attempt_id), (1, attempt_id))
+        self.assertAlmostEqual(status_row.seconds_remaining(), 600, delta=5)
+
+        for question in self.questions:
+            self.client.post(
+                reverse('attempts-submit-answer', args=[attempt_id]),
+                {'question_id': question.id, 'answer_id': question.answers.get(is_correct=True).id},
+                format='json'
+            )
+        self.client.post(reverse('attempts-finish', args=[attempt_id]))
+        status_row.refresh_from_db()
+        self.assertEqual(
+            (status_row.completed_attempts, status_row.completed_passed, status_row.is_passed),
+            (1, 1, True)
+        )
+        self.assertIsNone(status_row.in_progress_attempt_id)
+        self.assertEqual(status_row.passed_percentage, 100)
+
+        UserVideoStatus.objects.all().delete()
+        call_command('rebuild_video_status', stdout=StringIO())
+        rebuilt = UserVideoStatus.objects.get(user=self.user, video=self.video)
+        self.assertEqual((rebuilt.attempts_used, rebuilt.completed_passed), (1, 1))
+
+        QuizAttempt.objects.all().delete()
+        self.assertFalse(UserVideoStatus.objects.exists())
+
+
+class QuizDeadlineTestCase(QuizTestCase):
+    def setUp(self):
+        super().setUp()
+        from .models import QuizAttempt
+        response = self.client.post(reverse('attempts-start'), {'video_id': self.video.id}, format='json')
+        self.attempt = QuizAttempt.objects.get(pk=response.data['id'])
+
+    def expire(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        self.attempt.deadline = timezone.now() - timedelta(minutes=1)
+        self.attempt.save()
+
+    def test_deadline_is_set_from_time_limit(self):
+        self.assertIsNotNone(self.attempt.deadline)
+        self.assertAlmostEqual(self.attempt.seconds_remaining(), 600, delta=5)
+
+    def test_client_cannot_push_timer_back(self):
+        url = reverse('attempts-update-timer', args=[self.attempt.id])
+        response = self.client.put(url, {'time_remaining': 100000}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertLessEqual(response.data['time_remaining'], 600)
+
+    def test_submit_after_deadline_times_out(self):
+        self.expire()
+        question = self.questions[0]
+        response = self.client.post(
+            reverse('attempts-submit-answer', args=[self.attempt.id]),
+            {'question_id': question.id, 'answer_id': question.answers.first().id},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.status, 'timed_out')
+
+    def test_can_attempt_expires_overdue_attempt(self):
+        self.expire()
+        response = self.client.get(reverse('video-can-attempt', args=[self.video.id]))
+        self.assertEqual(response.data['status'], 'start')
+        self.assertEqual(response.data['attempts_used'], 1)
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.status, 'timed_out')
+
+    def test_sweeper_closes_expired_attempts(self):
+        """expire_attempts scores and closes abandoned attempts in bulk"""
+        from io import StringIO
+        from django.core.management import call_command
+        question = self.questions[0]
+        self.client.post(
+            reverse('attempts-submit-answer', args=[self.attempt.id]),
+            {'question_id': question.id, 'answer_id': question.answers.get(is_correct=True).id},
+            format='json'
+        )
+        self.expire()
+
+        out = StringIO()
+        call_command('expire_attempts', '--dry-run', stdout=out)
+        self.assertIn('1 overdue attempts would be closed', out.getvalue())
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.status, 'in_progress')
+
+        call_command('expire_attempts', stdout=out)
+        self.assertIn('Closed 1 of 1 overdue attempts', out.getvalue())
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.status, 'timed_out')
+        self.assertEqual(self.attempt.score, 1)
+        self.assertEqual(float(self.attempt.percentage), 33.33)
+        self.assertFalse(self.attempt.is_passed)
+
+
+class QueryPlanTestCase(QuizTestCase):
+    """
+    EXPLAIN every SELECT of the hot quiz paths and fail on sequential scans.
+
+    Runs on SQLite and on PostgreSQL (with enable_seqscan off, so a Seq Scan
+    means no usable index exists rather than a planner preference for tiny
+    test tables).
+    """
+    # Read as a whole on purpose: the course catalogue
+    FULL_SCAN_TABLES = {'videos'}
+
+    def setUp(self):
+        from django.db import connection
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.skipTest('Query plans are only checked on SQLite and PostgreSQL')
+        super().setUp()
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+    def tearDown(self):
+        from django.db import connection
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('RESET enable_seqscan')
+
+    def sequential_scans(self, sql):
+        import re
+        from django.db import connection
+        with connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}')
+            plan = [str(row[-1]) for row in cursor.fetchall()]
+        if connection.vendor == 'sqlite':
+            tables = [match.group(1) for line in plan for match in [re.match(r'\s*SCAN (\w+)', line)] if match]
+            tables = [table for table in tables if table != 'CONSTANT']
+        else:
+            tables = re.findall(r'Seq Scan on (\w+)', '\n'.join(plan))
+        return [table for table in tables if table not in self.FULL_SCAN_TABLES], plan
+
+    def assertNoSequentialScans(self, run):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as queries:
+            run()
+        selects = [query['sql'] for query in queries.captured_queries if query['sql'].lstrip().upper().startswith('SELECT')]
+        self.assertTrue(selects)
+        for sql in selects:
+            scans, plan = self.sequential_scans(sql)
+            self.assertFalse(scans, f'Sequential scan of {scans} in:\n{sql}\n' + '\n'.join(plan))
+
+    def test_attempt_lifecycle_uses_indexes(self):
+        def lifecycle():
+            attempt_id = self.client.post(
+                reverse('attempts-start'), {'video_id': self.video.id}, format='json'
+            ).data['id']
+            question = self.questions[0]
+            self.client.post(
+                reverse('attempts-submit-answers', args=[attempt_id]),
+                {'answers': [{'question_id': question.id, 'answer_id': question.answers.first().id}]},
+                format='json'
+            )
+            self.client.get(reverse('attempts-user-answers', args=[attempt_id]))
+            self.client.post(reverse('attempts-finish', args=[attempt_id]))
+            self.client.get(reverse('attempts-result', args=[attempt_id]))
+
+        self.assertNoSequentialScans(lifecycle)
+
+    def test_unlock_progress_and_sweeper_use_indexes(self):
+        from .expiry import sweep
+        self.client.post(reverse('attempts-start'), {'video_id': self.video.id}, format='json')
+
+        def reads():
+            self.client.get(reverse('video-dashboard'))
+            self.client.get(reverse('video-can-attempt', args=[self.video.id]))
+            self.client.get(reverse('progress-my-progress'))
+            sweep()
+
+        self.assertNoSequentialScans(reads)
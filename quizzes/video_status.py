@@ -0,0 +1,94 @@
+"""
+Maintenance of UserVideoStatus rows.
+
+A status row folds a user's attempts on one video into the facts every read
+path needs: attempts used, completed and passed counts, the first passing
+percentage and the in-progress attempt. Rows are recomputed from the
+attempts of the (user, video) pairs that changed, which is at most
+MAX_ATTEMPTS rows per pair, and written with a single upsert.
+"""
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import QuizAttempt, UserVideoStatus
+
+ATTEMPT_FIELDS = ['id', 'user_id', 'video_id', 'attempt_number', 'status', 'is_passed', 'percentage',
+                  'time_remaining', 'deadline']
+STATUS_FIELDS = ['attempts_used', 'completed_attempts', 'completed_passed', 'is_passed', 'passed_percentage',
+                 'best_percentage', 'in_progress_attempt', 'in_progress_deadline', 'in_progress_time_remaining',
+                 'updated_at']
+
+
+def fold(attempts):
+    """Field values of a status row from the pair's attempt dicts"""
+    values = {
+        'attempts_used': len(attempts),
+        'completed_attempts': 0,
+        'completed_passed': 0,
+        'is_passed': False,
+        'passed_percentage': None,
+        'best_percentage': None,
+        'in_progress_attempt_id': None,
+        'in_progress_deadline': None,
+        'in_progress_time_remaining': None,
+    }
+    first_passed = None
+    for attempt in attempts:
+        if attempt['status'] == 'completed':
+            values['completed_attempts'] += 1
+            if attempt['is_passed']:
+                values['completed_passed'] += 1
+        if attempt['status'] == 'in_progress':
+            values['in_progress_attempt_id'] = attempt['id']
+            values['in_progress_deadline'] = attempt['deadline']
+            values['in_progress_time_remaining'] = attempt['time_remaining']
+        if attempt['percentage'] is not None and (
+            values['best_percentage'] is None or attempt['percentage'] > values['best_percentage']
+        ):
+            values['best_percentage'] = attempt['percentage']
+        if attempt['is_passed']:
+            values['is_passed'] = True
+            # Report the first passing attempt
+            if first_passed is None or attempt['attempt_number'] < first_passed:
+                first_passed = attempt['attempt_number']
+                values['passed_percentage'] = attempt['percentage']
+    return values
+
+
+def refresh(pairs):
+    """Recompute the status rows of the given (user_id, video_id) pairs"""
+    pairs = set(pairs)
+    if not pairs:
+        return
+    user_ids = {user_id for user_id, _ in pairs}
+    video_ids = {video_id for _, video_id in pairs}
+    grouped = {pair: [] for pair in pairs}
+    rows = QuizAttempt.objects.filter(user_id__in=user_ids, video_id__in=video_ids).values(*ATTEMPT_FIELDS)
+    for attempt in rows:
+        pair = (attempt['user_id'], attempt['video_id'])
+        if pair in grouped:
+            grouped[pair].append(attempt)
+
+    now = timezone.now()
+    statuses = [
+        UserVideoStatus(user_id=user_id, video_id=video_id, updated_at=now, **fold(attempts))
+        for (user_id, video_id), attempts in grouped.items() if attempts
+    ]
+    if statuses:
+        UserVideoStatus.objects.bulk_create(
+            statuses, update_conflicts=True, unique_fields=['user', 'video'], update_fields=STATUS_FIELDS
+        )
+    empty = [pair for pair, attempts in grouped.items() if not attempts]
+    if empty:
+        condition = Q()
+        for user_id, video_id in empty:
+            condition |= Q(user_id=user_id, video_id=video_id)
+        UserVideoStatus.objects.filter(condition).delete()
+
+
+def rebuild_users(user_ids):
+    """Recompute every status row of the given users; returns the number of pairs"""
+    pairs = set(QuizAttempt.objects.filter(user_id__in=user_ids).values_list('user_id', 'video_id').distinct())
+    pairs.update(UserVideoStatus.objects.filter(user_id__in=user_ids).values_list('user_id', 'video_id'))
+    refresh(pairs)
+    return len(pairs)
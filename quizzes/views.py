@@ -1,17 +1,25 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from datetime import timedelta
 from django.utils import timezone
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404
-from .models import Question, Answer, QuizAttempt, UserAnswer
+from django.http import Http404, HttpResponse
+from .models import Question, QuizAttempt
+from . import answer_buffer, answer_store
+from .answer_key import get_answer_key
+from .question_bank import get_question_bank
+from .scoring import CLOSE_FIELDS, apply_score, score_attempt
 from .serializers import (
-    QuestionSerializer, AnswerSerializer, QuizAttemptSerializer, 
-    UserAnswerSerializer, QuizResultSerializer, SubmitAnswerSerializer
+    QuestionSerializer, QuizAttemptSerializer, 
+    UserAnswerSerializer, QuizResultSerializer, SubmitAnswerSerializer,
+    SubmitAnswersSerializer
 )
 from videos.models import Video
 from users.models import UserProgress
 from users.views import IsSuperAdmin
+from users.versioning import CONTENT, conditional
 
 class QuestionViewSet(viewsets.ModelViewSet):
     """
@@ -31,13 +39,13 @@ class QuestionViewSet(viewsets.ModelViewSet):
         return [permission() for permission in permission_classes]
     
     @action(detail=False, methods=['get'])
+    @conditional(CONTENT)
     def by_video(self, request):
         """Get questions for a specific video"""
         video_id = request.query_params.get('video_id', None)
-        if video_id:
-            questions = Question.objects.filter(video_id=video_id).order_by('sequence_number')
-            serializer = self.get_serializer(questions, many=True)
-            return Response(serializer.data)
+        if video_id and video_id.isdigit():
+            # Served from the per-video question bank cache as ready-made JSON
+            return HttpResponse(get_question_bank(int(video_id)), content_type='application/json')
         return Response(
             {"detail": "Video ID is required."}, 
             status=status.HTTP_400_BAD_REQUEST
@@ -59,127 +67,181 @@ class QuizAttemptViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'])
     def start(self, request):
         """Start a new quiz attempt"""
-        print(f"Start quiz attempt called with data: {request.data}")
-        
         video_id = request.data.get('video_id')
         if not video_id:
-            print("No video_id provided in request")
             return Response(
                 {"detail": "Video ID is required."}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        print(f"Attempting to start quiz for video_id: {video_id}")
-        
         try:
             video = get_object_or_404(Video, pk=video_id)
-            print(f"Found video: {video.title}")
-        except Exception as e:
-            print(f"Error finding video: {e}")
+        except Exception:
             return Response(
                 {"detail": "Video not found."}, 
                 status=status.HTTP_404_NOT_FOUND
             )
         
         user = request.user
-        print(f"User: {user.username}")
         
-        # Check if user already has an in-progress attempt
-        in_progress = QuizAttempt.objects.filter(user=user, video=video, status='in_progress').first()
+        # One locked read gives the in-progress attempt, the attempt count and the next number
+        attempts = list(
+            QuizAttempt.objects.select_for_update()
+            .filter(user=user, video=video)
+            .order_by('attempt_number')
+        )
+        in_progress = next((attempt for attempt in attempts if attempt.status == 'in_progress'), None)
+        if in_progress and in_progress.is_overdue():
+            # Abandoned attempt whose time ran out: close it before deciding
+            in_progress.time_out()
+            in_progress = None
         if in_progress:
-            print(f"Found in-progress attempt: {in_progress.id}")
-            serializer = self.get_serializer(in_progress)
-            return Response(serializer.data)
+            return Response(self.get_serializer(in_progress).data)
         
-        # Check attempt count
-        attempt_count = QuizAttempt.objects.filter(user=user, video=video).count()
-        print(f"Current attempt count: {attempt_count}")
-        
-        if attempt_count >= 2:
-            print("Maximum attempts reached")
+        if len(attempts) >= QuizAttempt.MAX_ATTEMPTS:
             return Response(
                 {"detail": "Maximum attempts reached."}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        next_number = attempts[-1].attempt_number + 1 if attempts else 1
         try:
-            # Create new attempt
-            attempt = QuizAttempt.objects.create(
-                user=user,
-                video=video,
-                attempt_number=attempt_count + 1,
-                time_remaining=video.time_limit * 60  # Convert minutes to seconds
-            )
-            print(f"Created new attempt: {attempt.id}")
-            
-            # Create empty user answers for all questions
-            questions = Question.objects.filter(video=video)
-            print(f"Found {questions.count()} questions for video")
-            
-            for question in questions:
-                UserAnswer.objects.create(quiz_attempt=attempt, question=question)
-            
-            print("Created user answers for all questions")
-            
-            serializer = self.get_serializer(attempt)
-            print(f"Returning serialized data: {serializer.data}")
-            return Response(serializer.data)
-            
-        except Exception as e:
-            print(f"Error creating quiz attempt: {e}")
-            return Response(
-                {"detail": f"Error creating quiz attempt: {str(e)}"}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+            with transaction.atomic():
+                time_limit = video.time_limit * 60  # Convert minutes to seconds
+                attempt = QuizAttempt.objects.create(
+                    user=user,
+                    video=video,
+                    attempt_number=next_number,
+                    time_remaining=time_limit,
+                    deadline=timezone.now() + timedelta(seconds=time_limit),
+                    selections=answer_store.initial_selections()
+                )
+                if attempt.selections is None:
+                    question_ids = Question.objects.filter(video=video).values_list('id', flat=True)
+                    answer_store.create_placeholders(attempt, question_ids)
+        except IntegrityError:
+            # A concurrent request created this attempt first; resume it
+            attempt = QuizAttempt.objects.filter(user=user, video=video, status='in_progress').first()
+            if attempt is None:
+                return Response(
+                    {"detail": "Could not start the quiz, please try again."}, 
+                    status=status.HTTP_409_CONFLICT
+                )
+        
+        return Response(self.get_serializer(attempt).data)
     
-    @transaction.atomic
-    @action(detail=True, methods=['post'])
-    def submit_answer(self, request, pk=None):
-        """Submit an answer for a question"""
+    def answerable_attempt(self, request):
+        """
+        The attempt answers are submitted to, as (attempt, None), or (None, error response).
+        
+        Shared by submit_answer and submit_answers: the attempt must belong to
+        the user and be in progress, and the deadline is enforced here rather
+        than by client timer updates.
+        """
         attempt = self.get_object()
         
-        # Check if attempt belongs to current user
-        if attempt.user != request.user:
-            return Response(
+        if attempt.user_id != request.user.id:
+            return None, Response(
                 {"detail": "You don't have permission to submit answers for this attempt."}, 
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Check if the quiz is still in progress
         if attempt.status != 'in_progress':
-            return Response(
+            return None, Response(
                 {"detail": f"Cannot submit answers for a {attempt.status} quiz."}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        if attempt.is_overdue():
+            attempt.time_out()
+            return None, Response(
+                {"detail": "Time is up for this quiz."}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return attempt, None
+    
+    def record_answers(self, attempt, graded):
+        """Store graded answers; returns an error response if the attempt was closed meanwhile"""
+        if not answer_buffer.write(attempt, graded):
+            return Response(
+                {"detail": "This quiz has already been closed."}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return None
+    
+    @transaction.atomic
+    @action(detail=True, methods=['post'])
+    def submit_answer(self, request, pk=None):
+        """Submit an answer for a question"""
+        attempt, error = self.answerable_attempt(request)
+        if error:
+            return error
+        
         serializer = SubmitAnswerSerializer(data=request.data)
         if serializer.is_valid():
             question_id = serializer.validated_data['question_id']
             answer_id = serializer.validated_data['answer_id']
             
-            # Verify question belongs to the video
-            question = get_object_or_404(Question, pk=question_id, video=attempt.video)
+            # Verify the answer belongs to a question of this video
+            key = get_answer_key(attempt.video_id)
+            if not key.is_valid(question_id, answer_id):
+                raise Http404
             
-            # Verify answer belongs to the question
-            answer = get_object_or_404(Answer, pk=answer_id, question=question)
-            
-            # Update or create user answer
-            user_answer, created = UserAnswer.objects.update_or_create(
-                quiz_attempt=attempt,
-                question=question,
-                defaults={
-                    'selected_answer': answer,
-                    'is_correct': answer.is_correct
-                }
-            )
+            is_correct = key.is_correct(question_id, answer_id)
+            error = self.record_answers(attempt, {question_id: (answer_id, is_correct)})
+            if error:
+                return error
             
             return Response({
                 "detail": "Answer submitted successfully.",
-                "is_correct": user_answer.is_correct
+                "is_correct": is_correct
             })
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @transaction.atomic
+    @action(detail=True, methods=['post'])
+    def submit_answers(self, request, pk=None):
+        """Submit several answers for an attempt in one request"""
+        attempt, error = self.answerable_attempt(request)
+        if error:
+            return error
+        
+        serializer = SubmitAnswersSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Later pairs for the same question win, as with repeated submit_answer calls
+        selections = {item['question_id']: item['answer_id'] for item in serializer.validated_data['answers']}
+        
+        # Validate every pair against the video's answer key
+        key = get_answer_key(attempt.video_id)
+        invalid = [
+            question_id for question_id, answer_id in selections.items()
+            if not key.is_valid(question_id, answer_id)
+        ]
+        if invalid:
+            return Response(
+                {"detail": "Some answers do not belong to this quiz.", "invalid_question_ids": invalid},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        graded = {
+            question_id: (answer_id, key.is_correct(question_id, answer_id))
+            for question_id, answer_id in selections.items()
+        }
+        error = self.record_answers(attempt, graded)
+        if error:
+            return error
+        
+        return Response({
+            "detail": f"{len(selections)} answers submitted successfully.",
+            "results": [
+                {"question_id": question_id, "is_correct": is_correct}
+                for question_id, (answer_id, is_correct) in graded.items()
+            ]
+        })
+    
     @transaction.atomic
     @action(detail=True, methods=['post'])
     def finish(self, request, pk=None):
@@ -193,6 +255,10 @@ class QuizAttemptViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
+        # Lock the row and re-read it: answers recorded since get_object()
+        # must not be overwritten when the attempt is saved
+        attempt = QuizAttempt.objects.select_for_update().get(pk=attempt.pk)
+        
         # Check if the quiz is still in progress
         if attempt.status != 'in_progress':
             return Response(
@@ -200,36 +266,24 @@ class QuizAttemptViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Calculate score
-        total_questions = Question.objects.filter(video=attempt.video).count()
-        answered_questions = UserAnswer.objects.filter(
-            quiz_attempt=attempt, 
-            selected_answer__isnull=False
-        ).count()
-        correct_answers = UserAnswer.objects.filter(
-            quiz_attempt=attempt, 
-            is_correct=True
-        ).count()
-        
-        # Update attempt
-        attempt.end_time = timezone.now()
-        attempt.score = correct_answers
+        # Finishing after the deadline closes the attempt as timed out
+        if attempt.is_overdue():
+            attempt.time_out()
+            return Response(QuizResultSerializer(attempt).data)
         
-        # Calculate percentage correctly using float division
-        if total_questions > 0:
-            # Force float division to avoid integer division giving 0
-            attempt.percentage = float(correct_answers) / float(total_questions) * 100.0
-            print(f"Quiz percentage calculation: {correct_answers} correct / {total_questions} total = {attempt.percentage}%")
-        else:
-            attempt.percentage = 0.0
-            
-        attempt.is_passed = attempt.percentage >= attempt.video.passing_percentage
+        # Write-behind answers are persisted in this transaction before scoring
+        if answer_buffer.enabled():
+            answer_buffer.flush(attempt, discard=True)
+        
+        # Score from one aggregate and store the counts on the attempt
+        apply_score(attempt, score_attempt(attempt))
+        attempt.end_time = timezone.now()
+        attempt.time_remaining = attempt.seconds_remaining()
         attempt.status = 'completed'
-        attempt.save()
+        attempt.save(update_fields=CLOSE_FIELDS)
         
-        # Update user progress dynamically using the new method
-        from users.models import UserProgress
-        UserProgress.update_user_progress(request.user)
+        # Apply this attempt to the user's progress incrementally
+        UserProgress.record_completed_attempt(attempt)
         
         # Return quiz results
         serializer = QuizResultSerializer(attempt)
@@ -247,8 +301,7 @@ class QuizAttemptViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        user_answers = UserAnswer.objects.filter(quiz_attempt=attempt)
-        serializer = UserAnswerSerializer(user_answers, many=True)
+        serializer = UserAnswerSerializer(answer_buffer.answer_rows(attempt), many=True)
         return Response(serializer.data)
     
     @action(detail=True, methods=['get'])
@@ -257,18 +310,26 @@ class QuizAttemptViewSet(viewsets.ModelViewSet):
         attempt = self.get_object()
         
         # Check if attempt belongs to current user or is superadmin
-        if attempt.user != request.user and not request.user.is_superadmin:
+        if attempt.user_id != request.user.id and not request.user.is_superadmin:
             return Response(
                 {"detail": "You don't have permission to view this attempt."}, 
                 status=status.HTTP_403_FORBIDDEN
             )
         
+        if attempt.total_questions is None:
+            # Still in progress: counts are only stored once the attempt is closed
+            score = score_attempt(attempt)
+            attempt.total_questions, attempt.questions_attempted, attempt.correct_answers = score
+        
         serializer = QuizResultSerializer(attempt)
         return Response(serializer.data)
     
     @action(detail=True, methods=['put'])
     def update_timer(self, request, pk=None):
-        """Update the remaining time for a quiz attempt"""
+        """
+        Report the server-side remaining time of a quiz attempt
+        Kept for older clients: the time they send is ignored, the deadline is authoritative
+        """
         attempt = self.get_object()
         
         # Check if attempt belongs to current user
@@ -285,34 +346,8 @@ class QuizAttemptViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        time_remaining = request.data.get('time_remaining')
-        if time_remaining is None:
-            return Response(
-                {"detail": "Time remaining is required."}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Update time remaining
-        attempt.time_remaining = time_remaining
+        if attempt.is_overdue():
+            attempt.time_out()
         
-        # If time has run out, finish the quiz
-        if time_remaining <= 0:
-            attempt.status = 'timed_out'
-            attempt.end_time = timezone.now()
-            
-            # Calculate score
-            total_questions = Question.objects.filter(video=attempt.video).count()
-            correct_answers = UserAnswer.objects.filter(
-                quiz_attempt=attempt, 
-                is_correct=True
-            ).count()
-            
-            attempt.score = correct_answers
-            # Force float division to avoid integer division
-            attempt.percentage = float(correct_answers) / float(total_questions) * 100.0 if total_questions > 0 else 0.0
-            print(f"Timed-out quiz percentage: {correct_answers} correct / {total_questions} total = {attempt.percentage}%")
-            attempt.is_passed = attempt.percentage >= attempt.video.passing_percentage
-        
-        attempt.save()
         serializer = self.get_serializer(attempt)
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
@@ -1,8 +1,9 @@
 # In users/admin.py
 
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.forms import UserChangeForm, UserCreationForm
+from django.http import StreamingHttpResponse
 from .models import User, UserProgress, Certificate
 
 class CustomUserChangeForm(UserChangeForm):
@@ -15,6 +16,42 @@ class CustomUserCreationForm(UserCreationForm):
         model = User
         fields = ('username', 'email', 'is_superadmin')
 
+def certificates_zip_response(modeladmin, request, certificates, filename):
+    """
+    Streamed ZIP download of the certificates whose PDFs are rendered.
+
+    Unrendered certificates are queued for the render worker when one runs and
+    reported as pending; otherwise they are rendered here through the worker
+    pool first.
+    """
+    from .issuance import split_rendered, zip_stream
+    from .render_queue import enqueue, render_now, worker_enabled
+    rendered, pending = split_rendered(certificates)
+    if pending and worker_enabled():
+        for certificate in pending:
+            enqueue(certificate)
+        modeladmin.message_user(
+            request,
+            f'{len(pending)} certificates are not rendered yet and were left out of the ZIP; '
+            'they are queued for rendering, download them again shortly.',
+            messages.WARNING,
+        )
+    elif pending:
+        render_now(pending)
+        # Re-read: the PDFs may have been stored by other processes
+        rendered, pending = split_rendered(certificates.all())
+        if pending:
+            modeladmin.message_user(
+                request,
+                f'{len(pending)} certificates could not be rendered and were left out of the ZIP.',
+                messages.ERROR,
+            )
+    if not rendered:
+        return None
+    response = StreamingHttpResponse(zip_stream(rendered), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
 class CustomUserAdmin(UserAdmin):
     form = CustomUserChangeForm
     add_form = CustomUserCreationForm
@@ -40,7 +77,39 @@ class CustomUserAdmin(UserAdmin):
     
     search_fields = ('username', 'email', 'first_name', 'last_name')
     ordering = ('username',)
+    actions = ['issue_certificates']
+
+    @admin.action(description='Issue certificates to eligible users and download them as ZIP')
+    def issue_certificates(self, request, queryset):
+        from .issuance import issue
+        issued = issue(queryset)
+        self.message_user(request, f'{len(issued)} certificates issued.')
+        certificates = Certificate.objects.filter(user__in=queryset).select_related('user').order_by('pk')
+        return certificates_zip_response(self, request, certificates, 'certificates.zip')
 
 admin.site.register(User, CustomUserAdmin)
 admin.site.register(UserProgress)
-admin.site.register(Certificate)
\ No newline at end of file
+
+@admin.register(Certificate)
+class CertificateAdmin(admin.ModelAdmin):
+    list_display = ('unique_id', 'user', 'issue_date', 'template_version', 'is_downloaded')
+    search_fields = ('unique_id', 'user__username')
+    actions = ['rerender_pdf', 'download_zip']
+    
+    @admin.action(description='Re-render PDF from the current template')
+    def rerender_pdf(self, request, queryset):
+        from .render_queue import enqueue, render_now, worker_enabled
+        certificates = list(queryset.select_related('user'))
+        if worker_enabled():
+            for certificate in certificates:
+                enqueue(certificate, force=True)
+            self.message_user(request, f'{len(certificates)} certificates queued for re-rendering.')
+        else:
+            render_now(certificates, force=True)
+            self.message_user(request, f'{len(certificates)} certificates re-rendered.')
+
+    @admin.action(description='Download PDFs as ZIP')
+    def download_zip(self, request, queryset):
+        return certificates_zip_response(
+            self, request, queryset.select_related('user').order_by('pk'), 'certificates.zip'
+        )
@@ -0,0 +1,159 @@
+"""
+Template-overlay certificate renderer.
+
+Only the name, description, date and ID differ between certificates. The
+static part of the page (border, title, signature line) is drawn once per
+template version into a PDF form XObject and cached, together with the other
+fixed objects of the file, as ready-made bytes. Rendering a certificate then
+writes just the per-user text layer, a content stream that paints the cached
+background and the cross-reference table, without building a reportlab canvas
+or Paragraph layout.
+
+The layout follows certificates.generate_certificate_pdf. Text is measured
+with reportlab's font metrics to centre and wrap it, and is written with the
+standard Courier fonts in WinAnsiEncoding, so nothing is embedded.
+"""
+from django.utils import timezone
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+WIDTH, HEIGHT = letter
+REGULAR = 'Courier'
+BOLD = 'Courier-Bold'
+FONT_RESOURCES = {REGULAR: b'F1', BOLD: b'F2'}
+
+DESCRIPTION_WIDTH = WIDTH - 3 * inch
+DESCRIPTION_SIZE = 12
+DESCRIPTION_LEADING = 14
+
+# Object numbers of the fixed part of the file; the page content is the last
+CATALOG, PAGES, PAGE, FONT_REGULAR, FONT_BOLD, BACKGROUND, CONTENT = range(1, 8)
+
+_templates = {}
+
+
+def _escape(text):
+    """A PDF literal string body for ``text``"""
+    data = text.encode('cp1252', 'replace')
+    return data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+def _centred(font, size, y, text):
+    x = (WIDTH - stringWidth(text, font, size)) / 2
+    return b'BT /%b %d Tf %.2f %.2f Td (%b) Tj ET' % (FONT_RESOURCES[font], size, x, y, _escape(text))
+
+
+def _stream(data, dictionary=b''):
+    return b'<< %b/Length %d >>\nstream\n%b\nendstream' % (dictionary, len(data), data)
+
+
+def _background():
+    """Drawing operators of the parts shared by every certificate"""
+    return b'\n'.join([
+        b'0 G 3 w',
+        b'%.2f %.2f %.2f %.2f re S' % (0.5 * inch, 0.5 * inch, WIDTH - inch, HEIGHT - inch),
+        _centred(BOLD, 24, HEIGHT - 2 * inch, 'Certificate of Completion'),
+        _centred(BOLD, 12, 2 * inch, 'Authorized Signature'),
+        b'%.2f %.2f m %.2f %.2f l S' % (WIDTH / 2 - inch, 1.8 * inch, WIDTH / 2 + inch, 1.8 * inch),
+    ])
+
+
+def _build_template():
+    """(bytes, offsets) of the file header and every object but the page content"""
+    fonts = b'<< /F1 %d 0 R /F2 %d 0 R >>' % (FONT_REGULAR, FONT_BOLD)
+    objects = [
+        b'<< /Type /Catalog /Pages %d 0 R >>' % PAGES,
+        b'<< /Type /Pages /Kids [%d 0 R] /Count 1 >>' % PAGE,
+        b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] '
+        b'/Resources << /Font %b /XObject << /Background %d 0 R >> >> /Contents %d 0 R >>'
+        % (PAGES, WIDTH, HEIGHT, fonts, BACKGROUND, CONTENT),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /%b /Encoding /WinAnsiEncoding >>' % REGULAR.encode(),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /%b /Encoding /WinAnsiEncoding >>' % BOLD.encode(),
+        _stream(
+            _background(),
+            b'/Type /XObject /Subtype /Form /BBox [0 0 %d %d] /Resources << /Font %b >> ' % (WIDTH, HEIGHT, fonts),
+        ),
+    ]
+    data = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += b'%d 0 obj\n%b\nendobj\n' % (number, body)
+    return data, offsets
+
+
+def template(version):
+    """The cached fixed part of the file for a template version"""
+    if version not in _templates:
+        _templates[version] = _build_template()
+    return _templates[version]
+
+
+def wrap(runs, font_size, max_width):
+    """
+    Greedy word wrap of (text, font) runs.
+
+    Returns a list of (pieces, width) lines, pieces being (text, font) pairs.
+    Words keep their font, so a bold name can sit inside regular text.
+    """
+    words = [(word, font) for text, font in runs for word in text.split()]
+    lines, pieces, width = [], [], 0.0
+    for word, font in words:
+        word_width = stringWidth(word, font, font_size)
+        space = stringWidth(' ', font, font_size) if pieces else 0.0
+        if pieces and width + space + word_width > max_width:
+            lines.append((pieces, width))
+            pieces, width, space = [], 0.0, 0.0
+        if pieces and pieces[-1][1] == font:
+            pieces[-1] = (pieces[-1][0] + ' ' + word, font)
+        else:
+            pieces.append(((' ' if pieces else '') + word, font))
+        width += space + word_width
+    if pieces:
+        lines.append((pieces, width))
+    return lines
+
+
+def _paragraph(runs, bottom):
+    """Centred paragraph whose last line sits on ``bottom``"""
+    lines = wrap(runs, DESCRIPTION_SIZE, DESCRIPTION_WIDTH)
+    ops = []
+    for index, (pieces, width) in enumerate(lines):
+        y = bottom + (len(lines) - 1 - index) * DESCRIPTION_LEADING
+        shown = b' '.join(
+            b'/%b %d Tf (%b) Tj' % (FONT_RESOURCES[font], DESCRIPTION_SIZE, _escape(text))
+            for text, font in pieces
+        )
+        ops.append(b'BT %.2f %.2f Td %b ET' % ((WIDTH - width) / 2, y, shown))
+    return ops
+
+
+def text_layer(name, certificate_id, issue_date):
+    """Drawing operators of the per-certificate text"""
+    description = [
+        ('This certifies that', REGULAR),
+        (name, BOLD),
+        ('has successfully completed all video quizzes in our educational platform '
+         'demonstrating understanding and knowledge of the subject matter.', REGULAR),
+    ]
+    return b'\n'.join([
+        _centred(BOLD, 18, HEIGHT / 2 + inch, name),
+        *_paragraph(description, HEIGHT / 2 + DESCRIPTION_LEADING - DESCRIPTION_SIZE),
+        _centred(REGULAR, 12, HEIGHT / 2 - inch, f"Issued on: {issue_date.strftime('%B %d, %Y')}"),
+        _centred(REGULAR, 10, HEIGHT / 2 - 1.5 * inch, f'Certificate ID: {certificate_id}'),
+    ])
+
+
+def render_certificate_pdf(user, certificate_id, issue_date=None, version=1):
+    """PDF bytes of a certificate: the cached template plus the user's text layer"""
+    data, offsets = template(version)
+    name = f'{user.first_name} {user.last_name}'
+    content = b'q /Background Do Q\n' + text_layer(name, certificate_id, issue_date or timezone.now())
+    offsets = offsets + [len(data)]
+    data += b'%d 0 obj\n%b\nendobj\n' % (CONTENT, _stream(content))
+    xref = len(data)
+    data += b'xref\n0 %d\n0000000000 65535 f \n' % (len(offsets) + 1)
+    data += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    data += b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(offsets) + 1, CATALOG, xref)
+    return data
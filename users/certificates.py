@@ -0,0 +1,160 @@
+"""
+Certificate PDFs.
+
+A certificate is rendered once and stored in content-addressed storage as
+``certificates/<sha256>.pdf``; downloads then serve the stored file. The
+rendered version is recorded on the certificate, so raising
+settings.CERTIFICATE_TEMPLATE_VERSION after a template change re-renders
+certificates on their next download (or up front with
+``python manage.py backfill_certificates``).
+
+Certificates are rendered by the template-overlay renderer in
+certificate_template; generate_certificate_pdf is the original reportlab
+layout it reproduces, kept for comparison (``benchmark_certificates``).
+"""
+import hashlib
+import io
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.units import inch
+from reportlab.lib import colors
+from reportlab.platypus import Paragraph
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+
+from .certificate_template import render_certificate_pdf
+
+STORAGE_DIR = 'certificates'
+
+
+def generate_certificate_pdf(user, certificate_id, issue_date=None):
+    """Generate a PDF certificate for the user, dated ``issue_date`` (default: now)"""
+    buffer = io.BytesIO()
+    
+    # Create the PDF object, using the buffer as its "file."
+    # invariant: identical input renders identical bytes (content-addressed storage)
+    c = canvas.Canvas(buffer, pagesize=letter, invariant=1)
+    width, height = letter
+    
+    # We'll use the default fonts
+    
+    # Draw a border
+    c.setStrokeColor(colors.black)
+    c.setLineWidth(3)
+    c.rect(0.5*inch, 0.5*inch, width-inch, height-inch)
+    
+    # Title
+    c.setFont('Courier-Bold', 24)
+    c.drawCentredString(width/2, height-2*inch, "Certificate of Completion")
+    
+    # Draw the company logo
+    # c.drawImage('path/to/logo.png', width/2-inch, height-1.5*inch, width=2*inch, height=1*inch)
+    
+    # User's name
+    c.setFont('Courier-Bold', 18)
+    c.drawCentredString(width/2, height/2+inch, f"{user.first_name} {user.last_name}")
+    
+    # Description
+    styles = getSampleStyleSheet()
+    style = ParagraphStyle(
+        'Normal',
+        fontName='Courier',
+        fontSize=12,
+        alignment=1,  # Center alignment
+        leading=14
+    )
+    
+    description = f"""This certifies that <b>{user.first_name} {user.last_name}</b> has successfully 
+    completed all video quizzes in our educational platform demonstrating understanding 
+    and knowledge of the subject matter."""
+    
+    p = Paragraph(description, style)
+    p.wrapOn(c, width-3*inch, height)
+    p.drawOn(c, 1.5*inch, height/2)
+    
+    # Date
+    date_str = (issue_date or timezone.now()).strftime("%B %d, %Y")
+    c.setFont('Courier', 12)
+    c.drawCentredString(width/2, height/2-inch, f"Issued on: {date_str}")
+    
+    # Certificate ID
+    c.setFont('Courier', 10)
+    c.drawCentredString(width/2, height/2-1.5*inch, f"Certificate ID: {certificate_id}")
+    
+    # Signature
+    c.setFont('Courier-Bold', 12)
+    c.drawCentredString(width/2, 2*inch, "Authorized Signature")
+    c.line(width/2-inch, 1.8*inch, width/2+inch, 1.8*inch)
+    
+    # Save the PDF
+    c.showPage()
+    c.save()
+    
+    # Get the value from the buffer and return it
+    buffer.seek(0)
+    return buffer
+
+
+def template_version():
+    return getattr(settings, 'CERTIFICATE_TEMPLATE_VERSION', 1)
+
+
+def is_current(certificate):
+    """True when the stored PDF exists and was rendered from the current template"""
+    return bool(certificate.pdf_file) and certificate.template_version == template_version()
+
+
+def forget_missing(certificate):
+    """
+    Clear the stored PDF of a certificate whose file is gone from storage.
+
+    Covers redeploys on an ephemeral disk and manual cleanups; returns True
+    if the certificate now needs rendering again.
+    """
+    if not certificate.pdf_file or default_storage.exists(certificate.pdf_file.name):
+        return False
+    certificate.pdf_file.name = ''
+    certificate.pdf_sha256 = ''
+    certificate.template_version = None
+    certificate.save(update_fields=['pdf_file', 'pdf_sha256', 'template_version'])
+    return True
+
+
+def render(certificate):
+    """PDF bytes of a certificate"""
+    return render_certificate_pdf(
+        certificate.user, certificate.unique_id, certificate.issue_date, version=template_version()
+    )
+
+
+def store(certificate, data, version=None):
+    """Save rendered PDF bytes under their content hash and point the certificate at them"""
+    digest = hashlib.sha256(data).hexdigest()
+    name = f'{STORAGE_DIR}/{digest}.pdf'
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(data))
+    previous = certificate.pdf_file.name if certificate.pdf_file else ''
+    certificate.pdf_file.name = name
+    certificate.pdf_sha256 = digest
+    certificate.template_version = version or template_version()
+    certificate.save(update_fields=['pdf_file', 'pdf_sha256', 'template_version'])
+    if previous and previous != name:
+        _delete_if_unused(previous)
+    return name
+
+
+def _delete_if_unused(name):
+    from .models import Certificate
+    if not Certificate.objects.filter(pdf_file=name).exists():
+        default_storage.delete(name)
+
+
+def ensure_rendered(certificate, force=False):
+    """Render and store the certificate unless a current PDF is already stored"""
+    if force or not is_current(certificate):
+        store(certificate, render(certificate))
+        return True
+    return False
@@ -0,0 +1,119 @@
+"""
+Bulk certificate issuance for a whole cohort.
+
+``eligible_users`` finds the users without a certificate who passed every
+active video with one aggregate query over UserVideoStatus; ``issue`` creates
+their certificates and render jobs with two bulk inserts, after which the
+render_queue workers (or ``issue_certificates --workers N``) render the PDFs
+in parallel. ``zip_stream`` exports already rendered certificates as a ZIP
+produced chunk by chunk, so neither the archive nor more than one PDF is held
+in memory, and nothing is rendered while it streams.
+"""
+import uuid
+import zipfile
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Count, Q
+
+from videos.models import Video
+
+from .certificates import is_current
+from .models import Certificate, CertificateRenderJob, User
+
+CHUNK_SIZE = 64 * 1024
+
+
+def eligible_users(users=None):
+    """Users (of ``users``, default all) who passed every active video and have no certificate yet"""
+    total_videos = Video.objects.filter(is_active=True).count()
+    users = User.objects.all() if users is None else users
+    return (
+        users.filter(certificates__isnull=True, progress__isnull=False)
+        .annotate(passed_videos=Count(
+            'video_statuses',
+            filter=Q(video_statuses__completed_passed__gt=0, video_statuses__video__is_active=True),
+        ))
+        .filter(passed_videos__gte=total_videos)
+    )
+
+
+def issue(users=None):
+    """
+    Create certificates and queued render jobs for every eligible user.
+
+    Returns the new certificates. The PDFs are rendered by the render queue.
+    """
+    with transaction.atomic():
+        user_ids = list(eligible_users(users).values_list('pk', flat=True))
+        unique_ids = [str(uuid.uuid4()) for _ in user_ids]
+        Certificate.objects.bulk_create([
+            Certificate(user_id=user_id, unique_id=unique_id)
+            for user_id, unique_id in zip(user_ids, unique_ids)
+        ])
+        # Primary keys are not returned by every backend, so read the rows back
+        certificates = list(
+            Certificate.objects.filter(unique_id__in=unique_ids).select_related('user').order_by('pk')
+        )
+        CertificateRenderJob.objects.bulk_create(
+            [CertificateRenderJob(certificate=certificate) for certificate in certificates]
+        )
+    return certificates
+
+
+class _Output:
+    """Unseekable file-like object collecting what ZipFile writes until it is taken"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def split_rendered(certificates):
+    """Split certificates into (rendered, pending) by whether a current PDF is in storage"""
+    rendered, pending = [], []
+    for certificate in certificates:
+        ready = is_current(certificate) and default_storage.exists(certificate.pdf_file.name)
+        (rendered if ready else pending).append(certificate)
+    return rendered, pending
+
+
+def archive_name(certificate):
+    return f'{certificate.user.username}-{certificate.unique_id}.pdf'
+
+
+def zip_stream(certificates):
+    """
+    Yield a ZIP archive of the certificates' stored PDFs in chunks.
+
+    The certificates must be rendered already (see split_rendered). Without a
+    seekable output, ZipFile writes sizes and checksums in data descriptors
+    after each entry, which is what lets the archive be streamed.
+    """
+    output = _Output()
+    with zipfile.ZipFile(output, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for certificate in certificates:
+            with default_storage.open(certificate.pdf_file.name, 'rb') as source:
+                with archive.open(archive_name(certificate), mode='w') as entry:
+                    for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                        entry.write(chunk)
+                        data = output.take()
+                        if data:
+                            yield data
+            data = output.take()
+            if data:
+                yield data
+    data = output.take()
+    if data:
+        yield data
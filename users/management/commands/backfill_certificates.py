@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from users.certificates import ensure_rendered, template_version
+from users.models import Certificate
+from users.render_queue import enqueue
+
+
+class Command(BaseCommand):
+    help = 'Render and store certificate PDFs that are missing or from an older template'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rerender',
+            action='store_true',
+            help='Render every certificate again, even if its PDF is current',
+        )
+        parser.add_argument(
+            '--queue',
+            action='store_true',
+            help='Queue the renders for render_certificates instead of rendering here',
+        )
+
+    def handle(self, *args, **options):
+        certificates = Certificate.objects.select_related('user').order_by('pk')
+        if not options['rerender']:
+            certificates = certificates.filter(
+                Q(pdf_file='') | Q(pdf_file__isnull=True) | ~Q(template_version=template_version())
+                | Q(template_version__isnull=True)
+            )
+        total = certificates.count()
+        rendered = 0
+        if options['queue']:
+            for certificate in certificates.iterator():
+                enqueue(certificate, force=options['rerender'])
+            self.stdout.write(self.style.SUCCESS(f'Queued {total} certificates'))
+            return
+        for certificate in certificates.iterator():
+            if ensure_rendered(certificate, force=options['rerender']):
+                rendered += 1
+            if rendered and rendered % 100 == 0:
+                self.stdout.write(f'{rendered}/{total} certificates rendered')
+        self.stdout.write(self.style.SUCCESS(f'Rendered {rendered} certificates'))
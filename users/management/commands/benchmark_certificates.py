@@ -0,0 +1,47 @@
+import time
+from types import SimpleNamespace
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from users.certificate_template import render_certificate_pdf
+from users.certificates import generate_certificate_pdf, template_version
+
+
+class Command(BaseCommand):
+    help = 'Compare pages per second of the template-overlay and the reportlab certificate renderers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages',
+            type=int,
+            default=500,
+            help='Number of certificates rendered by each renderer (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        pages = max(1, options['pages'])
+        issue_date = timezone.now()
+        version = template_version()
+        users = [
+            SimpleNamespace(first_name=f'Learner{i}', last_name='Benchmark')
+            for i in range(pages)
+        ]
+        renderers = [
+            ('reportlab', lambda user, i: generate_certificate_pdf(user, f'CERT-{i:08d}', issue_date).getvalue()),
+            ('overlay', lambda user, i: render_certificate_pdf(user, f'CERT-{i:08d}', issue_date, version=version)),
+        ]
+
+        rates = {}
+        for name, render in renderers:
+            size = 0
+            started = time.perf_counter()
+            for i, user in enumerate(users):
+                size += len(render(user, i))
+            elapsed = time.perf_counter() - started
+            rates[name] = pages / elapsed
+            self.stdout.write(
+                f'{name:>10}: {rates[name]:9.1f} pages/s  ({elapsed:.3f}s, {size // pages} bytes/page)'
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Overlay renderer is {rates['overlay'] / rates['reportlab']:.1f}x the reportlab renderer"
+        ))
@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand
+from users.issuance import issue, split_rendered, zip_stream
+from users.models import Certificate
+from users.render_queue import run_once
+from users.workers import process_pool
+
+
+class Command(BaseCommand):
+    help = 'Issue certificates to every eligible user, render them and optionally export a ZIP'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of render processes (default: 1, renders in this process)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=20,
+            help='Number of render jobs claimed at a time (default: 20)',
+        )
+        parser.add_argument(
+            '--queue',
+            action='store_true',
+            help='Leave the renders to render_certificates instead of rendering here',
+        )
+        parser.add_argument(
+            '--zip',
+            metavar='PATH',
+            help='Write the PDFs of the newly issued certificates to this ZIP file',
+        )
+
+    def handle(self, *args, **options):
+        certificates = issue()
+
+        if certificates and not options['queue']:
+            pool = process_pool(options['workers']) if options['workers'] > 1 else None
+            rendered = 0
+            try:
+                while True:
+                    results = run_once(pool=pool, batch_size=max(1, options['batch_size']))
+                    if not results:
+                        break
+                    rendered += results.get('done', 0)
+                    self.stdout.write(f'{rendered}/{len(certificates)} certificates rendered')
+            finally:
+                if pool is not None:
+                    pool.shutdown()
+
+        if options['zip']:
+            # Re-read so PDFs rendered in other processes are picked up
+            exported = Certificate.objects.filter(
+                pk__in=[certificate.pk for certificate in certificates]
+            ).select_related('user').order_by('pk')
+            rendered, pending = split_rendered(exported)
+            with open(options['zip'], 'wb') as f:
+                for chunk in zip_stream(rendered):
+                    f.write(chunk)
+            self.stdout.write(f"Wrote {len(rendered)} certificates to {options['zip']}")
+            if pending:
+                self.stdout.write(self.style.WARNING(f'{len(pending)} certificates are not rendered yet'))
+
+        self.stdout.write(self.style.SUCCESS(f'Issued {len(certificates)} certificates'))
@@ -0,0 +1,54 @@
+import time
+from django.core.management.base import BaseCommand
+from users.render_queue import run_once
+from users.workers import process_pool
+
+
+class Command(BaseCommand):
+    help = 'Render queued certificate PDFs with a pool of local worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of render processes (default: 1, renders in this process)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=20,
+            help='Number of jobs claimed at a time (default: 20)',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep polling the queue instead of exiting when it is empty',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2,
+            help='Seconds to wait when the queue is empty with --loop (default: 2)',
+        )
+
+    def handle(self, *args, **options):
+        def report(job_id, status):
+            if status != 'done':
+                self.stdout.write(self.style.WARNING(f'Job {job_id}: {status}'))
+
+        pool = process_pool(options['workers']) if options['workers'] > 1 else None
+        rendered = 0
+        try:
+            while True:
+                results = run_once(pool=pool, batch_size=max(1, options['batch_size']), callback=report)
+                rendered += results.get('done', 0)
+                if not results:
+                    if not options['loop']:
+                        break
+                    time.sleep(options['interval'])
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(f'Rendered {rendered} certificates'))
@@ -16,6 +16,18 @@ class Command(BaseCommand):
             action='store_true',
             help='Reset progress instead of recalculating',
         )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Number of users recalculated per batch (default: 500)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of processes to shard the batches across (default: 1)',
+        )
 
     def handle(self, *args, **options):
         if options['user']:
@@ -56,8 +68,15 @@ class Command(BaseCommand):
                     self.style.SUCCESS(f'Successfully reset progress for {reset_count} users')
                 )
             else:
-                # Recalculate all users
-                updated_count = UserProgress.recalculate_all_progress()
+                # Recalculate all users in chunks, optionally in parallel
+                def report(done, total):
+                    self.stdout.write(f'  - {done}/{total} users recalculated')
+
+                updated_count = UserProgress.recalculate_all_progress(
+                    chunk_size=max(1, options['chunk_size']),
+                    workers=max(1, options['workers']),
+                    callback=report,
+                )
                 self.stdout.write(
                     self.style.SUCCESS(f'Successfully recalculated progress for {updated_count} users')
                 )
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_state_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certificate',
+            name='pdf_sha256',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='certificate',
+            name='template_version',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:29
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_certificate_pdf_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CertificateRenderJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('force', models.BooleanField(default=False, help_text='Render even if a current PDF is stored')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('worker', models.CharField(blank=True, max_length=64)),
+                ('error', models.TextField(blank=True)),
+                ('queued_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('certificate', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='render_job', to='users.certificate')),
+            ],
+            options={
+                'db_table': 'certificate_render_jobs',
+                'indexes': [models.Index(fields=['status', 'queued_at'], name='render_job_status_queued')],
+            },
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
 from videos.models import Video
+from .versioning import bump, user_key
 
 class User(AbstractUser):
     email = models.EmailField(unique=True)
@@ -28,54 +30,8 @@ class UserProgress(models.Model):
     
     def recalculate_progress(self):
         """Recalculate user progress based on current quiz attempts"""
-        from quizzes.models import QuizAttempt
-        
-        # Get all passed and failed videos
-        passed_videos = []
-        failed_videos = []
-        total_retries = 0
-        
-        # Get all videos
-        all_videos = Video.objects.filter(is_active=True)
-        
-        for video in all_videos:
-            # Get all attempts for this video by this user
-            attempts = QuizAttempt.objects.filter(
-                user=self.user, 
-                video=video,
-                status='completed'
-            ).order_by('attempt_number')
-            
-            if attempts.exists():
-                # Count retries (attempts beyond the first one)
-                total_retries += max(0, attempts.count() - 1)
-                
-                # Check if user has passed this video
-                passed_attempt = attempts.filter(is_passed=True).first()
-                if passed_attempt:
-                    passed_videos.append(video)
-                else:
-                    # Check if user has exhausted all attempts (2 attempts max)
-                    if attempts.count() >= 2:
-                        failed_videos.append(video)
-        
-        # Update the many-to-many relationships
-        self.videos_passed.set(passed_videos)
-        self.videos_failed.set(failed_videos)
-        self.total_retries = total_retries
-        
-        # Calculate overall progress
-        total_videos = all_videos.count()
-        passed_count = len(passed_videos)
-        self.overall_progress = (passed_count / total_videos * 100) if total_videos > 0 else 0
-        
-        self.save()
-        return {
-            'passed_videos': passed_count,
-            'failed_videos': len(failed_videos),
-            'total_retries': total_retries,
-            'overall_progress': float(self.overall_progress)
-        }
+        from .progress import recalculate
+        return recalculate(self)
     
     def reset_progress(self):
         """Reset user progress and delete all quiz attempts"""
@@ -90,6 +46,7 @@ class UserProgress(models.Model):
         self.total_retries = 0
         self.overall_progress = 0
         self.save()
+        bump(user_key(self.user_id))
         
         return True
     
@@ -100,19 +57,29 @@ class UserProgress(models.Model):
         return progress.recalculate_progress()
     
     @classmethod
-    def recalculate_all_progress(cls):
-        """Recalculate progress for all users"""
-        updated_count = 0
-        for progress in cls.objects.all():
+    def record_completed_attempt(cls, attempt):
+        """Apply a single newly completed attempt to its user's progress"""
+        from .progress import apply_completed_attempt
+        progress, created = cls.objects.get_or_create(user_id=attempt.user_id)
+        if created:
             progress.recalculate_progress()
-            updated_count += 1
-        return updated_count
+        else:
+            apply_completed_attempt(progress, attempt)
+    
+    @classmethod
+    def recalculate_all_progress(cls, chunk_size=500, workers=1, callback=None):
+        """Recalculate progress for all users in set-based chunks"""
+        from .progress import recalculate_all
+        return recalculate_all(chunk_size=chunk_size, workers=workers, callback=callback)
 
 class Certificate(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='certificates')
     unique_id = models.CharField(max_length=50, unique=True)
     issue_date = models.DateTimeField(auto_now_add=True)
     pdf_file = models.FileField(upload_to='certificates/', null=True, blank=True)
+    # Content hash of pdf_file and the template version it was rendered from
+    pdf_sha256 = models.CharField(max_length=64, blank=True)
+    template_version = models.PositiveIntegerField(null=True, blank=True)
     is_downloaded = models.BooleanField(default=False)
     
     class Meta:
@@ -120,3 +87,52 @@ class Certificate(models.Model):
         
     def __str__(self):
         return f"{self.user.username}'s Certificate ({self.unique_id})"
+
+class CertificateRenderJob(models.Model):
+    """
+    Queued PDF render of a certificate, processed by ``manage.py render_certificates``.
+
+    One row per certificate; rendering it again re-queues the same row.
+    """
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+    MAX_ATTEMPTS = 3
+    
+    certificate = models.OneToOneField(Certificate, on_delete=models.CASCADE, related_name='render_job')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    force = models.BooleanField(default=False, help_text="Render even if a current PDF is stored")
+    attempts = models.PositiveIntegerField(default=0)
+    worker = models.CharField(max_length=64, blank=True)
+    error = models.TextField(blank=True)
+    queued_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'certificate_render_jobs'
+        indexes = [
+            models.Index(fields=['status', 'queued_at'], name='render_job_status_queued'),
+        ]
+        
+    def __str__(self):
+        return f"Render {self.certificate.unique_id} ({self.status})"
+
+class StateVersion(models.Model):
+    """
+    Version counters behind the ETags of read endpoints.
+
+    ``content`` changes whenever videos, questions or answers are edited and
+    ``user:<id>`` whenever that user's attempts or progress change.
+    """
+    key = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'state_versions'
+        
+    def __str__(self):
+        return f"{self.key} (v{self.version})"
@@ -0,0 +1,273 @@
+"""
+Set-based progress engine for UserProgress.
+
+Progress is derived from completed quiz attempts on active videos. Rather than
+querying attempts video by video, the per-(user, video) counts are read from
+the UserVideoStatus rows in one query and folded into passed, failed and
+retry figures in Python. Only the videos_passed/videos_failed rows that differ
+from the stored state are inserted or deleted.
+"""
+from concurrent.futures import as_completed
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from videos.models import Video
+
+from .versioning import bump, bump_users, user_key
+from .workers import process_pool
+
+TWO_PLACES = Decimal('0.01')
+
+
+def attempt_stats(user_ids):
+    """
+    Return {user_id: {video_id: (completed, passed)}} for the given users.
+
+    Only completed attempts on active videos are counted, which is what
+    progress has always been based on. The counts are read from the
+    UserVideoStatus rows kept up to date with the attempts.
+    """
+    from quizzes.models import UserVideoStatus
+
+    rows = (
+        UserVideoStatus.objects
+        .filter(user_id__in=user_ids, completed_attempts__gt=0, video__is_active=True)
+        .values_list('user_id', 'video_id', 'completed_attempts', 'completed_passed')
+    )
+    stats = {}
+    for user_id, video_id, completed, passed in rows:
+        stats.setdefault(user_id, {})[video_id] = (completed, passed)
+    return stats
+
+
+def summarize(video_stats):
+    """
+    Fold {video_id: (completed, passed)} into (passed_ids, failed_ids, retries).
+
+    A video is failed once all attempts are used up without a pass, and every
+    completed attempt beyond the first counts as a retry.
+    """
+    from quizzes.models import QuizAttempt
+
+    passed_ids, failed_ids, retries = set(), set(), 0
+    for video_id, (completed, passed) in video_stats.items():
+        retries += max(0, completed - 1)
+        if passed:
+            passed_ids.add(video_id)
+        elif completed >= QuizAttempt.MAX_ATTEMPTS:
+            failed_ids.add(video_id)
+    return passed_ids, failed_ids, retries
+
+
+def percentage(passed_count, total_videos):
+    """Overall progress as stored on UserProgress (two decimal places)."""
+    if not total_videos:
+        return Decimal('0.00')
+    return (Decimal(passed_count * 100) / Decimal(total_videos)).quantize(TWO_PLACES)
+
+
+def linked_video_ids(relation, progress_ids):
+    """Return {progress_id: {video_id: through_id}} for one of the progress M2M relations."""
+    through = relation.through
+    links = {progress_id: {} for progress_id in progress_ids}
+    rows = (
+        through.objects.filter(userprogress_id__in=progress_ids)
+        .values_list('id', 'userprogress_id', 'video_id')
+    )
+    for through_id, progress_id, video_id in rows:
+        links[progress_id][video_id] = through_id
+    return links
+
+
+def sync_links(relation, progress_id, current_ids, wanted_ids):
+    """Insert and delete only the through rows that changed. Returns True if any did."""
+    through = relation.through
+    to_add = wanted_ids - current_ids
+    to_remove = current_ids - wanted_ids
+    if to_add:
+        through.objects.bulk_create(
+            [through(userprogress_id=progress_id, video_id=video_id) for video_id in to_add],
+            ignore_conflicts=True,
+        )
+    if to_remove:
+        through.objects.filter(userprogress_id=progress_id, video_id__in=to_remove).delete()
+    return bool(to_add or to_remove)
+
+
+def recalculate(progress):
+    """Fully recompute one UserProgress row with a fixed number of queries."""
+    from .models import UserProgress
+
+    video_stats = attempt_stats([progress.user_id]).get(progress.user_id, {})
+    passed_ids, failed_ids, retries = summarize(video_stats)
+    total_videos = Video.objects.filter(is_active=True).count()
+
+    current_passed = set(linked_video_ids(UserProgress.videos_passed, [progress.pk])[progress.pk])
+    current_failed = set(linked_video_ids(UserProgress.videos_failed, [progress.pk])[progress.pk])
+    links_changed = sync_links(UserProgress.videos_passed, progress.pk, current_passed, passed_ids)
+    links_changed |= sync_links(UserProgress.videos_failed, progress.pk, current_failed, failed_ids)
+
+    overall = percentage(len(passed_ids), total_videos)
+    if links_changed or progress.total_retries != retries or progress.overall_progress != overall:
+        progress.total_retries = retries
+        progress.overall_progress = overall
+        progress.save(update_fields=['total_retries', 'overall_progress', 'last_updated'])
+        bump(user_key(progress.user_id))
+
+    return {
+        'passed_videos': len(passed_ids),
+        'failed_videos': len(failed_ids),
+        'total_retries': retries,
+        'overall_progress': float(overall),
+    }
+
+
+def apply_completed_attempt(progress, attempt):
+    """
+    Apply the delta of one newly completed attempt to a UserProgress row.
+
+    Only the (user, video) pair of the attempt is aggregated; the previous
+    state of that pair is the same aggregate minus this attempt, so the
+    M2M rows and the retry counter can be adjusted without a full recompute.
+    """
+    from quizzes.models import QuizAttempt, UserVideoStatus
+    from .models import UserProgress
+
+    if not Video.objects.filter(pk=attempt.video_id, is_active=True).exists():
+        return
+
+    # The status row already includes this attempt
+    completed, passed = UserVideoStatus.objects.filter(
+        user_id=attempt.user_id, video_id=attempt.video_id
+    ).values_list('completed_attempts', 'completed_passed').get()
+    previous = (completed - 1, passed - (1 if attempt.is_passed else 0))
+
+    was_passed, was_failed = (previous[1] > 0), (previous[1] == 0 and previous[0] >= QuizAttempt.MAX_ATTEMPTS)
+    is_passed, is_failed = (passed > 0), (passed == 0 and completed >= QuizAttempt.MAX_ATTEMPTS)
+    retries_delta = max(0, completed - 1) - max(0, previous[0] - 1)
+
+    video_id = attempt.video_id
+    if is_passed != was_passed:
+        sync_links(UserProgress.videos_passed, progress.pk,
+                   {video_id} if was_passed else set(), {video_id} if is_passed else set())
+    if is_failed != was_failed:
+        sync_links(UserProgress.videos_failed, progress.pk,
+                   {video_id} if was_failed else set(), {video_id} if is_failed else set())
+
+    updates = {}
+    if retries_delta:
+        updates['total_retries'] = F('total_retries') + retries_delta
+    if is_passed != was_passed:
+        passed_count = progress.videos_passed.filter(is_active=True).count()
+        updates['overall_progress'] = percentage(passed_count, Video.objects.filter(is_active=True).count())
+    if updates:
+        UserProgress.objects.filter(pk=progress.pk).update(last_updated=timezone.now(), **updates)
+
+
+def recalculate_batch(progress_rows, total_videos=None):
+    """
+    Recompute a batch of UserProgress rows with set-based reads and writes.
+
+    One aggregate covers every user in the batch, the M2M through rows are
+    diffed in memory and written with bulk inserts/deletes, and changed
+    progress rows are saved with a single bulk_update.
+    """
+    from .models import UserProgress
+
+    if not progress_rows:
+        return 0
+    if total_videos is None:
+        total_videos = Video.objects.filter(is_active=True).count()
+
+    progress_ids = [progress.pk for progress in progress_rows]
+    stats = attempt_stats([progress.user_id for progress in progress_rows])
+    relations = (UserProgress.videos_passed, UserProgress.videos_failed)
+    current = [linked_video_ids(relation, progress_ids) for relation in relations]
+
+    to_add = ([], [])
+    to_remove = ([], [])
+    changed = []
+    now = timezone.now()
+    for progress in progress_rows:
+        passed_ids, failed_ids, retries = summarize(stats.get(progress.user_id, {}))
+        links_changed = False
+        for index, wanted_ids in enumerate((passed_ids, failed_ids)):
+            existing = current[index][progress.pk]
+            through = relations[index].through
+            for video_id in wanted_ids.difference(existing):
+                to_add[index].append(through(userprogress_id=progress.pk, video_id=video_id))
+                links_changed = True
+            for video_id, through_id in existing.items():
+                if video_id not in wanted_ids:
+                    to_remove[index].append(through_id)
+                    links_changed = True
+
+        overall = percentage(len(passed_ids), total_videos)
+        if links_changed or progress.total_retries != retries or progress.overall_progress != overall:
+            progress.total_retries = retries
+            progress.overall_progress = overall
+            progress.last_updated = now
+            changed.append(progress)
+
+    with transaction.atomic():
+        for index, relation in enumerate(relations):
+            if to_remove[index]:
+                relation.through.objects.filter(pk__in=to_remove[index]).delete()
+            if to_add[index]:
+                relation.through.objects.bulk_create(to_add[index], ignore_conflicts=True)
+        if changed:
+            UserProgress.objects.bulk_update(changed, ['total_retries', 'overall_progress', 'last_updated'])
+            bump_users(progress.user_id for progress in changed)
+    return len(progress_rows)
+
+
+def recalculate_range(first_pk, last_pk, total_videos=None):
+    """Recompute all UserProgress rows with first_pk <= pk <= last_pk."""
+    from .models import UserProgress
+
+    rows = list(
+        UserProgress.objects.filter(pk__gte=first_pk, pk__lte=last_pk)
+        .only('id', 'user_id', 'total_retries', 'overall_progress')
+    )
+    return recalculate_batch(rows, total_videos)
+
+
+def chunk_ranges(pks, chunk_size):
+    """Split sorted primary keys into (first_pk, last_pk) ranges of chunk_size rows."""
+    return [
+        (pks[start], pks[min(start + chunk_size, len(pks)) - 1])
+        for start in range(0, len(pks), chunk_size)
+    ]
+
+
+def recalculate_all(chunk_size=500, workers=1, callback=None):
+    """
+    Recompute every UserProgress row in chunks, optionally across processes.
+
+    ``callback(done, total)`` is called after each chunk with the number of
+    rows processed so far. Returns the number of rows processed.
+    """
+    from .models import UserProgress
+
+    pks = list(UserProgress.objects.order_by('pk').values_list('pk', flat=True))
+    ranges = chunk_ranges(pks, chunk_size)
+    total_videos = Video.objects.filter(is_active=True).count()
+    done = 0
+
+    if workers <= 1 or len(ranges) <= 1:
+        for first_pk, last_pk in ranges:
+            done += recalculate_range(first_pk, last_pk, total_videos)
+            if callback:
+                callback(done, len(pks))
+        return done
+
+    with process_pool(workers) as pool:
+        futures = [pool.submit(recalculate_range, first_pk, last_pk, total_videos) for first_pk, last_pk in ranges]
+        for future in as_completed(futures):
+            done += future.result()
+            if callback:
+                callback(done, len(pks))
+    return done
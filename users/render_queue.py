@@ -0,0 +1,144 @@
+"""
+Database-backed queue for certificate PDF renders.
+
+``enqueue`` marks a certificate's CertificateRenderJob as queued and the
+``render_certificates`` command claims queued jobs and renders them in a pool
+of local processes (only with settings.CERTIFICATE_RENDER_WORKER; otherwise
+the web process renders on first download). No broker is involved: jobs are claimed with a
+conditional UPDATE stamped with a per-claim token (plus SKIP LOCKED where the
+database supports it), so several workers on one host never render the same
+job twice. Jobs left running by a crashed worker are queued again after
+STALE_AFTER.
+"""
+import uuid
+from concurrent.futures import as_completed
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .certificates import ensure_rendered, is_current
+from .models import CertificateRenderJob
+from .workers import process_pool
+
+STALE_AFTER = timedelta(minutes=10)
+
+
+def worker_enabled():
+    """True when a render_certificates process renders the PDFs (settings.CERTIFICATE_RENDER_WORKER)"""
+    return getattr(settings, 'CERTIFICATE_RENDER_WORKER', False)
+
+
+def enqueue(certificate, force=False):
+    """Queue a render of the certificate unless one is already pending; returns the job"""
+    job, created = CertificateRenderJob.objects.get_or_create(
+        certificate=certificate, defaults={'force': force}
+    )
+    if created:
+        return job
+    pending = job.status in ('queued', 'running') and (job.force or not force)
+    rendered = job.status == 'done' and not force and is_current(certificate)
+    if not (pending or rendered):
+        CertificateRenderJob.objects.filter(pk=job.pk).update(
+            status='queued', force=force, attempts=0, error='', worker='',
+            queued_at=timezone.now(), started_at=None, finished_at=None
+        )
+        job.refresh_from_db()
+    return job
+
+
+def requeue_stale(now=None):
+    """
+    Queue again jobs whose worker stopped without finishing them.
+
+    A job that already used its MAX_ATTEMPTS (for instance because rendering
+    it crashes the worker) is marked failed instead. Returns the number queued.
+    """
+    now = now or timezone.now()
+    stale = CertificateRenderJob.objects.filter(status='running', started_at__lt=now - STALE_AFTER)
+    stale.filter(attempts__gte=CertificateRenderJob.MAX_ATTEMPTS).update(
+        status='failed', worker='', error='The worker stopped while rendering.', finished_at=now
+    )
+    return stale.update(status='queued', worker='')
+
+
+def claim(limit):
+    """Mark up to ``limit`` queued jobs as running for this worker; returns their ids"""
+    token = uuid.uuid4().hex
+    with transaction.atomic():
+        candidates = list(
+            CertificateRenderJob.objects.select_for_update(skip_locked=True)
+            .filter(status='queued')
+            .order_by('queued_at')
+            .values_list('pk', flat=True)[:limit]
+        )
+        # The status condition keeps a job from being claimed twice where
+        # SKIP LOCKED is not available
+        CertificateRenderJob.objects.filter(pk__in=candidates, status='queued').update(
+            status='running', worker=token, started_at=timezone.now(), attempts=F('attempts') + 1
+        )
+    return list(CertificateRenderJob.objects.filter(worker=token).values_list('pk', flat=True))
+
+
+def render_job(job_id):
+    """Render one claimed job; returns its final status"""
+    job = CertificateRenderJob.objects.select_related('certificate__user').get(pk=job_id)
+    try:
+        ensure_rendered(job.certificate, force=job.force)
+    except Exception as e:
+        status = 'failed' if job.attempts >= CertificateRenderJob.MAX_ATTEMPTS else 'queued'
+        CertificateRenderJob.objects.filter(pk=job.pk).update(
+            status=status, error=f'{type(e).__name__}: {e}', worker='', finished_at=timezone.now()
+        )
+        return status
+    CertificateRenderJob.objects.filter(pk=job.pk).update(
+        status='done', error='', worker='', finished_at=timezone.now()
+    )
+    return 'done'
+
+
+def run_once(pool=None, batch_size=20, callback=None):
+    """
+    Claim and render one batch of jobs, in ``pool`` if given; returns {status: count}.
+
+    ``callback(job_id, status)`` is called as each job finishes.
+    """
+    requeue_stale()
+    job_ids = claim(batch_size)
+    results = {}
+
+    def record(job_id, status):
+        results[status] = results.get(status, 0) + 1
+        if callback:
+            callback(job_id, status)
+
+    if pool is None:
+        for job_id in job_ids:
+            record(job_id, render_job(job_id))
+        return results
+
+    futures = {pool.submit(render_job, job_id): job_id for job_id in job_ids}
+    for future in as_completed(futures):
+        record(futures[future], future.result())
+    return results
+
+
+def render_now(certificates, force=False):
+    """
+    Queue renders of the certificates and run the queue until it is empty.
+
+    For callers that need the PDFs when no render worker runs; the renders are
+    spread over settings.CERTIFICATE_RENDER_PROCESSES processes.
+    """
+    for certificate in certificates:
+        enqueue(certificate, force=force)
+    workers = min(settings.CERTIFICATE_RENDER_PROCESSES, len(certificates))
+    pool = process_pool(workers) if workers > 1 else None
+    try:
+        while run_once(pool=pool):
+            pass
+    finally:
+        if pool is not None:
+            pool.shutdown()
@@ -0,0 +1,35 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from videos.models import Video
+from quizzes.models import Question, Answer, QuizAttempt
+from .models import Certificate, User
+from .versioning import CONTENT, bump, user_key
+from . import verification
+
+
+@receiver([post_save, post_delete], sender=Video)
+@receiver([post_save, post_delete], sender=Question)
+@receiver([post_save, post_delete], sender=Answer)
+def bump_content_version(sender, **kwargs):
+    """Course content changed: every content-dependent ETag goes stale"""
+    bump(CONTENT)
+
+
+@receiver([post_save, post_delete], sender=QuizAttempt)
+def bump_attempt_user_version(sender, instance, **kwargs):
+    """An attempt was started, finished, timed out or removed"""
+    bump(user_key(instance.user_id))
+
+
+@receiver([post_save, post_delete], sender=Certificate)
+def drop_certificate_verification(sender, instance, **kwargs):
+    """Issued or revoked: the cached verification answer is stale"""
+    verification.invalidate([instance.unique_id])
+
+
+@receiver(post_save, sender=User)
+def drop_holder_verifications(sender, instance, created, update_fields=None, **kwargs):
+    """The holder's name is part of the verification answer"""
+    if created or (update_fields is not None and not {'first_name', 'last_name'} & set(update_fields)):
+        return
+    verification.invalidate(instance.certificates.values_list('unique_id', flat=True))
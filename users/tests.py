@@ -1,8 +1,8 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
-from .models import User
+from .models import User, UserProgress
 
 class UserAPITestCase(TestCase):
     def setUp(self):
@@ -50,4 +50,456 @@ class UserAPITestCase(TestCase):
         self.client.force_authenticate(user=self.superadmin)
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)  # Two users in the database
\ No newline at end of file
+        self.assertEqual(len(response.data), 2)  # Two users in the database
+
+class UserProgressEngineTestCase(TestCase):
+    def setUp(self):
+        from videos.models import Video
+        self.user = User.objects.create_user(
+            username='learner',
+            email='learner@example.com',
+            password='password123'
+        )
+        self.progress = UserProgress.objects.create(user=self.user)
+        self.videos = [
+            Video.objects.create(
+                title=f'Video {i}', description='', duration=60,
+                sequence_number=i, time_limit=10
+            )
+            for i in range(1, 5)
+        ]
+
+    def complete(self, video, attempt_number, passed):
+        from quizzes.models import QuizAttempt
+        return QuizAttempt.objects.create(
+            user=self.user, video=video, attempt_number=attempt_number,
+            time_remaining=0, status='completed', is_passed=passed,
+            percentage=100 if passed else 0
+        )
+
+    def test_recalculate_progress(self):
+        """Passed, failed and retry counts come from completed attempts"""
+        self.complete(self.videos[0], 1, True)
+        self.complete(self.videos[1], 1, False)
+        self.complete(self.videos[1], 2, True)
+        self.complete(self.videos[2], 1, False)
+        self.complete(self.videos[2], 2, False)
+
+        result = self.progress.recalculate_progress()
+        self.assertEqual(result['passed_videos'], 2)
+        self.assertEqual(result['failed_videos'], 1)
+        self.assertEqual(result['total_retries'], 2)
+        self.assertEqual(result['overall_progress'], 50.0)
+        self.assertEqual(
+            set(self.progress.videos_passed.values_list('id', flat=True)),
+            {self.videos[0].id, self.videos[1].id}
+        )
+        self.assertEqual(list(self.progress.videos_failed.all()), [self.videos[2]])
+
+    def test_recalculate_progress_query_count_is_constant(self):
+        """Recalculation does not issue queries per video"""
+        for video in self.videos:
+            self.complete(video, 1, True)
+        self.progress.recalculate_progress()
+        # Aggregate, active video count and the two link lookups; nothing changed
+        with self.assertNumQueries(4):
+            self.progress.recalculate_progress()
+
+    def test_record_completed_attempt_matches_full_recalculation(self):
+        """Incremental updates end in the same state as a full recompute"""
+        steps = [
+            (self.videos[0], 1, False),
+            (self.videos[0], 2, True),
+            (self.videos[1], 1, False),
+            (self.videos[1], 2, False),
+            (self.videos[2], 1, True),
+        ]
+        for video, number, passed in steps:
+            UserProgress.record_completed_attempt(self.complete(video, number, passed))
+
+        self.progress.refresh_from_db()
+        incremental = (
+            set(self.progress.videos_passed.values_list('id', flat=True)),
+            set(self.progress.videos_failed.values_list('id', flat=True)),
+            self.progress.total_retries,
+            self.progress.overall_progress,
+        )
+        self.progress.recalculate_progress()
+        self.progress.refresh_from_db()
+        full = (
+            set(self.progress.videos_passed.values_list('id', flat=True)),
+            set(self.progress.videos_failed.values_list('id', flat=True)),
+            self.progress.total_retries,
+            self.progress.overall_progress,
+        )
+        self.assertEqual(incremental, full)
+        self.assertEqual(full[2], 2)
+
+    def test_recalculate_all_progress_in_chunks(self):
+        """Batch recalculation matches per-user recalculation"""
+        other = User.objects.create_user(
+            username='second',
+            email='second@example.com',
+            password='password123'
+        )
+        other_progress = UserProgress.objects.create(user=other, total_retries=7)
+        self.complete(self.videos[0], 1, False)
+        self.complete(self.videos[0], 2, True)
+        # Stale link that the batch should remove
+        self.progress.videos_failed.add(self.videos[3])
+
+        reported = []
+        updated = UserProgress.recalculate_all_progress(
+            chunk_size=1, callback=lambda done, total: reported.append((done, total))
+        )
+        self.assertEqual(updated, 2)
+        self.assertEqual(reported, [(1, 2), (2, 2)])
+
+        self.progress.refresh_from_db()
+        other_progress.refresh_from_db()
+        self.assertEqual(list(self.progress.videos_passed.all()), [self.videos[0]])
+        self.assertFalse(self.progress.videos_failed.exists())
+        self.assertEqual(self.progress.total_retries, 1)
+        self.assertEqual(float(self.progress.overall_progress), 25.0)
+        self.assertEqual(other_progress.total_retries, 0)
+
+
+@override_settings(CERTIFICATE_RENDER_WORKER=True)
+class CertificatePdfTestCase(TestCase):
+    def setUp(self):
+        import tempfile
+        from django.test import override_settings
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='graduate',
+            email='graduate@example.com',
+            password='password123',
+            first_name='Grace',
+            last_name='Hopper'
+        )
+        UserProgress.objects.create(user=self.user)
+        self.client.force_authenticate(user=self.user)
+
+    def tearDown(self):
+        import shutil
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def download(self, certificate_id, **headers):
+        response = self.client.get(reverse('certificates-download', args=[certificate_id]), **headers)
+        if response.status_code == status.HTTP_200_OK:
+            response.data_bytes = b''.join(response.streaming_content)
+        return response
+
+    def test_pdf_is_rendered_once_and_reused(self):
+        from unittest import mock
+        from .models import Certificate
+        from io import StringIO
+        from django.core.management import call_command
+        certificate_id = self.client.post(reverse('certificates-generate')).data['id']
+
+        # Rendered by the queue worker, not in the request
+        response = self.download(certificate_id)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertFalse(self.client.get(response.data['status_url']).data['ready'])
+        call_command('render_certificates', stdout=StringIO())
+        self.assertTrue(self.client.get(response.data['status_url']).data['ready'])
+
+        response = self.download(certificate_id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data_bytes.startswith(b'%PDF'))
+        self.assertIn('private', response['Cache-Control'])
+        certificate = Certificate.objects.get(pk=certificate_id)
+        self.assertEqual(certificate.pdf_file.name, f'certificates/{certificate.pdf_sha256}.pdf')
+        self.assertTrue(certificate.is_downloaded)
+
+        with mock.patch('users.certificates.render_certificate_pdf') as render:
+            response = self.download(certificate_id)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            response = self.download(certificate_id, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            render.assert_not_called()
+
+    @override_settings(CERTIFICATE_RENDER_WORKER=False)
+    def test_rendered_on_first_download_without_worker(self):
+        from .models import CertificateRenderJob
+        certificate_id = self.client.post(reverse('certificates-generate')).data['id']
+        self.assertFalse(CertificateRenderJob.objects.exists())
+        response = self.download(certificate_id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data_bytes.startswith(b'%PDF'))
+
+    def test_missing_file_is_rendered_again(self):
+        from io import StringIO
+        from django.core.files.storage import default_storage
+        from django.core.management import call_command
+        from .models import Certificate
+        certificate_id = self.client.post(reverse('certificates-generate')).data['id']
+        call_command('render_certificates', stdout=StringIO())
+        default_storage.delete(Certificate.objects.get(pk=certificate_id).pdf_file.name)
+
+        response = self.download(certificate_id)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertFalse(Certificate.objects.get(pk=certificate_id).pdf_file)
+        call_command('render_certificates', stdout=StringIO())
+        self.assertEqual(self.download(certificate_id).status_code, status.HTTP_200_OK)
+
+    def test_template_change_rerenders(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from .models import Certificate
+        certificate_id = self.client.post(reverse('certificates-generate')).data['id']
+        call_command('backfill_certificates', stdout=StringIO())
+        certificate = Certificate.objects.get(pk=certificate_id)
+        version = certificate.template_version
+        first_name = certificate.pdf_file.name
+
+        with self.settings(CERTIFICATE_TEMPLATE_VERSION=version + 1):
+            out = StringIO()
+            call_command('backfill_certificates', stdout=out)
+            self.assertIn('Rendered 1 certificates', out.getvalue())
+        certificate.refresh_from_db()
+        self.assertEqual(certificate.template_version, version + 1)
+        # Same template and issue date render the same bytes
+        self.assertEqual(certificate.pdf_file.name, first_name)
+
+    def test_overlay_renderer(self):
+        """The cached template is reused and only the text layer differs"""
+        import re
+        from datetime import date
+        from .certificate_template import render_certificate_pdf, template, wrap
+        other = User(first_name='Ada', last_name='(Lovelace)')
+        first = render_certificate_pdf(self.user, 'CERT-1', date(2026, 1, 2), version=7)
+        second = render_certificate_pdf(other, 'CERT-2', date(2026, 1, 2), version=7)
+        fixed, offsets = template(7)
+        self.assertIs(template(7)[0], fixed)
+        self.assertTrue(first.startswith(fixed) and second.startswith(fixed))
+        self.assertIn(b'(Certificate ID: CERT-1) Tj', first)
+        self.assertIn(b'(Ada \\(Lovelace\\)) Tj', second)
+        self.assertIn(b'(Issued on: January 02, 2026) Tj', first)
+
+        # Every cross-reference entry points at its object
+        xref = int(re.search(rb'startxref\n(\d+)', first).group(1))
+        entries = re.findall(rb'(\d{10}) 00000 n ', first[xref:])
+        for number, offset in enumerate(entries, start=1):
+            self.assertTrue(first[int(offset):].startswith(b'%d 0 obj' % number))
+
+        lines = wrap([('word ' * 40, 'Courier')], 12, 100)
+        self.assertTrue(all(width <= 100 for _, width in lines))
+        self.assertEqual(sum(len(pieces[0][0].split()) for pieces, _ in lines), 40)
+
+    def test_render_queue_claims_and_retries(self):
+        from unittest import mock
+        from .models import Certificate, CertificateRenderJob
+        from .render_queue import claim, enqueue, run_once
+        certificate_id = self.client.post(reverse('certificates-generate')).data['id']
+        job = CertificateRenderJob.objects.get(certificate_id=certificate_id)
+        self.assertEqual(job.status, 'queued')
+
+        self.assertEqual(claim(10), [job.pk])
+        self.assertEqual(claim(10), [])
+        CertificateRenderJob.objects.filter(pk=job.pk).update(status='queued')
+
+        with mock.patch('users.render_queue.ensure_rendered', side_effect=OSError('disk full')):
+            for attempt in range(CertificateRenderJob.MAX_ATTEMPTS):
+                run_once()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', CertificateRenderJob.MAX_ATTEMPTS))
+        self.assertIn('disk full', job.error)
+
+        # Downloading queues a failed render again
+        self.assertEqual(self.download(certificate_id).status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(run_once(), {'done': 1})
+        self.assertTrue(Certificate.objects.get(pk=certificate_id).pdf_file)
+        self.assertEqual(enqueue(Certificate.objects.get(pk=certificate_id)).status, 'done')
+
+    def test_stale_jobs_are_requeued_until_attempts_run_out(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from .models import CertificateRenderJob
+        from .render_queue import STALE_AFTER, requeue_stale
+        certificate_id = self.client.post(reverse('certificates-generate')).data['id']
+        jobs = CertificateRenderJob.objects.filter(certificate_id=certificate_id)
+        started = timezone.now() - STALE_AFTER - timedelta(minutes=1)
+
+        jobs.update(status='running', attempts=1, started_at=started)
+        self.assertEqual(requeue_stale(), 1)
+        self.assertEqual(jobs.get().status, 'queued')
+
+        jobs.update(status='running', attempts=CertificateRenderJob.MAX_ATTEMPTS, started_at=started)
+        self.assertEqual(requeue_stale(), 0)
+        self.assertEqual(jobs.get().status, 'failed')
+
+    def test_bulk_issuance_and_zip_export(self):
+        import io
+        import os
+        import zipfile
+        from django.core.management import call_command
+        from quizzes.models import QuizAttempt
+        from videos.models import Video
+        from .issuance import eligible_users, zip_stream
+        from .models import Certificate
+        video = Video.objects.create(title='Video 1', description='', duration=60, sequence_number=1, time_limit=10)
+        cohort = []
+        for i, passed in enumerate([True, True, False]):
+            learner = User.objects.create_user(
+                username=f'learner{i}', email=f'learner{i}@example.com', password='password123'
+            )
+            UserProgress.objects.create(user=learner)
+            QuizAttempt.objects.create(
+                user=learner, video=video, attempt_number=1, time_remaining=0,
+                status='completed', is_passed=passed, percentage=100 if passed else 0
+            )
+            cohort.append(learner)
+        # The graduate set up in setUp has not passed the video either
+        with self.assertNumQueries(2):
+            self.assertEqual(sorted(u.username for u in eligible_users()), ['learner0', 'learner1'])
+
+        path = os.path.join(self.media_root, 'cohort.zip')
+        out = io.StringIO()
+        call_command('issue_certificates', zip=path, stdout=out)
+        self.assertIn('Issued 2 certificates', out.getvalue())
+        certificates = Certificate.objects.select_related('user').order_by('pk')
+        with zipfile.ZipFile(path) as archive:
+            self.assertEqual(archive.namelist(), [f'{c.user.username}-{c.unique_id}.pdf' for c in certificates])
+            self.assertTrue(all(archive.read(name).startswith(b'%PDF') for name in archive.namelist()))
+            self.assertIsNone(archive.testzip())
+
+        # Issued users are not eligible again
+        call_command('issue_certificates', stdout=out)
+        self.assertEqual(Certificate.objects.count(), 2)
+
+        # The stream is produced in chunks and never needs a seekable output
+        chunks = list(zip_stream(certificates))
+        self.assertGreater(len(chunks), 2)
+        with zipfile.ZipFile(io.BytesIO(b''.join(chunks))) as archive:
+            self.assertEqual(len(archive.namelist()), 2)
+
+    def test_admin_zip_leaves_out_unrendered_certificates(self):
+        import io
+        import zipfile
+        from django.contrib.admin import helpers
+        from .certificates import ensure_rendered
+        from .models import Certificate, CertificateRenderJob
+        rendered = Certificate.objects.create(user=self.user, unique_id='CERT-1')
+        ensure_rendered(rendered)
+        pending = Certificate.objects.create(user=self.user, unique_id='CERT-2')
+        admin_user = User.objects.create_superuser(username='admin', email='admin@example.com', password='password123')
+        self.client.force_login(admin_user)
+
+        response = self.client.post(reverse('admin:users_certificate_changelist'), {
+            'action': 'download_zip',
+            helpers.ACTION_CHECKBOX_NAME: [rendered.pk, pending.pk],
+        })
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as archive:
+            self.assertEqual(archive.namelist(), ['graduate-CERT-1.pdf'])
+        self.assertFalse(Certificate.objects.get(pk=pending.pk).pdf_file)
+        self.assertEqual(CertificateRenderJob.objects.get(certificate=pending).status, 'queued')
+
+    def test_admin_rerender(self):
+        from django.contrib.admin import helpers
+        from .certificates import ensure_rendered
+        from .models import Certificate, CertificateRenderJob
+        certificate = Certificate.objects.create(user=self.user, unique_id='CERT-1')
+        ensure_rendered(certificate)
+        admin_user = User.objects.create_superuser(username='admin', email='admin@example.com', password='password123')
+        self.client.force_login(admin_user)
+        data = {'action': 'rerender_pdf', helpers.ACTION_CHECKBOX_NAME: [certificate.pk]}
+
+        # Queued for the worker instead of rendered in the request
+        self.client.post(reverse('admin:users_certificate_changelist'), data)
+        job = CertificateRenderJob.objects.get(certificate=certificate)
+        self.assertEqual((job.status, job.force), ('queued', True))
+
+        with self.settings(CERTIFICATE_RENDER_WORKER=False, CERTIFICATE_RENDER_PROCESSES=1):
+            self.client.post(reverse('admin:users_certificate_changelist'), data)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+
+    @override_settings(CERTIFICATE_RENDER_WORKER=False, CERTIFICATE_RENDER_PROCESSES=1)
+    def test_admin_issue_renders_without_worker(self):
+        import io
+        import zipfile
+        from django.contrib.admin import helpers
+        from quizzes.models import QuizAttempt
+        from videos.models import Video
+        from .models import Certificate
+        video = Video.objects.create(title='Video 1', description='', duration=60, sequence_number=1, time_limit=10)
+        QuizAttempt.objects.create(
+            user=self.user, video=video, attempt_number=1, time_remaining=0,
+            status='completed', is_passed=True, percentage=100
+        )
+        admin_user = User.objects.create_superuser(username='admin', email='admin@example.com', password='password123')
+        self.client.force_login(admin_user)
+
+        response = self.client.post(reverse('admin:users_user_changelist'), {
+            'action': 'issue_certificates',
+            helpers.ACTION_CHECKBOX_NAME: [self.user.pk],
+        })
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        certificate = Certificate.objects.get(user=self.user)
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as archive:
+            self.assertEqual(archive.namelist(), [f'graduate-{certificate.unique_id}.pdf'])
+
+
+class CertificateVerificationTestCase(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from .models import Certificate
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='graduate',
+            email='graduate@example.com',
+            password='password123',
+            first_name='Grace',
+            last_name='Hopper'
+        )
+        self.certificate = Certificate.objects.create(user=self.user, unique_id='CERT-1')
+
+    def verify(self, unique_id):
+        return self.client.get(reverse('certificate-verify', args=[unique_id]))
+
+    def test_verify_is_public_and_cached(self):
+        with self.assertNumQueries(1):
+            response = self.verify('CERT-1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['holder'], 'Grace Hopper')
+        self.assertTrue(response.json()['valid'])
+        self.assertIn('public', response['Cache-Control'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.verify('CERT-1').status_code, status.HTTP_200_OK)
+
+        # Unknown ids are cached as well
+        self.assertEqual(self.verify('CERT-2').status_code, status.HTTP_404_NOT_FOUND)
+        with self.assertNumQueries(0):
+            response = self.verify('CERT-2')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(response.json()['valid'])
+
+    def test_changes_drop_cached_answers(self):
+        from .models import Certificate
+        self.verify('CERT-1')
+        self.verify('CERT-2')
+        self.user.last_name = 'Murray Hopper'
+        self.user.save()
+        self.assertEqual(self.verify('CERT-1').json()['holder'], 'Grace Murray Hopper')
+
+        Certificate.objects.create(user=self.user, unique_id='CERT-2')
+        self.assertEqual(self.verify('CERT-2').status_code, status.HTTP_200_OK)
+        self.certificate.delete()
+        self.assertEqual(self.verify('CERT-1').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_rate_limited(self):
+        from unittest import mock
+        from .views_certificate import CertificateVerifyThrottle
+        with mock.patch.object(CertificateVerifyThrottle, 'rate', '2/min', create=True):
+            self.assertEqual(self.verify('CERT-1').status_code, status.HTTP_200_OK)
+            self.assertEqual(self.verify('CERT-2').status_code, status.HTTP_404_NOT_FOUND)
+            response = self.verify('CERT-1')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
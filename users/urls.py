@@ -10,6 +10,7 @@ router.register(r'progress', views.UserProgressViewSet, basename='progress')
 router.register(r'certificates', views_certificate.CertificateViewSet, basename='certificates')
 
 urlpatterns = [
+    path('certificates/verify/<str:unique_id>/', views_certificate.verify_certificate, name='certificate-verify'),
     path('', include(router.urls)),
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
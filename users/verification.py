@@ -0,0 +1,52 @@
+"""
+Cached public certificate verification.
+
+Employers check a certificate by its ``unique_id`` without an account. The
+answer (holder name and issue date, or "not found") is read with one
+projection query and stored as ready-to-send JSON bytes in Django's cache:
+found certificates for a day, unknown ids for a few minutes so guesses and
+typos are cheap too. Signals drop the entry when a certificate or its
+holder's name changes.
+"""
+import hashlib
+
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+
+from .models import Certificate
+
+CACHE_TIMEOUT = 60 * 60 * 24
+NEGATIVE_CACHE_TIMEOUT = 60 * 5
+
+
+def cache_key(unique_id):
+    # The id comes straight from the URL; hash it into a key every backend accepts
+    return f"certificate-verify:{hashlib.sha256(unique_id.encode()).hexdigest()}"
+
+
+def get_verification(unique_id):
+    """Return (found, JSON bytes) for a certificate id, querying on a miss"""
+    key = cache_key(unique_id)
+    entry = cache.get(key)
+    if entry is None:
+        row = (
+            Certificate.objects.filter(unique_id=unique_id)
+            .values('unique_id', 'issue_date', 'user__first_name', 'user__last_name')
+            .first()
+        )
+        if row is None:
+            entry = (False, JSONRenderer().render({"valid": False, "detail": "Certificate not found."}))
+            cache.set(key, entry, NEGATIVE_CACHE_TIMEOUT)
+        else:
+            entry = (True, JSONRenderer().render({
+                "valid": True,
+                "certificate_id": row['unique_id'],
+                "holder": f"{row['user__first_name']} {row['user__last_name']}".strip(),
+                "issue_date": row['issue_date'],
+            }))
+            cache.set(key, entry, CACHE_TIMEOUT)
+    return entry
+
+
+def invalidate(unique_ids):
+    cache.delete_many([cache_key(unique_id) for unique_id in unique_ids])
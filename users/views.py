@@ -5,6 +5,7 @@ from django.contrib.auth import logout
 from .models import User, UserProgress
 from .serializers import UserSerializer, UserCreateSerializer, UserProgressSerializer
 from .permissions import IsSuperAdmin
+from .versioning import CONTENT, USER, conditional
 
 class UserViewSet(viewsets.ModelViewSet):
     """
@@ -63,6 +64,7 @@ class UserProgressViewSet(viewsets.ReadOnlyModelViewSet):
         return UserProgress.objects.filter(user=self.request.user)
     
     @action(detail=False, methods=['get'])
+    @conditional(CONTENT, USER)
     def my_progress(self, request):
         """Get current user's progress"""
         try:
@@ -1,88 +1,19 @@
-import io
 import uuid
-from django.http import HttpResponse, FileResponse
-from django.utils import timezone
-from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control
+from django.http import HttpResponse
 from rest_framework import viewsets, permissions, status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, authentication_classes, permission_classes, throttle_classes
 from rest_framework.response import Response
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-from reportlab.pdfbase import pdfmetrics
-from reportlab.platypus import Paragraph
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from .models import Certificate, User, UserProgress
+from rest_framework.throttling import AnonRateThrottle
+from rest_framework.reverse import reverse
+from .models import Certificate, CertificateRenderJob, UserProgress
 from videos.models import Video
+from quizzes.models import UserVideoStatus
+from videos.streaming import serve_media
+from .certificates import ensure_rendered, forget_missing, is_current
+from .render_queue import enqueue, worker_enabled
+from .verification import get_verification
 from .serializers import CertificateSerializer
-from .permissions import IsSuperAdmin
-
-def generate_certificate_pdf(user, certificate_id):
-    """Generate a PDF certificate for the user"""
-    buffer = io.BytesIO()
-    
-    # Create the PDF object, using the buffer as its "file."
-    c = canvas.Canvas(buffer, pagesize=letter)
-    width, height = letter
-    
-    # We'll use the default fonts
-    
-    # Draw a border
-    c.setStrokeColor(colors.black)
-    c.setLineWidth(3)
-    c.rect(0.5*inch, 0.5*inch, width-inch, height-inch)
-    
-    # Title
-    c.setFont('Courier-Bold', 24)
-    c.drawCentredString(width/2, height-2*inch, "Certificate of Completion")
-    
-    # Draw the company logo
-    # c.drawImage('path/to/logo.png', width/2-inch, height-1.5*inch, width=2*inch, height=1*inch)
-    
-    # User's name
-    c.setFont('Courier-Bold', 18)
-    c.drawCentredString(width/2, height/2+inch, f"{user.first_name} {user.last_name}")
-    
-    # Description
-    styles = getSampleStyleSheet()
-    style = ParagraphStyle(
-        'Normal',
-        fontName='Courier',
-        fontSize=12,
-        alignment=1,  # Center alignment
-        leading=14
-    )
-    
-    description = f"""This certifies that <b>{user.first_name} {user.last_name}</b> has successfully 
-    completed all video quizzes in our educational platform demonstrating understanding 
-    and knowledge of the subject matter."""
-    
-    p = Paragraph(description, style)
-    p.wrapOn(c, width-3*inch, height)
-    p.drawOn(c, 1.5*inch, height/2)
-    
-    # Date
-    date_str = timezone.now().strftime("%B %d, %Y")
-    c.setFont('Courier', 12)
-    c.drawCentredString(width/2, height/2-inch, f"Issued on: {date_str}")
-    
-    # Certificate ID
-    c.setFont('Courier', 10)
-    c.drawCentredString(width/2, height/2-1.5*inch, f"Certificate ID: {certificate_id}")
-    
-    # Signature
-    c.setFont('Courier-Bold', 12)
-    c.drawCentredString(width/2, 2*inch, "Authorized Signature")
-    c.line(width/2-inch, 1.8*inch, width/2+inch, 1.8*inch)
-    
-    # Save the PDF
-    c.showPage()
-    c.save()
-    
-    # Get the value from the buffer and return it
-    buffer.seek(0)
-    return buffer
 
 class CertificateViewSet(viewsets.ReadOnlyModelViewSet):
     """
@@ -115,35 +46,39 @@ class CertificateViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Check if user has completed all videos
-        try:
-            progress = UserProgress.objects.get(user=user)
-            total_videos = Video.objects.filter(is_active=True).count()
-            passed_videos = progress.videos_passed.count()
-            
-            if passed_videos < total_videos:
-                return Response(
-                    {"detail": f"You need to complete all videos ({passed_videos}/{total_videos} completed)."},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Generate unique certificate ID
-            certificate_id = str(uuid.uuid4())
-            
-            # Create certificate record
-            certificate = Certificate.objects.create(
-                user=user,
-                unique_id=certificate_id
-            )
-            
-            serializer = self.get_serializer(certificate)
-            return Response(serializer.data)
-            
-        except UserProgress.DoesNotExist:
+        if not UserProgress.objects.filter(user=user).exists():
             return Response(
                 {"detail": "User progress not found."},
                 status=status.HTTP_404_NOT_FOUND
             )
+        
+        # Check if user has completed all videos
+        total_videos = Video.objects.filter(is_active=True).count()
+        passed_videos = UserVideoStatus.objects.filter(
+            user=user, completed_passed__gt=0, video__is_active=True
+        ).count()
+        
+        if passed_videos < total_videos:
+            return Response(
+                {"detail": f"You need to complete all videos ({passed_videos}/{total_videos} completed)."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Generate unique certificate ID
+        certificate_id = str(uuid.uuid4())
+        
+        # Create certificate record
+        certificate = Certificate.objects.create(
+            user=user,
+            unique_id=certificate_id
+        )
+        # The PDF is rendered in the background by render_certificates,
+        # or on first download without a worker
+        if worker_enabled():
+            enqueue(certificate)
+        
+        serializer = self.get_serializer(certificate)
+        return Response(serializer.data)
     
     @action(detail=True, methods=['get'])
     def download(self, request, pk=None):
@@ -157,18 +92,66 @@ class CertificateViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # If already has PDF file, return it
-        if certificate.pdf_file:
-            certificate.is_downloaded = True
-            certificate.save()
-            return FileResponse(certificate.pdf_file, as_attachment=True, filename=f"certificate_{certificate.unique_id}.pdf")
-        
-        # Generate PDF
-        pdf_buffer = generate_certificate_pdf(certificate.user, certificate.unique_id)
-        
-        # Mark as downloaded
-        certificate.is_downloaded = True
-        certificate.save()
+        # Rendered by the background worker (or here), then served from storage
+        # (offloaded to the front proxy when configured). A file missing from
+        # storage is rendered again like an outdated one.
+        forget_missing(certificate)
+        if not worker_enabled():
+            ensure_rendered(certificate)
+        elif not is_current(certificate):
+            job = enqueue(certificate)
+            response = Response(
+                {
+                    "detail": "The certificate is being prepared, please try again shortly.",
+                    "status": job.status,
+                    "status_url": reverse('certificates-render-status', args=[certificate.pk], request=request),
+                },
+                status=status.HTTP_202_ACCEPTED
+            )
+            response['Retry-After'] = '2'
+            return response
         
-        # Return the PDF
-        return FileResponse(pdf_buffer, as_attachment=True, filename=f"certificate_{certificate.unique_id}.pdf")
+        if not certificate.is_downloaded:
+            Certificate.objects.filter(pk=certificate.pk).update(is_downloaded=True)
+        response = serve_media(request, certificate.pdf_file.name, content_type='application/pdf',
+                               filename=f"certificate_{certificate.unique_id}.pdf")
+        patch_cache_control(response, private=True, max_age=86400)
+        return response
+    
+    @action(detail=True, methods=['get'])
+    def render_status(self, request, pk=None):
+        """Progress of the certificate's PDF render"""
+        certificate = self.get_object()
+        job = CertificateRenderJob.objects.filter(certificate=certificate).first()
+        ready = is_current(certificate)
+        return Response({
+            "ready": ready,
+            "status": 'done' if ready else (job.status if job else 'queued'),
+            "error": job.error if job and job.status == 'failed' else '',
+            "download_url": reverse('certificates-download', args=[certificate.pk], request=request),
+        })
+
+
+HTTP_MAX_AGE = 60 * 5
+
+
+class CertificateVerifyThrottle(AnonRateThrottle):
+    """Per-client limit of the public verification endpoint (REST_FRAMEWORK rate 'certificate_verify')"""
+    scope = 'certificate_verify'
+
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([permissions.AllowAny])
+@throttle_classes([CertificateVerifyThrottle])
+def verify_certificate(request, unique_id):
+    """Public check of a certificate by its unique ID"""
+    found, payload = get_verification(unique_id)
+    response = HttpResponse(
+        payload, content_type='application/json',
+        status=status.HTTP_200_OK if found else status.HTTP_404_NOT_FOUND
+    )
+    # Shared caches in front of the app may answer repeats; kept short because,
+    # unlike the application cache, they are not told about revocations
+    patch_cache_control(response, public=True, max_age=HTTP_MAX_AGE)
+    return response
@@ -0,0 +1,25 @@
+"""
+Process pools for running Django code across cores.
+
+Used by the progress recalculation and the certificate render queue. Each
+pool process sets Django up if needed and opens its own database connections.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.db import connections
+
+
+def init_worker():
+    """Give each pool process its own database connections."""
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+    connections.close_all()
+
+
+def process_pool(workers):
+    """A ProcessPoolExecutor of ``workers`` processes initialised with init_worker"""
+    # Forked children must not share the parent's open connections
+    connections.close_all()
+    return ProcessPoolExecutor(max_workers=workers, initializer=init_worker)
@@ -70,6 +70,10 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ],
+    # Throttled views only; the history is kept in the default cache
+    'DEFAULT_THROTTLE_RATES': {
+        'certificate_verify': os.environ.get('CERTIFICATE_VERIFY_RATE', '60/min'),
+    },
 }
 
 ROOT_URLCONF = 'video_quiz_project.urls'
@@ -103,6 +107,41 @@ DATABASES = {
     )
 }
 
+# Cache
+# The question bank, answer keys and their invalidation tokens must be shared by
+# every worker process, so a per-process LocMemCache is not enough in production.
+# With REDIS_URL set (needs the `redis` package) Redis is used, which is the
+# recommended setup. Otherwise the cache is file-based: shared by the workers on
+# one host, but every set() lists the cache directory to decide on culling, so it
+# only suits small deployments. CACHE_BACKEND/CACHE_LOCATION override both.
+if os.environ.get('REDIS_URL'):
+    DEFAULT_CACHE = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    }
+else:
+    DEFAULT_CACHE = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+    }
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', DEFAULT_CACHE['BACKEND']),
+        'LOCATION': os.environ.get('CACHE_LOCATION', DEFAULT_CACHE['LOCATION']),
+    },
+    # Write-behind quiz answers (QUIZ_ANSWER_BUFFER). Must be persistent and must
+    # never evict: use a file-based cache or redis with maxmemory-policy noeviction.
+    'answers': {
+        'BACKEND': os.environ.get('ANSWER_BUFFER_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.environ.get('ANSWER_BUFFER_LOCATION', os.path.join(BASE_DIR, 'answer_buffer')),
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 10 ** 9},
+    },
+}
+
+# Runs the tests with in-memory caches (see video_quiz_project/test_runner.py)
+TEST_RUNNER = 'video_quiz_project.test_runner.TestRunner'
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -137,4 +176,46 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Media offload
+# '' serves media from Python, 'nginx' answers with X-Accel-Redirect to an internal
+# location under MEDIA_OFFLOAD_PREFIX and 'sendfile' with an X-Sendfile path
+# (Apache mod_xsendfile, lighttpd) so the front proxy streams the bytes.
+MEDIA_OFFLOAD = os.environ.get('MEDIA_OFFLOAD', '')
+MEDIA_OFFLOAD_PREFIX = os.environ.get('MEDIA_OFFLOAD_PREFIX', '/protected-media/')
+
+# Lifetime in seconds of signed media URLs, on top of the video's own duration
+SIGNED_MEDIA_TTL = int(os.environ.get('SIGNED_MEDIA_TTL', 600))
+
+# Bump after changing the certificate layout: stored PDFs rendered from an
+# older version are rendered again (python manage.py backfill_certificates)
+CERTIFICATE_TEMPLATE_VERSION = 2
+
+# True when a separate `python manage.py render_certificates --loop` process renders
+# certificate PDFs; downloads then answer 202 until the PDF is ready. That process
+# must write to the same MEDIA storage the web process serves from (a shared volume
+# or object storage). Off by default: the web process renders on first download.
+CERTIFICATE_RENDER_WORKER = os.environ.get('CERTIFICATE_RENDER_WORKER', 'False') == 'True'
+
+# Processes the admin actions render certificates with when no render worker runs
+CERTIFICATE_RENDER_PROCESSES = int(os.environ.get('CERTIFICATE_RENDER_PROCESSES', os.cpu_count() or 1))
+
+# HLS packaging (python manage.py package_videos)
+# Ladder of (height, video kbit/s) rungs; the transcoder command defaults to ffmpeg
+# and can be replaced via HLS_TRANSCODER_COMMAND in local settings.
+HLS_LADDER = [(360, 800), (720, 2500), (1080, 5000)]
+HLS_SEGMENT_SECONDS = 6
+
+# Answer storage of new quiz attempts: 'rows' (one UserAnswer per question) or
+# 'compact' (one JSON column on the attempt). Existing attempts can be moved
+# with python manage.py pack_answers [--unpack].
+QUIZ_ANSWER_STORAGE = os.environ.get('QUIZ_ANSWER_STORAGE', 'rows')
+
+# Write-behind answers: submissions go to the 'answers' cache and are written to
+# the database on finish/timeout and by python manage.py flush_answer_buffer.
+# Run that command once after switching this off.
+QUIZ_ANSWER_BUFFER = os.environ.get('QUIZ_ANSWER_BUFFER', 'False') == 'True'
+
+# Number of per-video answer keys each worker process keeps in memory
+ANSWER_KEY_LOCAL_SIZE = int(os.environ.get('ANSWER_KEY_LOCAL_SIZE', 256))
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
@@ -0,0 +1,29 @@
+"""
+Test runner of the project.
+
+The configured caches are shared between processes and outlive a test run
+(file-based by default), so tests run against in-memory caches instead. Other
+runners can apply the same ``override_settings(CACHES=TEST_CACHES)``.
+"""
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'answers': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'answers',
+        'TIMEOUT': None,
+    },
+}
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        self._caches = override_settings(CACHES=TEST_CACHES)
+        self._caches.enable()
+        super().setup_test_environment(**kwargs)
+
+    def teardown_test_environment(self, **kwargs):
+        super().teardown_test_environment(**kwargs)
+        self._caches.disable()
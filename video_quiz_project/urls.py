@@ -18,12 +18,14 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from videos.views_media import signed_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/auth/', include('users.urls')),
     path('api/videos/', include('videos.urls')),
     path('api/quizzes/', include('quizzes.urls')),
+    path('media/signed/<path:name>', signed_media, name='signed-media'),
 
 ]
 
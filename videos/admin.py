@@ -1,10 +1,17 @@
 # In videos/admin.py
 
 from django.contrib import admin
-from .models import Video
+from .models import Video, VideoRendition
+
+class VideoRenditionInline(admin.TabularInline):
+    model = VideoRendition
+    extra = 0
+    readonly_fields = ('height', 'bitrate', 'playlist', 'segment_count', 'created_at')
 
 @admin.register(Video)
 class VideoAdmin(admin.ModelAdmin):
-    list_display = ('title', 'sequence_number', 'duration', 'passing_percentage', 'time_limit', 'is_active')
-    list_filter = ('is_active',)
-    search_fields = ('title', 'description')
\ No newline at end of file
+    list_display = ('title', 'sequence_number', 'duration', 'passing_percentage', 'time_limit', 'is_active', 'hls_status')
+    list_filter = ('is_active', 'hls_status')
+    search_fields = ('title', 'description')
+    readonly_fields = ('hls_status', 'hls_source', 'hls_playlist', 'hls_error')
+    inlines = [VideoRenditionInline]
@@ -0,0 +1,144 @@
+"""
+Offline HLS packaging of uploaded videos.
+
+Saving a Video with a new video_file marks it ``pending``; the
+``package_videos`` management command then transcodes it into one HLS variant
+per rung of settings.HLS_LADDER and writes a master playlist next to them:
+
+    MEDIA_ROOT/hls/<video id>/master.m3u8
+    MEDIA_ROOT/hls/<video id>/<height>p/index.m3u8
+    MEDIA_ROOT/hls/<video id>/<height>p/segment_00000.ts
+
+The transcoder is an ordinary local command (ffmpeg by default) configured by
+settings.HLS_TRANSCODER_COMMAND, a list of arguments formatted with
+``input``, ``output_dir``, ``height``, ``bitrate`` and ``segment_seconds``.
+"""
+import os
+import shutil
+import subprocess
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Video, VideoRendition
+
+HLS_ROOT = 'hls'
+PLAYLIST = 'index.m3u8'
+MASTER_PLAYLIST = 'master.m3u8'
+
+DEFAULT_LADDER = [(360, 800), (720, 2500), (1080, 5000)]
+DEFAULT_COMMAND = [
+    'ffmpeg', '-y', '-loglevel', 'error', '-i', '{input}',
+    '-vf', 'scale=-2:{height}', '-c:v', 'libx264', '-b:v', '{bitrate}k',
+    '-c:a', 'aac', '-b:a', '128k',
+    '-f', 'hls', '-hls_time', '{segment_seconds}', '-hls_playlist_type', 'vod',
+    '-hls_segment_filename', '{output_dir}/segment_%05d.ts', '{output_dir}/' + PLAYLIST,
+]
+
+
+def video_dir(video):
+    """Storage name of the directory holding a video's renditions"""
+    return f'{HLS_ROOT}/{video.pk}'
+
+
+def mark_pending_if_changed(video):
+    """Queue packaging when the video file differs from the one last packaged"""
+    source = video.video_file.name if video.video_file else ''
+    if source and source != video.hls_source and video.hls_status not in ('pending', 'processing'):
+        Video.objects.filter(pk=video.pk).update(hls_status='pending', hls_error='')
+        return True
+    return False
+
+
+def transcode(input_path, output_dir, height, bitrate):
+    """Run the configured transcoder for one rung of the ladder"""
+    command = getattr(settings, 'HLS_TRANSCODER_COMMAND', None) or DEFAULT_COMMAND
+    values = {
+        'input': input_path,
+        'output_dir': output_dir,
+        'height': height,
+        'bitrate': bitrate,
+        'segment_seconds': getattr(settings, 'HLS_SEGMENT_SECONDS', 6),
+    }
+    subprocess.run([arg.format(**values) for arg in command], check=True, capture_output=True)
+
+
+def count_segments(playlist_path):
+    with open(playlist_path) as f:
+        return sum(1 for line in f if line.strip() and not line.startswith('#'))
+
+
+def write_master_playlist(path, renditions):
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3']
+    for rendition in renditions:
+        lines.append(f'#EXT-X-STREAM-INF:BANDWIDTH={rendition.bitrate * 1000},NAME="{rendition.height}p"')
+        lines.append(f'{rendition.height}p/{PLAYLIST}')
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def package_video(video):
+    """
+    Transcode a video into its HLS ladder and record the renditions.
+
+    Returns True on success; failures (including a video without a file) are
+    stored on the video as ``hls_status='failed'`` with the error message, so
+    one bad video never stops the packaging loop or stays ``processing``.
+    """
+    if not video.video_file:
+        Video.objects.filter(pk=video.pk).update(hls_status='failed', hls_error='The video has no file.')
+        return False
+    source = video.video_file.name
+    Video.objects.filter(pk=video.pk).update(hls_status='processing', hls_error='')
+    base_name = video_dir(video)
+    base_path = os.path.join(settings.MEDIA_ROOT, base_name)
+    shutil.rmtree(base_path, ignore_errors=True)
+
+    renditions = []
+    try:
+        for height, bitrate in getattr(settings, 'HLS_LADDER', None) or DEFAULT_LADDER:
+            output_dir = os.path.join(base_path, f'{height}p')
+            os.makedirs(output_dir, exist_ok=True)
+            transcode(video.video_file.path, output_dir, height, bitrate)
+            renditions.append(VideoRendition(
+                video=video,
+                height=height,
+                bitrate=bitrate,
+                playlist=f'{base_name}/{height}p/{PLAYLIST}',
+                segment_count=count_segments(os.path.join(output_dir, PLAYLIST)),
+            ))
+        write_master_playlist(os.path.join(base_path, MASTER_PLAYLIST), renditions)
+    except Exception as e:
+        stderr = getattr(e, 'stderr', None) or b''
+        if isinstance(stderr, bytes):
+            stderr = stderr.decode(errors='replace')
+        error = f"{type(e).__name__}: {e}\n{stderr}".strip()
+        Video.objects.filter(pk=video.pk).update(hls_status='failed', hls_error=error)
+        return False
+
+    with transaction.atomic():
+        # A file uploaded while this one was transcoding was not marked pending
+        # (see mark_pending_if_changed); queue it rather than serve stale renditions
+        current = Video.objects.select_for_update().filter(pk=video.pk).values_list('video_file', flat=True).get()
+        VideoRendition.objects.filter(video=video).delete()
+        VideoRendition.objects.bulk_create(renditions)
+        Video.objects.filter(pk=video.pk).update(
+            hls_status='ready' if current == source else 'pending',
+            hls_source=source,
+            hls_playlist=f'{base_name}/{MASTER_PLAYLIST}',
+        )
+    return True
+
+
+def package_pending(limit=None):
+    """Package every pending video; returns (packaged, failed) counts"""
+    videos = Video.objects.filter(hls_status='pending').order_by('pk')
+    if limit:
+        videos = videos[:limit]
+    packaged = failed = 0
+    for video in videos:
+        if package_video(video):
+            packaged += 1
+        else:
+            failed += 1
+    return packaged, failed
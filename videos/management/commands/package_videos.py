@@ -0,0 +1,58 @@
+import time
+from django.core.management.base import BaseCommand
+from videos.models import Video
+from videos.hls import package_pending, package_video
+
+
+class Command(BaseCommand):
+    help = 'Package uploaded videos into multi-bitrate HLS renditions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--video',
+            type=int,
+            help='Package a specific video (id) regardless of its status',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Package at most this many pending videos per run',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and package new uploads as they arrive',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=30,
+            help='Seconds between runs with --loop (default: 30)',
+        )
+
+    def handle(self, *args, **options):
+        if options['video']:
+            try:
+                video = Video.objects.get(pk=options['video'])
+            except Video.DoesNotExist:
+                self.stdout.write(self.style.ERROR(f'Video {options["video"]} does not exist'))
+                return
+            if not video.video_file:
+                self.stdout.write(self.style.ERROR(f'Video "{video.title}" has no uploaded file'))
+                return
+            if package_video(video):
+                self.stdout.write(self.style.SUCCESS(f'Successfully packaged video: {video.title}'))
+            else:
+                video.refresh_from_db()
+                self.stdout.write(self.style.ERROR(f'Packaging failed for "{video.title}": {video.hls_error}'))
+            return
+
+        while True:
+            packaged, failed = package_pending(limit=options['limit'])
+            if packaged or failed or not options['loop']:
+                self.stdout.write(
+                    self.style.SUCCESS(f'Packaged {packaged} videos ({failed} failed)')
+                )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
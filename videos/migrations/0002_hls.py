@@ -0,0 +1,51 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='hls_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='hls_playlist',
+            field=models.CharField(blank=True, help_text='Master playlist, relative to MEDIA_ROOT', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='hls_source',
+            field=models.CharField(blank=True, help_text='video_file the HLS renditions were built from', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='hls_status',
+            field=models.CharField(blank=True, choices=[('', 'Not packaged'), ('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='VideoRendition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('height', models.IntegerField()),
+                ('bitrate', models.IntegerField(help_text='Target video bitrate in kbit/s')),
+                ('playlist', models.CharField(help_text='Variant playlist, relative to MEDIA_ROOT', max_length=255)),
+                ('segment_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='renditions', to='videos.video')),
+            ],
+            options={
+                'db_table': 'video_renditions',
+                'ordering': ['bitrate'],
+                'unique_together': {('video', 'height')},
+            },
+        ),
+    ]
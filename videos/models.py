@@ -3,6 +3,14 @@
 from django.db import models
 
 class Video(models.Model):
+    HLS_STATUS_CHOICES = (
+        ('', 'Not packaged'),
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    )
+    
     title = models.CharField(max_length=255)
     description = models.TextField()
     video_file = models.FileField(upload_to='videos/', null=True, blank=True)
@@ -14,10 +22,31 @@ class Video(models.Model):
     passing_percentage = models.IntegerField(default=70)
     time_limit = models.IntegerField(help_text="Quiz time limit in minutes")
     is_active = models.BooleanField(default=True)
+    hls_status = models.CharField(max_length=20, choices=HLS_STATUS_CHOICES, default='', blank=True)
+    hls_source = models.CharField(max_length=255, blank=True, help_text="video_file the HLS renditions were built from")
+    hls_playlist = models.CharField(max_length=255, blank=True, help_text="Master playlist, relative to MEDIA_ROOT")
+    hls_error = models.TextField(blank=True)
     
     class Meta:
         db_table = 'videos'
         ordering = ['sequence_number']
         
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
+
+class VideoRendition(models.Model):
+    """One HLS bitrate variant of a video"""
+    video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='renditions')
+    height = models.IntegerField()
+    bitrate = models.IntegerField(help_text="Target video bitrate in kbit/s")
+    playlist = models.CharField(max_length=255, help_text="Variant playlist, relative to MEDIA_ROOT")
+    segment_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'video_renditions'
+        ordering = ['bitrate']
+        unique_together = ['video', 'height']
+        
+    def __str__(self):
+        return f"{self.video.title} - {self.height}p ({self.bitrate} kbit/s)"
@@ -5,6 +5,7 @@ class VideoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Video
         fields = '__all__'
+        read_only_fields = ['hls_status', 'hls_source', 'hls_playlist', 'hls_error']
 
 class VideoListSerializer(serializers.ModelSerializer):
     """Serializer for listing videos with basic information"""
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import Video
+from .hls import mark_pending_if_changed
+
+
+@receiver(post_save, sender=Video)
+def queue_hls_packaging(sender, instance, **kwargs):
+    """A new video file was uploaded: package it on the next packaging run"""
+    mark_pending_if_changed(instance)
@@ -0,0 +1,177 @@
+"""
+HTTP range streaming for media files.
+
+Handles single bounded (``bytes=100-199``), open-ended (``bytes=100-``) and
+suffix (``bytes=-500``) ranges, answers unsatisfiable ranges with 416 and sends
+Last-Modified/ETag validators so players can revalidate instead of downloading
+again. Open-ended ranges and full responses go through FileResponse from the
+requested offset, which lets the WSGI server use its file wrapper (sendfile
+under gunicorn); bounded ranges are streamed in fixed-size chunks.
+
+With settings.MEDIA_OFFLOAD set, serve_media only answers with an
+X-Accel-Redirect or X-Sendfile header and the front proxy streams the file.
+"""
+import mimetypes
+import os
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+
+CHUNK_SIZE = 64 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, file_size):
+    """
+    Parse a Range header into an inclusive (start, end) pair.
+
+    Returns None when the whole file should be sent (no header, a syntax the
+    server may ignore, or several ranges) and raises RangeNotSatisfiable when
+    the range lies outside the file.
+    """
+    units, _, spec = header.strip().partition('=')
+    if units.strip().lower() != 'bytes' or not spec or ',' in spec:
+        return None
+    first, dash, last = spec.strip().partition('-')
+    if not dash:
+        return None
+    try:
+        if first == '':
+            # Suffix range: the last N bytes
+            suffix = int(last)
+            if suffix <= 0 or file_size == 0:
+                raise RangeNotSatisfiable
+            return max(0, file_size - suffix), file_size - 1
+        start = int(first)
+        end = int(last) if last else file_size - 1
+    except ValueError:
+        return None
+    if start >= file_size:
+        raise RangeNotSatisfiable
+    if start < 0 or end < start:
+        return None
+    return start, min(end, file_size - 1)
+
+
+def file_iterator(path, start, length, chunk_size=CHUNK_SIZE):
+    """Yield ``length`` bytes of the file from ``start`` in fixed-size chunks."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def file_validators(stat):
+    """ETag and Last-Modified values of a file"""
+    return quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}'), http_date(stat.st_mtime)
+
+
+def not_modified(request, etag, mtime):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        return etag in parse_etags(if_none_match) or if_none_match.strip() == '*'
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return if_modified_since is not None and int(mtime) <= if_modified_since
+
+
+def range_applies(request, etag, mtime):
+    """A Range is only honoured if If-Range, when sent, still matches the file"""
+    if_range = request.META.get('HTTP_IF_RANGE', '').strip()
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    if_range_date = parse_http_date_safe(if_range)
+    return if_range_date is not None and int(mtime) <= if_range_date
+
+
+def ranged_file_response(request, path, content_type=None):
+    """Serve ``path`` honouring Range, If-Range and conditional request headers"""
+    stat = os.stat(path)
+    file_size = stat.st_size
+    etag, last_modified = file_validators(stat)
+    content_type = content_type or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    if not_modified(request, etag, stat.st_mtime):
+        response = HttpResponseNotModified()
+    else:
+        byte_range = None
+        range_header = request.META.get('HTTP_RANGE', '')
+        if range_header and range_applies(request, etag, stat.st_mtime):
+            try:
+                byte_range = parse_range(range_header, file_size)
+            except RangeNotSatisfiable:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{file_size}'
+                response['Accept-Ranges'] = 'bytes'
+                return response
+
+        if byte_range is None:
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+        else:
+            start, end = byte_range
+            length = end - start + 1
+            if end == file_size - 1:
+                # Runs to the end of the file: hand the seeked file to FileResponse
+                f = open(path, 'rb')
+                f.seek(start)
+                response = FileResponse(f, content_type=content_type, status=206)
+            else:
+                response = StreamingHttpResponse(
+                    file_iterator(path, start, length), content_type=content_type, status=206
+                )
+            response['Content-Length'] = str(length)
+            response['Content-Range'] = f'bytes {start}-{end}/{file_size}'
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = last_modified
+    return response
+
+
+def offload_response(name, path, content_type):
+    """
+    Hand the file to the front proxy, or return None when offload is off.
+
+    ``name`` is the storage name relative to MEDIA_ROOT and ``path`` the
+    absolute path of the same file.
+    """
+    mode = getattr(settings, 'MEDIA_OFFLOAD', '')
+    if not mode:
+        return None
+    response = HttpResponse(content_type=content_type)
+    if mode == 'nginx':
+        prefix = settings.MEDIA_OFFLOAD_PREFIX.rstrip('/')
+        response['X-Accel-Redirect'] = f"{prefix}/{quote(name.lstrip('/'))}"
+    elif mode == 'sendfile':
+        response['X-Sendfile'] = path
+    else:
+        raise ValueError(f"Unknown MEDIA_OFFLOAD mode: {mode!r}")
+    return response
+
+
+def serve_media(request, name, content_type=None, filename=None):
+    """
+    Serve a file stored under MEDIA_ROOT after the caller has checked access.
+
+    Offloaded to the front proxy when configured, otherwise streamed from
+    Python with range support. ``filename`` makes the response an attachment.
+    """
+    path = os.path.join(settings.MEDIA_ROOT, name)
+    content_type = content_type or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    response = offload_response(name, path, content_type)
+    if response is None:
+        response = ranged_file_response(request, path, content_type=content_type)
+    if filename:
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
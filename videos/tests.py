@@ -1,3 +1,322 @@
-from django.test import TestCase
+import shutil
+import sys
+import tempfile
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from quizzes.models import QuizAttempt
+from users.models import User
+from .models import Video
+from .hls import package_pending
 
-# Create your tests here.
+
+class VideoUnlockTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='learner',
+            email='learner@example.com',
+            password='password123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.videos = [
+            Video.objects.create(
+                title=f'Video {i}', description='', duration=60,
+                sequence_number=i, time_limit=10
+            )
+            for i in range(1, 6)
+        ]
+
+    def attempt(self, video, attempt_number, status='completed', passed=False):
+        return QuizAttempt.objects.create(
+            user=self.user, video=video, attempt_number=attempt_number,
+            time_remaining=600, status=status, is_passed=passed,
+            percentage=90 if passed else 10
+        )
+
+    def test_unlocked_prefix(self):
+        """Videos unlock one after another as the previous one is passed"""
+        self.attempt(self.videos[0], 1, passed=True)
+        self.attempt(self.videos[1], 1, passed=False)
+        self.attempt(self.videos[2], 1, passed=True)
+
+        response = self.client.get(reverse('video-unlocked'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([v['id'] for v in response.data], [self.videos[0].id, self.videos[1].id])
+
+    def test_unlocked_query_count_does_not_grow_with_course(self):
+        """Resolving unlock state costs the same for any number of videos"""
+        for video in self.videos:
+            self.attempt(video, 1, passed=True)
+        # Running quizzes, state versions, ordered videos and the user's attempts
+        with self.assertNumQueries(4):
+            self.client.get(reverse('video-unlocked'))
+
+    def test_can_attempt_statuses(self):
+        """can_attempt reports lock, resume, passed and exhausted states"""
+        url = lambda video: reverse('video-can-attempt', args=[video.id])
+
+        response = self.client.get(url(self.videos[1]))
+        self.assertFalse(response.data['can_attempt'])
+        self.assertEqual(response.data['reason'], "Previous videos must be passed first.")
+
+        in_progress = self.attempt(self.videos[0], 1, status='in_progress')
+        response = self.client.get(url(self.videos[0]))
+        self.assertEqual(response.data['status'], 'resume')
+        self.assertEqual(response.data['attempt_id'], in_progress.id)
+        self.assertEqual(response.data['attempts_left'], 1)
+
+        in_progress.status = 'completed'
+        in_progress.save()
+        self.attempt(self.videos[0], 2, passed=True)
+        response = self.client.get(url(self.videos[0]))
+        self.assertEqual(response.data['status'], 'passed')
+        self.assertEqual(response.data['percentage'], 90)
+
+        self.attempt(self.videos[1], 1)
+        self.attempt(self.videos[1], 2)
+        response = self.client.get(url(self.videos[1]))
+        self.assertEqual(response.data['status'], 'max_attempts')
+        self.assertEqual(response.data['attempts_used'], 2)
+
+    def test_dashboard(self):
+        """The dashboard combines catalogue, unlock state, attempts and progress"""
+        self.attempt(self.videos[0], 1, passed=False)
+        self.attempt(self.videos[0], 2, passed=True)
+        self.attempt(self.videos[1], 1, status='in_progress')
+
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('video-dashboard'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['videos']), 5)
+        self.assertEqual([v['id'] for v in response.data['unlocked_videos']], [self.videos[0].id, self.videos[1].id])
+        self.assertEqual(response.data['attempts'][1]['in_progress_attempt_id'], QuizAttempt.objects.get(status='in_progress').id)
+        progress = response.data['progress']
+        self.assertEqual(progress['videos_passed'], [{'id': self.videos[0].id, 'title': 'Video 1'}])
+        self.assertEqual(progress['total_retries'], 1)
+        self.assertEqual(progress['overall_progress'], '20.00')
+
+    def test_dashboard_conditional_get(self):
+        """A matching If-None-Match is answered with 304 until state changes"""
+        url = reverse('video-dashboard')
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        # Running quizzes and state versions
+        with self.assertNumQueries(2):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.attempt(self.videos[0], 1, passed=True)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = response['ETag']
+        self.videos[4].title = 'Renamed'
+        self.videos[4].save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_running_quiz_is_never_not_modified(self):
+        """Countdowns and lazy timeouts are not hidden behind a 304"""
+        from datetime import timedelta
+        from django.utils import timezone
+        url = reverse('video-dashboard')
+        etag = self.client.get(url)['ETag']
+        attempt = self.attempt(self.videos[0], 1, status='in_progress')
+        attempt.deadline = timezone.now() + timedelta(seconds=60)
+        attempt.save(update_fields=['deadline'])
+        response = self.client.get(url)
+        self.assertNotIn('ETag', response)
+        self.assertEqual(response.data['attempts'][0]['in_progress_attempt_id'], attempt.pk)
+
+        # Once the deadline passes, the attempt is timed out before any ETag is compared
+        attempt.deadline = timezone.now() - timedelta(minutes=5)
+        attempt.save(update_fields=['deadline'])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.status, 'timed_out')
+        self.assertIsNone(response.data['attempts'][0]['in_progress_attempt_id'])
+
+
+class MediaTestMixin:
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='viewer',
+            email='viewer@example.com',
+            password='password123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.content = bytes(range(256)) * 4
+        self.video = Video.objects.create(
+            title='Video 1', description='', duration=60,
+            sequence_number=1, time_limit=10
+        )
+        self.video.video_file.save('lecture.mp4', ContentFile(self.content))
+        self.url = reverse('video-stream-video', args=[self.video.id])
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+
+class VideoStreamTestCase(MediaTestMixin, TestCase):
+    def test_full_file(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.body(response), self.content)
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+
+    def test_bounded_open_and_suffix_ranges(self):
+        """The requested slice is sent, not the start of the file"""
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.content)}')
+        self.assertEqual(self.body(response), self.content[100:200])
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=1000-')
+        self.assertEqual(response['Content-Length'], '24')
+        self.assertEqual(self.body(response), self.content[1000:])
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-10')
+        self.assertEqual(self.body(response), self.content[-10:])
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=5000-')
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.content)}')
+
+    def test_locked_video_is_forbidden(self):
+        later = Video.objects.create(
+            title='Video 2', description='', duration=60,
+            sequence_number=2, time_limit=10
+        )
+        later.video_file.save('later.mp4', ContentFile(self.content))
+        response = self.client.get(reverse('video-stream-video', args=[later.id]))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(MEDIA_OFFLOAD='nginx', MEDIA_OFFLOAD_PREFIX='/protected-media/')
+    def test_nginx_offload(self):
+        """Only the access check runs in Django; nginx streams the file"""
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-99')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.video.video_file.name)
+        self.assertEqual(response.content, b'')
+
+    @override_settings(MEDIA_OFFLOAD='sendfile')
+    def test_sendfile_offload(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Sendfile'], self.video.video_file.path)
+
+    def test_signed_media_url(self):
+        """Signed URLs stream the file without authentication or queries"""
+        response = self.client.get(reverse('video-media-url', args=[self.video.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        url = response.data['url']
+
+        anonymous = APIClient()
+        with self.assertNumQueries(0):
+            response = anonymous.get(url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(self.body(response), self.content[10:20])
+        # Cached bytes never outlive the signature
+        max_age = int(response['Cache-Control'].split('max-age=')[1])
+        self.assertLessEqual(max_age, settings.SIGNED_MEDIA_TTL + self.video.duration)
+
+        response = anonymous.get(url.replace('signature=', 'signature=0'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_expired_signed_media_url(self):
+        from .signing import signed_url
+        path, expires = signed_url(self.video.video_file.name, ttl=-1)
+        response = APIClient().get(path)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_revalidation(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+FAKE_TRANSCODER = [
+    sys.executable, '-c',
+    'import sys, pathlib; out = pathlib.Path(sys.argv[1]); '
+    '(out / "segment_00000.ts").write_bytes(b"ts"); '
+    '(out / "index.m3u8").write_text("#EXTM3U\\n#EXTINF:6.0,\\nsegment_00000.ts\\n#EXT-X-ENDLIST\\n")',
+    '{output_dir}', '{height}', '{bitrate}',
+]
+
+
+@override_settings(HLS_TRANSCODER_COMMAND=FAKE_TRANSCODER, HLS_LADDER=[(360, 800), (720, 2500)])
+class VideoPackagingTestCase(MediaTestMixin, TestCase):
+    def test_package_and_serve(self):
+        """A new upload is packaged into variants served behind the access checks"""
+        self.video.refresh_from_db()
+        self.assertEqual(self.video.hls_status, 'pending')
+
+        self.assertEqual(package_pending(), (1, 0))
+        self.video.refresh_from_db()
+        self.assertEqual(self.video.hls_status, 'ready')
+        self.assertEqual(self.video.hls_source, self.video.video_file.name)
+        self.assertEqual(
+            [(r.height, r.segment_count) for r in self.video.renditions.all()],
+            [(360, 1), (720, 1)]
+        )
+
+        url = lambda path: reverse('video-hls', args=[self.video.id, path])
+        response = self.client.get(url('master.m3u8'))
+        self.assertEqual(response['Content-Type'], 'application/vnd.apple.mpegurl')
+        self.assertIn(b'720p/index.m3u8', self.body(response))
+        response = self.client.get(url('720p/segment_00000.ts'))
+        self.assertEqual(self.body(response), b'ts')
+
+        # Saving without a new file does not queue packaging again
+        self.video.title = 'Renamed'
+        self.video.save()
+        self.video.refresh_from_db()
+        self.assertEqual(self.video.hls_status, 'ready')
+
+    def test_failures_do_not_stop_packaging(self):
+        """Unexpected errors and missing files mark the video failed and packaging goes on"""
+        Video.objects.filter(pk=self.video.pk).update(hls_status='pending')
+        no_file = Video.objects.create(
+            title='Video 2', description='', duration=60,
+            sequence_number=2, time_limit=10, hls_status='pending'
+        )
+        with self.settings(HLS_TRANSCODER_COMMAND=['{unknown_placeholder}']):
+            self.assertEqual(package_pending(), (0, 2))
+        self.video.refresh_from_db()
+        no_file.refresh_from_db()
+        self.assertEqual(self.video.hls_status, 'failed')
+        self.assertIn('KeyError', self.video.hls_error)
+        self.assertEqual(no_file.hls_status, 'failed')
+
+    def test_upload_during_packaging_is_packaged_again(self):
+        """A file replaced while the old one transcodes is queued, not marked ready"""
+        from unittest import mock
+        from . import hls
+        transcode = hls.transcode
+
+        def upload_meanwhile(*args):
+            Video.objects.filter(pk=self.video.pk).update(video_file='videos/replacement.mp4')
+            transcode(*args)
+
+        source = self.video.video_file.name
+        with mock.patch('videos.hls.transcode', side_effect=upload_meanwhile):
+            self.assertEqual(package_pending(), (1, 0))
+        self.video.refresh_from_db()
+        self.assertEqual((self.video.hls_status, self.video.hls_source), ('pending', source))
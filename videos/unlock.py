@@ -0,0 +1,177 @@
+"""
+Unlock state for a user's walk through the course.
+
+The first video is always unlocked and each following video unlocks once the
+one before it has been passed. Everything is resolved from two queries, the
+ordered video list and the user's UserVideoStatus rows, so the cost does not
+grow with the length of the course.
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+from quizzes.models import QuizAttempt, UserVideoStatus
+from users.progress import percentage, summarize
+
+from .models import Video
+
+
+def settle(user):
+    """
+    Time out the user's overdue attempts; returns True if a quiz is still running.
+
+    Run before ETags are computed: the timeouts bump the user's version, and
+    a running quiz makes the response depend on the clock.
+    """
+    rows = {
+        row.video_id: row
+        for row in UserVideoStatus.objects.filter(user=user, in_progress_attempt__isnull=False)
+    }
+    rows.update(UnlockState._expire_overdue(user, rows))
+    return any(row.in_progress_attempt_id for row in rows.values())
+
+
+class VideoStatus:
+    """Attempt summary of one video for one user, read from its UserVideoStatus row"""
+
+    def __init__(self, video, row=None):
+        self.video = video
+        self.attempts_used = row.attempts_used if row else 0
+        self.in_progress_attempt_id = row.in_progress_attempt_id if row else None
+        self.time_remaining = row.seconds_remaining() if row and row.in_progress_attempt_id else None
+        self.is_passed = row.is_passed if row else False
+        self.passed_percentage = row.passed_percentage if row else None
+        self.completed_attempts = row.completed_attempts if row else 0
+        self.completed_passed = row.completed_passed if row else 0
+
+    @property
+    def attempts_left(self):
+        return max(0, QuizAttempt.MAX_ATTEMPTS - self.attempts_used)
+
+    def as_dict(self):
+        return {
+            'video_id': self.video.id,
+            'attempts_used': self.attempts_used,
+            'attempts_left': 0 if self.is_passed else self.attempts_left,
+            'in_progress_attempt_id': self.in_progress_attempt_id,
+            'is_passed': self.is_passed,
+            'percentage': self.passed_percentage,
+        }
+
+
+class UnlockState:
+    """Ordered videos, per-video attempt status and the unlocked prefix for a user"""
+
+    def __init__(self, user, videos=None):
+        self.user = user
+        if videos is None:
+            videos = Video.objects.all().order_by('sequence_number')
+        self.videos = list(videos)
+        rows = {row.video_id: row for row in UserVideoStatus.objects.filter(user=user)}
+        rows.update(self._expire_overdue(user, rows))
+        self.statuses = {video.id: VideoStatus(video, rows.get(video.id)) for video in self.videos}
+        self.passed_video_ids = {video_id for video_id, status in self.statuses.items() if status.is_passed}
+
+    @staticmethod
+    def _expire_overdue(user, rows):
+        """Time out in-progress attempts whose deadline passed (lazy enforcement)"""
+        grace = timedelta(seconds=QuizAttempt.DEADLINE_GRACE_SECONDS)
+        now = timezone.now()
+        overdue = [
+            row.in_progress_attempt_id for row in rows.values()
+            if row.in_progress_attempt_id and row.in_progress_deadline is not None
+            and now > row.in_progress_deadline + grace
+        ]
+        if not overdue:
+            return {}
+        video_ids = []
+        for expired in QuizAttempt.objects.filter(pk__in=overdue).select_related('video'):
+            expired.time_out()
+            video_ids.append(expired.video_id)
+        # time_out refreshed the status rows of these videos
+        return {row.video_id: row for row in UserVideoStatus.objects.filter(user=user, video_id__in=video_ids)}
+
+    @property
+    def unlocked(self):
+        """Videos from the start of the course up to the first one not yet passed"""
+        unlocked = []
+        for video in self.videos:
+            unlocked.append(video)
+            if video.id not in self.passed_video_ids:
+                break
+        return unlocked
+
+    def progress(self):
+        """
+        The user's progress derived from the already loaded attempts.
+
+        Same figures as UserProgress.recalculate_progress, without reading or
+        writing the stored progress rows.
+        """
+        active = [video for video in self.videos if video.is_active]
+        stats = {
+            video.id: (self.statuses[video.id].completed_attempts, self.statuses[video.id].completed_passed)
+            for video in active
+            if self.statuses[video.id].completed_attempts
+        }
+        passed_ids, failed_ids, retries = summarize(stats)
+        return {
+            'user': self.user.id,
+            'videos_passed': [{'id': video.id, 'title': video.title} for video in active if video.id in passed_ids],
+            'videos_failed': [{'id': video.id, 'title': video.title} for video in active if video.id in failed_ids],
+            'total_retries': retries,
+            'overall_progress': str(percentage(len(passed_ids), len(active))),
+        }
+
+    def is_unlocked(self, video):
+        """A video is unlocked once every earlier video has been passed"""
+        return all(
+            other.id in self.passed_video_ids
+            for other in self.videos
+            if other.sequence_number < video.sequence_number
+        )
+
+    def can_attempt(self, video):
+        """Payload of the can_attempt endpoint for one video"""
+        if not self.is_unlocked(video):
+            return {
+                "can_attempt": False,
+                "reason": "Previous videos must be passed first."
+            }
+
+        status = self.statuses.get(video.id) or VideoStatus(video)
+        if status.is_passed:
+            return {
+                "can_attempt": False,
+                "reason": "You have already passed this quiz. Move on to the next video.",
+                "attempts_left": 0,
+                "status": "passed",
+                "attempts_used": status.attempts_used,
+                "is_passed": True,
+                "percentage": status.passed_percentage
+            }
+        if status.attempts_used >= QuizAttempt.MAX_ATTEMPTS:
+            return {
+                "can_attempt": False,
+                "reason": "Maximum attempts reached",
+                "attempts_left": 0,
+                "status": "max_attempts",
+                "attempts_used": status.attempts_used
+            }
+        if status.in_progress_attempt_id:
+            return {
+                "can_attempt": True,
+                "reason": "Quiz in progress",
+                "attempts_left": status.attempts_left,
+                "status": "resume",
+                "attempt_id": status.in_progress_attempt_id,
+                "time_remaining": status.time_remaining,
+                "attempts_used": status.attempts_used
+            }
+        return {
+            "can_attempt": True,
+            "reason": "Can attempt quiz",
+            "attempts_left": status.attempts_left,
+            "status": "start",
+            "attempts_used": status.attempts_used
+        }
@@ -4,12 +4,32 @@ from rest_framework.decorators import action
 from .models import Video
 from .serializers import VideoSerializer, VideoListSerializer
 from users.views import IsSuperAdmin
-from quizzes.models import QuizAttempt
-from django.http import FileResponse, HttpResponse
+from users.versioning import CONTENT, USER, conditional
+from .unlock import UnlockState, settle
+from django.utils.cache import patch_cache_control
+from .streaming import serve_media
+from .signing import signed_url
+from .hls import video_dir
 import os
 from django.conf import settings
 import mimetypes
 
+HLS_CONTENT_TYPES = {
+    '.m3u8': 'application/vnd.apple.mpegurl',
+    '.ts': 'video/mp2t',
+}
+
+def settled(request):
+    """Overdue attempts are timed out first, so the ETag covers their result"""
+    settle(request.user)
+    return True
+
+
+def no_running_quiz(request):
+    """A running quiz's countdown changes with the clock, so it is never answered with 304"""
+    return not settle(request.user)
+
+
 class VideoViewSet(viewsets.ModelViewSet):
     """
     API endpoint for videos
@@ -31,40 +51,37 @@ class VideoViewSet(viewsets.ModelViewSet):
             return VideoListSerializer
         return VideoSerializer
     
+    @conditional(CONTENT)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
     @action(detail=False, methods=['get'])
+    @conditional(CONTENT, USER, prepare=settled)
     def unlocked(self, request):
         """
         Get videos that are unlocked for the current user
         First video is always unlocked
         A video is unlocked if the previous video has been passed
         """
-        user = request.user
-        videos = Video.objects.all().order_by('sequence_number')
-        unlocked_videos = []
-        
-        # First video is always unlocked
-        if videos.exists():
-            first_video = videos.first()
-            unlocked_videos.append(first_video)
-            
-            # Check if subsequent videos are unlocked
-            for i in range(1, len(videos)):
-                previous_video = videos[i-1]
-                # Check if user has passed the previous video
-                attempts = QuizAttempt.objects.filter(
-                    user=user, 
-                    video=previous_video, 
-                    is_passed=True
-                )
-                
-                if attempts.exists():
-                    unlocked_videos.append(videos[i])
-                else:
-                    break
-        
-        serializer = VideoListSerializer(unlocked_videos, many=True)
+        state = UnlockState(request.user)
+        serializer = VideoListSerializer(state.unlocked, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    @conditional(CONTENT, USER, prepare=no_running_quiz)
+    def dashboard(self, request):
+        """
+        Everything the dashboard needs in one response:
+        the video catalogue, unlocked videos, per-video attempt summary and progress
+        """
+        state = UnlockState(request.user)
+        return Response({
+            "videos": VideoListSerializer(state.videos, many=True).data,
+            "unlocked_videos": VideoListSerializer(state.unlocked, many=True).data,
+            "attempts": [state.statuses[video.id].as_dict() for video in state.videos],
+            "progress": state.progress(),
+        })
+    
     @action(detail=True, methods=['get'])
     def can_attempt(self, request, pk=None):
         """
@@ -72,68 +89,51 @@ class VideoViewSet(viewsets.ModelViewSet):
         - Video must be unlocked
         - User must have fewer than 2 attempts or passed already
         """
-        user = request.user
         video = self.get_object()
+        state = UnlockState(request.user)
+        return Response(state.can_attempt(video))
         
-        # Check if video is unlocked
-        videos = Video.objects.filter(sequence_number__lt=video.sequence_number).order_by('sequence_number')
-        
-        if videos.exists():
-            # Check if all previous videos have been passed
-            for prev_video in videos:
-                attempts = QuizAttempt.objects.filter(user=user, video=prev_video, is_passed=True)
-                if not attempts.exists():
-                    return Response({
-                        "can_attempt": False,
-                        "reason": "Previous videos must be passed first."
-                    })
-        
-        # Check number of attempts
-        attempts = QuizAttempt.objects.filter(user=user, video=video)
-        attempts_count = attempts.count()
-        
-        # Check if user has already passed
-        if attempts.filter(is_passed=True).exists():
-            passed_attempt = attempts.filter(is_passed=True).first()
-            return Response({
-                "can_attempt": False,
-                "reason": "You have already passed this quiz. Move on to the next video.",
-                "attempts_left": 0,
-                "status": "passed",
-                "attempts_used": attempts_count,
-                "is_passed": True,
-                "percentage": passed_attempt.percentage if passed_attempt else None
-            })
-        if attempts_count >= 2:
-            return Response({
-                "can_attempt": False,
-                "reason": "Maximum attempts reached",
-                "attempts_left": 0,
-                "status": "max_attempts",
-                "attempts_used": attempts_count
-            })
+    @action(detail=True, methods=['get'])
+    def media_url(self, request, pk=None):
+        """
+        Issue a short-lived signed URL for the video file
+        The player then fetches the bytes without JWT or database work
+        """
+        video = self.get_object()
+        if not video.video_file:
+            return Response({"error": "No video file available"}, status=status.HTTP_404_NOT_FOUND)
         
-        # Check if there's an in-progress attempt
-        in_progress = attempts.filter(status='in_progress').first()
-        if in_progress:
-            return Response({
-                "can_attempt": True,
-                "reason": "Quiz in progress",
-                "attempts_left": 2 - attempts_count,
-                "status": "resume",
-                "attempt_id": in_progress.id,
-                "time_remaining": in_progress.time_remaining,
-                "attempts_used": attempts_count
-            })
+        if not request.user.is_superadmin and not UnlockState(request.user).is_unlocked(video):
+            return Response({"error": "Previous videos must be passed first."}, status=status.HTTP_403_FORBIDDEN)
         
+        path, expires = signed_url(video.video_file.name, ttl=settings.SIGNED_MEDIA_TTL + video.duration)
         return Response({
-            "can_attempt": True,
-            "reason": "Can attempt quiz",
-            "attempts_left": 2 - attempts_count,
-            "status": "start",
-            "attempts_used": attempts_count
+            "url": request.build_absolute_uri(path),
+            "expires": expires
         })
+    
+    @action(detail=True, methods=['get'], url_path=r'hls/(?P<path>[\w.-]+(?:/[\w.-]+)?)')
+    def hls(self, request, pk=None, path=None):
+        """
+        Serve the HLS master playlist, variant playlists and segments of a video
+        Same access rules as stream_video
+        """
+        video = self.get_object()
+        if video.hls_status != 'ready':
+            return Response({"error": "No HLS renditions available"}, status=status.HTTP_404_NOT_FOUND)
+        
+        if not request.user.is_superadmin and not UnlockState(request.user).is_unlocked(video):
+            return Response({"error": "Previous videos must be passed first."}, status=status.HTTP_403_FORBIDDEN)
+        
+        name = f"{video_dir(video)}/{path}"
+        if '..' in path or not os.path.isfile(os.path.join(settings.MEDIA_ROOT, name)):
+            return Response({"error": "HLS file not found"}, status=status.HTTP_404_NOT_FOUND)
         
+        content_type = HLS_CONTENT_TYPES.get(os.path.splitext(path)[1], 'application/octet-stream')
+        response = serve_media(request, name, content_type=content_type)
+        patch_cache_control(response, private=True, max_age=3600)
+        return response
+    
     @action(detail=True, methods=['get'])
     def stream_video(self, request, pk=None):
         """
@@ -142,40 +142,16 @@ class VideoViewSet(viewsets.ModelViewSet):
         video = self.get_object()
         if not video.video_file:
             return Response({"error": "No video file available"}, status=status.HTTP_404_NOT_FOUND)
+        
+        if not request.user.is_superadmin and not UnlockState(request.user).is_unlocked(video):
+            return Response({"error": "Previous videos must be passed first."}, status=status.HTTP_403_FORBIDDEN)
             
         video_path = os.path.join(settings.MEDIA_ROOT, str(video.video_file))
         
         if not os.path.exists(video_path):
             return Response({"error": "Video file not found"}, status=status.HTTP_404_NOT_FOUND)
-            
-        # Get file size
-        file_size = os.path.getsize(video_path)
-        
-        # Get content type
-        content_type = mimetypes.guess_type(video_path)[0] or 'video/mp4'
-        
-        # Handle range requests
-        range_header = request.META.get('HTTP_RANGE', '').strip()
-        range_match = range_header.replace('bytes=', '').split('-')
-        start = int(range_match[0]) if range_match[0] else 0
-        end = int(range_match[1]) if range_match[1] else file_size - 1
-        
-        # Ensure the range is valid
-        end = min(end, file_size - 1)
-        length = end - start + 1
-        
-        # Create response
-        response = FileResponse(
-            open(video_path, 'rb'),
-            content_type=content_type,
-            status=206 if range_header else 200
-        )
-        
-        # Set headers for range request
-        if range_header:
-            response['Content-Range'] = f'bytes {start}-{end}/{file_size}'
-        
-        response['Accept-Ranges'] = 'bytes'
-        response['Content-Length'] = str(length)
         
-        return response
\ No newline at end of file
+        # Offloaded to the front proxy when configured, else range-streamed from Python
+        response = serve_media(request, video.video_file.name, content_type=mimetypes.guess_type(video_path)[0] or 'video/mp4')
+        patch_cache_control(response, private=True, max_age=3600)
+        return response
@@ -0,0 +1,31 @@
+import os
+import time
+from django.conf import settings
+from django.http import Http404, HttpResponseForbidden
+from django.utils._os import safe_join
+from django.views.decorators.http import require_GET
+from .signing import verify
+from .streaming import serve_media
+
+
+@require_GET
+def signed_media(request, name):
+    """
+    Serve a media file from a signed URL.
+
+    No authentication and no ORM: the HMAC in the query string is the only
+    credential, checked before anything touches the file system.
+    """
+    if not verify(name, request.GET.get('expires'), request.GET.get('signature')):
+        return HttpResponseForbidden("Invalid or expired media URL.")
+    try:
+        path = safe_join(settings.MEDIA_ROOT, name)
+    except ValueError:
+        raise Http404
+    if not os.path.isfile(path):
+        raise Http404
+    response = serve_media(request, name)
+    # Private caches may keep the bytes until the URL itself expires, not longer
+    remaining = max(0, int(request.GET['expires']) - int(time.time()))
+    response['Cache-Control'] = f'private, max-age={remaining}'
+    return response